@@ -5,6 +5,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from main import RobotController
+from src.error_handler import MotorError
 import threading
 
 # Create the Flask app
@@ -33,20 +34,29 @@ def move():
     if not direction:
         return jsonify({'error': 'Missing direction'}), 400
 
-    if direction == 'forward':
-        controller.motor_controller.move_forward()
-    elif direction == 'backward':
-        controller.motor_controller.move_backward()
-    elif direction == 'left':
-        controller.motor_controller.turn_left()
-    elif direction == 'right':
-        controller.motor_controller.turn_right()
-    elif direction == 'stop':
-        controller.motor_controller.stop()
-    else:
-        return jsonify({'error': 'Invalid direction'}), 400
+    arbiter = controller.arbiter
+    speed = data.get('speed')  # "slow", "normal", "fast" or a duty cycle in 0..1
+    try:
+        if direction == 'stop':
+            command = arbiter.stop("api")
+        elif direction in ('forward', 'backward'):
+            # Keeps moving until the next command, as before
+            command = arbiter.move(direction, None, "api", speed=speed)
+        elif direction in ('left', 'right'):
+            command = arbiter.turn(direction, "api", angle=data.get('angle', 90), speed=speed)
+        else:
+            return jsonify({'error': 'Invalid direction'}), 400
+    except MotorError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'status': f'moving {direction}', 'command_id': command.command_id}), 202
 
-    return jsonify({'status': f'moving {direction}'})
+@app.route('/move/status/<int:command_id>', methods=['GET'])
+def move_status(command_id):
+    command_status = controller.motion_executor.get_status(command_id)
+    if command_status is None:
+        return jsonify({'error': 'Unknown command'}), 404
+    return jsonify(command_status)
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -55,13 +65,8 @@ def chat():
     if not message:
         return jsonify({'error': 'Missing message'}), 400
 
-    # Let the AI process the message
-    controller.face_display.set_face("thinking")
-    ai_reply = controller.ai_processor.process(message)
-    
-    # Let the robot speak the reply
-    controller.tts.speak(ai_reply)
-    controller.face_display.set_face("neutral")
+    # Answered and spoken like web chat, with faces and speech ordered by the arbiter
+    ai_reply = controller.command_processor.process_text_input(message, origin="api")
 
     return jsonify({'reply': ai_reply, 'face': controller.face_display.get_current_face()})
 
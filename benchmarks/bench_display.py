@@ -0,0 +1,99 @@
+"""
+CPU cost of the face display: on-change rendering against the legacy 20 FPS redraw.
+
+Runs FaceDisplay headless (SDL's dummy video driver) for `--seconds`, cycling
+through faces every `--change-every` seconds the way a conversation would, and
+reports frames drawn, CPU per frame, the share of the screen pushed per frame and
+the process CPU used while the display ran (the main thread only sleeps). With
+the dummy driver, pushing pixels costs almost nothing, so the share of the
+screen pushed is the figure that carries over to a real display.
+
+A final run lip-syncs to a synthetic speech envelope (syllables at about 4 Hz)
+for the whole period and also reports how late animation frames were drawn.
+
+Usage: python benchmarks/bench_display.py [--seconds 20] [--change-every 2]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import DisplayConfig, LoggingConfig
+from src.face_animation import rms_envelope
+from src.face_display import FaceDisplay
+from src.logging_system import LoggingSystem
+
+FACE_CYCLE = ["neutral", "hearing", "thinking", "speaking", "speaking_alt", "speaking", "neutral", "happy"]
+
+
+class _Speech:
+    """Stand-in for a TextToSpeech Utterance: amplitude-modulated tone with pauses between words."""
+    def __init__(self, seconds: float, sample_rate: int = 22050, frame_seconds: float = 0.04):
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        syllables = np.abs(np.sin(2 * np.pi * 2.0 * t)) * (np.sin(2 * np.pi * 0.4 * t) > -0.6)
+        pcm = (np.sin(2 * np.pi * 180 * t) * 9000 * syllables).astype(np.int16).tobytes()
+        self.envelope = rms_envelope(pcm, sample_rate, frame_seconds)
+        self.frame_seconds = frame_seconds
+
+
+def run_mode(label: str, config: DisplayConfig, args, logger: LoggingSystem, lip_sync: bool = False):
+    display = FaceDisplay(config.screen_size, config.faces_directory, logger, config=config)
+    display.start()
+    while not display.initialized and display.is_alive():
+        time.sleep(0.01)
+    time.sleep(0.5)  # Let the first full frame and face loading settle
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    frames_start = display.frames_drawn
+    draw_cpu_start = display.draw_cpu_seconds
+    pixels_start = display.pixels_pushed
+    i = 0
+    if lip_sync:
+        display.set_face("speaking")
+        display.on_playback(_Speech(args.seconds), time.monotonic())
+        time.sleep(args.seconds)
+    while time.perf_counter() - wall_start < args.seconds:
+        display.set_face(FACE_CYCLE[i % len(FACE_CYCLE)])
+        i += 1
+        time.sleep(args.change_every)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    frames = display.frames_drawn - frames_start
+    screen = config.screen_size[0] * config.screen_size[1]
+    stats = display.get_stats()
+    display.stop()
+
+    print(f"{label:22s}: {frames:5d} frames ({frames / wall:5.1f}/s), "
+          f"{(display.draw_cpu_seconds - draw_cpu_start) / max(frames, 1) * 1000:5.2f} ms CPU per frame, "
+          f"{(display.pixels_pushed - pixels_start) / screen / max(frames, 1):4.2f} screens pushed per frame, "
+          f"process CPU {cpu / wall * 100:5.1f}% (of which {display.diff_cpu_seconds * 1000:.0f} ms one-off face diffs)")
+    if lip_sync:
+        print(f"{'':22s}  animation frames late by {stats['frame_late_ms_p95']:.1f} ms at p95, "
+              f"frame period {stats['frame_period_ms']:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--change-every", type=float, default=2.0)
+    parser.add_argument("--faces", default="Faces")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = LoggingSystem(log_dir, config=LoggingConfig(log_directory=log_dir, level="WARNING"))
+        base = dict(faces_directory=args.faces, stats_interval=0)
+        static = dict(animation_enabled=False, **base)
+        run_mode("continuous 20 FPS", DisplayConfig(continuous_redraw=True, **static), args, logger)
+        run_mode("on change, full flip", DisplayConfig(partial_updates=False, **static), args, logger)
+        run_mode("on change, partial", DisplayConfig(**static), args, logger)
+        run_mode("lip-sync, partial", DisplayConfig(**base), args, logger, lip_sync=True)
+        logger.close()
+
+
+if __name__ == "__main__":
+    main()
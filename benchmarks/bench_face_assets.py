@@ -0,0 +1,89 @@
+"""
+Face loading at startup: the old decode-everything path against the FaceLibrary cache.
+
+Each mode runs in a fresh Python process (so memory figures are not shared)
+that opens a headless display and loads the faces the way FaceDisplay would:
+
+- legacy: decode every PNG, convert_alpha() and scale it (the previous _load_faces);
+- cold:   FaceLibrary with an empty cache, which builds the raw pixel dumps;
+- warm:   FaceLibrary on the next start, memory-mapping the dumps.
+
+Reports load time, the resident set size after loading and the peak RSS.
+Memory is measured on top of a process that has only imported pygame and opened
+the display.
+
+Usage: python benchmarks/bench_face_assets.py [--size 800x600] [--faces Faces]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _child(mode: str, size, faces: str, cache: str):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    sys.path.insert(0, ROOT)
+    import pygame
+    from src.config import LoggingConfig
+    from src.face_assets import FaceLibrary
+    from src.logging_system import LoggingSystem
+
+    pygame.display.init()
+    pygame.display.set_mode(size)
+    logger = LoggingSystem(cache, config=LoggingConfig(log_directory=cache, level="ERROR"))
+    base_rss = _rss_bytes()
+    start = time.perf_counter()
+    if mode == "legacy":
+        loaded = {}
+        for filename in os.listdir(faces):
+            if filename.endswith(".png"):
+                image = pygame.image.load(os.path.join(faces, filename)).convert_alpha()
+                loaded[os.path.splitext(filename)[0]] = pygame.transform.scale(image, size)
+        count = len(loaded)
+    else:
+        library = FaceLibrary(faces, size, logger, cache_directory=os.path.join(cache, "faces"), lazy_faces=["crashed"])
+        library.preload()
+        count = len(library._resident)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "faces": count, "rss": _rss_bytes() - base_rss,
+                      "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - base_rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="800x600")
+    parser.add_argument("--faces", default=os.path.join(ROOT, "Faces"))
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    if args.child:
+        _child(args.child[0], size, args.faces, args.child[1])
+        return
+
+    cache = tempfile.mkdtemp()
+    try:
+        for mode in ("legacy", "cold", "warm"):
+            output = subprocess.run([sys.executable, __file__, "--size", args.size, "--faces", args.faces,
+                                     "--child", mode, cache], capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:6s}: {result['faces']:2d} faces in {result['seconds'] * 1000:6.0f} ms, "
+                  f"RSS +{result['rss'] / 2 ** 20:5.1f} MiB after loading, peak +{result['peak_rss'] / 2 ** 20:5.1f} MiB")
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark for LoggingSystem per-call overhead.
+
+Compares enabled vs. filtered-out categories, and eager f-string formatting vs.
+deferred %-style / callable formatting, in both synchronous and async writer modes.
+
+Usage: python benchmarks/bench_logging.py [--calls 20000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import LoggingConfig
+from src.logging_system import LoggingSystem, DEBUG
+
+
+class _ExpensiveRepr:
+    """Stands in for objects like an OpenAI response whose repr is costly."""
+    def __repr__(self):
+        return "Response(" + ", ".join(f"field_{i}={i * 3.14159:.5f}" for i in range(50)) + ")"
+
+
+def _time_per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run(calls: int):
+    payload = _ExpensiveRepr()
+    distances = {"front": 123.4, "left": 56.7, "right": 89.0}
+    for async_writes in (False, True):
+        log_dir = tempfile.mkdtemp(prefix="bench_logging_")
+        try:
+            config = LoggingConfig(log_directory=log_dir, async_writes=async_writes, queue_capacity=calls * 4,
+                                   category_levels={"SENSOR_READING": "DEBUG"})
+            logger = LoggingSystem(log_dir, config=config)
+            cases = {
+                "enabled,  eager f-string": lambda: logger.log_activity("SENSOR_READING", f"{distances}", level=DEBUG),
+                "enabled,  deferred %s": lambda: logger.log_activity("SENSOR_READING", "%s", distances, level=DEBUG),
+                "disabled, eager f-string": lambda: logger.log_activity("OPENAI_CLIENT", f"Received response: {payload}", level=DEBUG),
+                "disabled, deferred %r": lambda: logger.log_activity("OPENAI_CLIENT", "Received response: %r", payload, level=DEBUG),
+                "disabled, callable": lambda: logger.log_activity("TTS_DEBUG", lambda: f"Running CLI command: {payload}"),
+            }
+            mode = "async" if async_writes else "sync"
+            for name, fn in cases.items():
+                print(f"[{mode:5}] {name:26} {_time_per_call(fn, calls):9.2f} us/call")
+            logger.flush()
+            logger.close()
+        finally:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    run(parser.parse_args().calls)
@@ -0,0 +1,149 @@
+"""
+Reaction of the safety monitor against a simulated world, end to end.
+
+The robot drives forward towards a wall along a straight line. A world thread
+integrates its position from the motor controller's current motion and PWM duty
+cycle and scripts the front echo on FakeGPIO to match, so every reading goes
+through the real sampler, echo timing, filter, safety monitor and motion
+executor. Two scenarios:
+
+- approach: the wall is `--start-cm` ahead; reports where the robot came to rest
+  (clearance) and any collisions.
+- popup: the way is clear until an obstacle appears `--popup-cm` ahead mid-move;
+  reports the time from its appearance until the motor pins went LOW.
+
+The monitor's own reaction latency (snapshot to pins LOW) is reported for both.
+
+Usage: python benchmarks/bench_safety.py [--episodes 10] [--rate 20] [--max-speed 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import LoggingConfig, MotionConfig, SafetyConfig, SensorConfig
+from src.fake_gpio import FakeGPIO
+from src.logging_system import LoggingSystem
+from src.motion_executor import MotionExecutor
+from src.motor_controller import MotorController
+from src.safety_monitor import SafetyMonitor
+from src.sensors import SensorManager
+
+SENSOR_PINS = {"front_trigger": 2, "front_echo": 3, "left_trigger": 4, "left_echo": 5, "right_trigger": 6, "right_echo": 7}
+MOTOR_PINS = {"front_left": [17, 18], "front_right": [22, 23], "rear_left": [24, 25], "rear_right": [26, 27]}
+ENABLE_PINS = {"front_left": 12, "front_right": 13, "rear_left": 19, "rear_right": 16}
+FAR_CM = 350.0
+
+
+class LineWorld(threading.Thread):
+    """Integrates the robot's position along a line and keeps the front echo in step."""
+    def __init__(self, gpio: FakeGPIO, motors: MotorController, wall_cm: float, max_speed: float):
+        super().__init__(name="LineWorldThread", daemon=True)
+        self.gpio = gpio
+        self.motors = motors
+        self.wall = wall_cm
+        self.max_speed = max_speed
+        self.position = 0.0
+        self.running = True
+        for name in ("left", "right"):
+            gpio.set_echo(SENSOR_PINS[f"{name}_trigger"], SENSOR_PINS[f"{name}_echo"], FAR_CM)
+        self._update_echo()
+
+    @property
+    def clearance(self) -> float:
+        return self.wall - self.position
+
+    def _update_echo(self):
+        self.gpio.set_echo(SENSOR_PINS["front_trigger"], SENSOR_PINS["front_echo"], max(2.0, min(self.clearance, FAR_CM)))
+
+    def run(self):
+        last = time.perf_counter()
+        while self.running:
+            time.sleep(0.002)
+            now = time.perf_counter()
+            if self.motors.current_motion == "forward":
+                self.position += self.motors.duty * self.max_speed * (now - last)
+            last = now
+            self._update_echo()
+
+
+def run_episode(scenario: str, args, logger: LoggingSystem):
+    gpio = FakeGPIO()
+    motors = MotorController("raspberry_pi", MOTOR_PINS, logger, gpio=gpio, enable_pins=ENABLE_PINS)
+    executor = MotionExecutor(motors, logger, MotionConfig())
+    sensors = SensorManager("raspberry_pi", SENSOR_PINS, logger, gpio=gpio,
+                            config=SensorConfig(sample_rate_hz=args.rate, firing_order=["front", "left", "right"]))
+    world = LineWorld(gpio, motors, args.start_cm if scenario == "approach" else 10 * FAR_CM, args.max_speed)
+    monitor = SafetyMonitor(sensors, executor, logger, SafetyConfig())
+
+    world.start()
+    executor.start()
+    sensors.start()
+    monitor.start()
+    time.sleep(1.0)  # Let the filter windows fill
+
+    command = executor.submit("forward", None, speed="fast", source="bench")
+    popped_at = None
+    deadline = time.perf_counter() + 15.0
+    while not command.done and time.perf_counter() < deadline:
+        if scenario == "popup" and popped_at is None and command.started_at \
+                and time.perf_counter() - command.started_at > args.popup_after:
+            world.wall = world.position + args.popup_cm
+            popped_at = time.perf_counter()
+        time.sleep(0.001)
+    time.sleep(0.1)
+
+    stop = monitor.stops[0] if monitor.stops else None
+    result = {
+        "halted": stop is not None,
+        "clearance": world.clearance,
+        "monitor_latency": stop.latency if stop else None,
+        "popup_latency": (stop.stop.finished_at - popped_at) if stop and popped_at and stop.stop.finished_at else None,
+    }
+    world.running = False
+    monitor.cleanup()
+    sensors.cleanup()
+    executor.shutdown()
+    motors.cleanup()
+    gpio.close()
+    return result
+
+
+def _ms(values):
+    if not values:
+        return "n/a"
+    return f"median {statistics.median(values) * 1000:6.1f} ms, max {max(values) * 1000:6.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=20, help="Sensor sampling rate, Hz")
+    parser.add_argument("--max-speed", type=float, default=50, help="cm/s at 100%% duty")
+    parser.add_argument("--start-cm", type=float, default=150)
+    parser.add_argument("--popup-cm", type=float, default=45)
+    parser.add_argument("--popup-after", type=float, default=1.0, help="Seconds into the move")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = LoggingSystem(log_dir, config=LoggingConfig(log_directory=log_dir, level="ERROR"))
+        for scenario in ("approach", "popup"):
+            results = [run_episode(scenario, args, logger) for _ in range(args.episodes)]
+            clearances = [r["clearance"] for r in results]
+            collisions = sum(c <= 0 for c in clearances)
+            print(f"{scenario:8s}: halted {sum(r['halted'] for r in results)}/{len(results)}, "
+                  f"collisions {collisions}, clearance min {min(clearances):5.1f} cm, "
+                  f"median {statistics.median(clearances):5.1f} cm")
+            print(f"          monitor reaction {_ms([r['monitor_latency'] for r in results if r['monitor_latency'] is not None])}")
+            if scenario == "popup":
+                print(f"          obstacle to halt {_ms([r['popup_latency'] for r in results if r['popup_latency'] is not None])}")
+        logger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Offline accuracy and cost of the ultrasonic filter chain on simulated noisy traces.
+
+Each trace comes from SimulatedRangeSensor (smooth motion plus Gaussian noise,
+multipath spikes and missing echoes). Decisions from single raw samples are
+compared with SensorManager.is_obstacle() on the filtered readings. "False
+alarms" are obstacle reports while the true distance, even after closing for
+`obstacle_lookahead_s` at the true speed, stays well clear of the threshold (more
+than 1.5x). "Misses" are clear reports while the true distance is inside it.
+
+Usage: python benchmarks/bench_sensor_filter.py [--seconds 600] [--rate 10] [--traces 5]
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import LoggingConfig, SensorConfig
+from src.logging_system import LoggingSystem
+from src.sensors import SensorManager, SimulatedRangeSensor
+
+
+def run_trace(sensors: SensorManager, seed: int, seconds: float, rate: float):
+    config = sensors.config
+    threshold = config.front_obstacle_cm
+    sim = SimulatedRangeSensor(seed=seed, min_cm=5.0, max_cm=150.0)
+    sensor_filter = sensors.filters["front"]
+    stats = {"raw_sq": 0.0, "filtered_sq": 0.0, "raw_false": 0, "raw_miss": 0,
+             "filtered_false": 0, "filtered_miss": 0, "update_s": 0.0, "n": 0}
+
+    for i in range(int(seconds * rate)):
+        now = i / rate
+        raw = sim.read(now)
+        start = time.perf_counter()
+        reading = sensor_filter.update(raw, now)
+        stats["update_s"] += time.perf_counter() - start
+
+        truth = sim.true_distance
+        predicted = truth - max(-sim.velocity, 0.0) * config.obstacle_lookahead_s
+        clear, blocked = predicted > threshold * 1.5, truth < threshold
+        raw_obstacle = raw < threshold
+        filtered_obstacle = sensors.is_obstacle("front", reading)
+        stats["raw_sq"] += (min(raw, config.max_range_cm) - truth) ** 2
+        stats["filtered_sq"] += (reading.distance - truth) ** 2
+        stats["raw_false"] += clear and raw_obstacle
+        stats["raw_miss"] += blocked and not raw_obstacle
+        stats["filtered_false"] += clear and filtered_obstacle
+        stats["filtered_miss"] += blocked and not filtered_obstacle
+        stats["n"] += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--rate", type=float, default=10, help="Samples per second")
+    parser.add_argument("--traces", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = LoggingSystem(log_dir, config=LoggingConfig(log_directory=log_dir, level="WARNING"))
+        for seed in range(args.traces):
+            # A fresh manager per trace so filter windows don't carry over
+            sensors = SensorManager("windows", {}, logger, config=SensorConfig(background_sampling=False))
+            s = run_trace(sensors, seed, args.seconds, args.rate)
+            n = s["n"]
+            print(f"trace {seed}: RMSE raw {math.sqrt(s['raw_sq'] / n):6.1f} cm, filtered {math.sqrt(s['filtered_sq'] / n):5.1f} cm | "
+                  f"false alarms raw {s['raw_false']:4d}, filtered {s['filtered_false']:4d} | "
+                  f"misses raw {s['raw_miss']:4d}, filtered {s['filtered_miss']:4d} | "
+                  f"{s['update_s'] / n * 1e6:.0f} us per update")
+        logger.close()
+
+
+if __name__ == "__main__":
+    main()
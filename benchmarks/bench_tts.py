@@ -0,0 +1,64 @@
+"""
+Cold vs. warm per-utterance Piper synthesis latency.
+
+"cold" runs the piper CLI for every utterance (the voice model is reloaded each
+time); "warm" reuses one in-process PiperVoiceEngine with the model loaded once.
+Only synthesis is timed; nothing is played.
+
+Usage: python benchmarks/bench_tts.py [--voice en_US-amy-medium] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.error_handler import TTSError
+from src.piper_engine import PiperCliEngine, PiperVoiceEngine
+
+PHRASES = [
+    "Executing.",
+    "Hello, I am online and ready.",
+    "I can't move forward, there is an obstacle in my way.",
+    "My sensors detect the following distances: Front 120.5 cm, Left 45.2 cm, and Right 80.0 cm.",
+]
+
+
+def _measure(engine, repeat: int):
+    for phrase in PHRASES:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pcm = engine.synthesize(phrase)
+            timings.append((time.perf_counter() - start) * 1000)
+        audio_ms = len(pcm) / 2 / engine.sample_rate * 1000
+        print(f"  {statistics.median(timings):8.1f} ms median, {max(timings):8.1f} ms max "
+              f"({audio_ms:6.0f} ms audio)  '{phrase[:40]}'")
+
+
+def run(voice: str, repeat: int):
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    model_path = os.path.join(base_dir, 'voices', f"{voice}.onnx")
+    if not os.path.exists(model_path):
+        sys.exit(f"Voice model not found: {model_path}")
+
+    print("cold (piper CLI per utterance):")
+    _measure(PiperCliEngine(model_path), repeat)
+
+    try:
+        start = time.perf_counter()
+        engine = PiperVoiceEngine(model_path)
+        print(f"warm (in-process engine, model load took {(time.perf_counter() - start) * 1000:.0f} ms once):")
+        _measure(engine, repeat)
+    except TTSError as e:
+        print(f"warm: in-process engine unavailable: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--voice", default="en_US-amy-medium")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.voice, args.repeat)
@@ -0,0 +1,82 @@
+"""
+Timing accuracy and CPU cost of ultrasonic echo measurement, edge callbacks vs. polling.
+
+Drives SensorManager's hardware path against FakeGPIO, which answers every trigger
+pulse with a scripted echo. Accuracy is the measured distance compared with the
+pulse FakeGPIO actually emitted (from its edge log), so scheduling jitter in the
+fake itself is not counted against the measurement. CPU is the thread CPU time of
+the reading thread. Because the fake's edges come from a Python thread, a polling
+reader that holds the GIL can miss short pulses entirely; those reads show up as
+timeouts.
+
+Usage: python benchmarks/bench_ultrasonic.py [--reads 200] [--distances 5 50 150 300]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import LoggingConfig, SensorConfig
+from src.fake_gpio import FakeGPIO
+from src.logging_system import LoggingSystem
+from src.sensors import SPEED_OF_SOUND_CM_S, SensorManager
+
+PINS = {"front_trigger": 2, "front_echo": 3, "left_trigger": 4, "left_echo": 5, "right_trigger": 6, "right_echo": 7}
+
+
+def _emitted_widths(gpio: FakeGPIO, echo_pin: int):
+    """Pulse widths (ns) actually generated on `echo_pin`, in order."""
+    widths, rise = [], None
+    for pin, level, t_ns in gpio.edge_log:
+        if pin != echo_pin:
+            continue
+        if level == gpio.HIGH:
+            rise = t_ns
+        elif rise is not None:
+            widths.append(t_ns - rise)
+            rise = None
+    return widths
+
+
+def run_mode(mode: str, distance: float, reads: int, logger: LoggingSystem):
+    gpio = FakeGPIO()
+    for name in ("front", "left", "right"):
+        gpio.set_echo(PINS[f"{name}_trigger"], PINS[f"{name}_echo"], distance)
+    sensors = SensorManager("raspberry_pi", PINS, logger,
+                            config=SensorConfig(background_sampling=False, echo_timing=mode), gpio=gpio)
+
+    measured = []
+    cpu_start, wall_start = time.thread_time(), time.perf_counter()
+    for _ in range(reads):
+        measured.append(sensors.read_front_sensor())
+    cpu, wall = time.thread_time() - cpu_start, time.perf_counter() - wall_start
+    sensors.cleanup()
+    gpio.close()
+
+    emitted = [w * SPEED_OF_SOUND_CM_S / 2e9 for w in _emitted_widths(gpio, PINS["front_echo"])]
+    errors = [abs(m - e) for m, e in zip(measured, emitted) if m != float('inf')]
+    accuracy = f"error median {statistics.median(errors):.3f} cm, max {max(errors):.3f} cm" if errors else "no echoes measured"
+    print(f"  {mode:5s} {distance:6.1f} cm: {accuracy}; CPU {cpu / wall:6.1%} of the reading thread "
+          f"({cpu / reads * 1000:.3f} ms per read); timeouts {sensors.echo_timeouts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--distances", type=float, nargs="+", default=[5, 50, 150, 300])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = LoggingSystem(log_dir, config=LoggingConfig(log_directory=log_dir, level="WARNING"))
+        for distance in args.distances:
+            for mode in ("edge", "poll"):
+                run_mode(mode, distance, args.reads, logger)
+        logger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+CPU time and word accuracy of Vosk recognition with and without the energy VAD gate.
+
+Each fixture is a 16-bit mono WAV recorded at the recognizer's sample rate, with
+its reference transcript in a sidecar `<name>.txt` file. Fixtures should include
+long stretches of silence/background noise, as the robot hears between commands.
+
+Usage: python benchmarks/bench_vad.py --model models/vosk-model-small-en-in-0.4 fixtures/*.wav
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import vosk
+
+from src.config import AudioConfig
+from src.vad import EnergyVAD
+
+
+def _word_errors(reference, hypothesis):
+    """Levenshtein distance between two word lists."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def recognize(model, path: str, config: AudioConfig, gated: bool):
+    """Runs one fixture through the recognizer the way SpeechToText does. Returns (text, cpu_seconds)."""
+    with wave.open(path, 'rb') as wav:
+        sample_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    recognizer = vosk.KaldiRecognizer(model, sample_rate)
+    vad = EnergyVAD(sample_rate, frame_ms=config.vad_frame_ms, margin_db=config.vad_margin_db,
+                    hangover_ms=config.vad_hangover_ms, preroll_ms=config.vad_preroll_ms,
+                    floor_adapt=config.vad_floor_adapt) if gated else None
+    words = []
+    chunk_bytes = config.chunk_size * 2
+    start = time.process_time()
+    for offset in range(0, len(frames), chunk_bytes):
+        chunk = frames[offset:offset + chunk_bytes]
+        for segment in (vad.process(chunk) if vad else [chunk]):
+            if recognizer.AcceptWaveform(segment):
+                words += json.loads(recognizer.Result()).get("text", "").split()
+            elif not vad:
+                json.loads(recognizer.PartialResult())
+        if vad and vad.segment_ended:
+            words += json.loads(recognizer.FinalResult()).get("text", "").split()
+    words += json.loads(recognizer.FinalResult()).get("text", "").split()
+    return words, time.process_time() - start
+
+
+def run(model_path: str, fixtures):
+    vosk.SetLogLevel(-1)
+    model = vosk.Model(model_path)
+    config = AudioConfig()
+    for gated in (False, True):
+        total_cpu, total_errors, total_words = 0.0, 0, 0
+        for path in fixtures:
+            with open(os.path.splitext(path)[0] + ".txt", 'r', encoding='utf-8') as f:
+                reference = f.read().lower().split()
+            hypothesis, cpu = recognize(model, path, config, gated)
+            errors = _word_errors(reference, hypothesis)
+            total_cpu += cpu
+            total_errors += errors
+            total_words += len(reference)
+            print(f"[{'gated' if gated else 'open '}] {os.path.basename(path):30} cpu {cpu:6.2f}s  "
+                  f"accuracy {1 - errors / max(1, len(reference)):6.1%}  '{' '.join(hypothesis)}'")
+        print(f"[{'gated' if gated else 'open '}] TOTAL cpu {total_cpu:.2f}s, word accuracy {1 - total_errors / max(1, total_words):.1%}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=AudioConfig().vosk_model_path)
+    parser.add_argument("fixtures", nargs="+", help="16-bit mono WAV files with <name>.txt transcripts")
+    args = parser.parse_args()
+    run(args.model, args.fixtures)
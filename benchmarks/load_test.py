@@ -0,0 +1,176 @@
+"""
+HTTP load test for the web dashboard: requests/s and latency per route.
+
+By default it starts the web server twice in a child process, once with Flask's
+development server and once with the pooled production server and static asset
+cache (WebConfig.server / static_cache), using a stand-in robot so only the web
+layer is measured. Each route is then hit by `--clients` keep-alive connections
+for `--seconds`. Use `--url` to test a robot that is already running instead.
+
+Routes: a page, a stylesheet (gzip accepted, as browsers do), a face image, a
+revalidation of the stylesheet with If-None-Match, and GET /api/status.
+
+Usage: python benchmarks/load_test.py [--clients 8] [--seconds 5] [--url http://robot:5000]
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ROUTES = [
+    ("page", "/control.html", {}),
+    ("stylesheet", "/static/css/style2.css", {"Accept-Encoding": "gzip, deflate, br"}),
+    ("image", "/static/images/happy.png", {}),
+    ("revalidate", "/static/css/style2.css", {"Accept-Encoding": "gzip", "If-None-Match": None}),
+    ("api status", "/api/status", {}),
+]
+
+
+def _serve(mode: str, port: int):
+    sys.path.insert(0, ROOT)
+    from src.config import LoggingConfig, WebConfig
+    from src.event_bus import EventBus
+    from src.logging_system import LoggingSystem
+    from src.web_server import WebServer
+
+    log_dir = tempfile.mkdtemp()
+    logger = LoggingSystem(log_dir, config=LoggingConfig(log_directory=log_dir, level="WARNING"))
+    controller = SimpleNamespace(logger=logger, event_bus=EventBus(logger), job_manager=None, command_processor=None,
+                                 sensor_manager=None, motion_executor=None, face_display=None, arbiter=None)
+    if mode == "development":
+        config = WebConfig(server="development", static_cache=False)
+        import logging
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    else:
+        config = WebConfig(server="production")
+    WebServer(controller, config=config).run(host="127.0.0.1", port=port)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(host: str, port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on {host}:{port} did not start")
+
+
+def _etag(host: str, port: int, path: str) -> str:
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.getheader("ETag") or '"none"'
+
+
+def load(host: str, port: int, path: str, headers: dict, clients: int, seconds: float):
+    """Returns (latencies in seconds, response bytes, status codes, elapsed) over all clients."""
+    latencies, sizes, statuses = [], [], {}
+    lock = threading.Lock()
+    start_event = threading.Event()
+    end = [0.0]
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        mine, my_sizes, my_statuses = [], [], {}
+        start_event.wait()
+        while time.perf_counter() < end[0]:
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+                my_statuses["error"] = my_statuses.get("error", 0) + 1
+                continue
+            mine.append(time.perf_counter() - t0)
+            my_sizes.append(len(body))
+            my_statuses[response.status] = my_statuses.get(response.status, 0) + 1
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            sizes.extend(my_sizes)
+            for status, count in my_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    begin = time.perf_counter()
+    end[0] = begin + seconds
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    return latencies, sizes, statuses, time.perf_counter() - begin
+
+
+def run_routes(label: str, host: str, port: int, args):
+    print(f"--- {label} ({args.clients} clients, {args.seconds:.0f} s per route)")
+    for name, path, headers in ROUTES:
+        headers = dict(headers)
+        if "If-None-Match" in headers:
+            headers["If-None-Match"] = _etag(host, port, path)
+        latencies, sizes, statuses, elapsed = load(host, port, path, headers, args.clients, args.seconds)
+        if not latencies:
+            print(f"{name:11s}: no successful requests {statuses}")
+            continue
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"{name:11s}: {len(latencies) / elapsed:7.0f} req/s, p50 {p50:6.1f} ms, p99 {p99:6.1f} ms, "
+              f"{sum(sizes) / len(sizes) / 1024:7.1f} KiB/response, status {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--url", help="Test this running server instead of starting one")
+    parser.add_argument("--serve", nargs=2, metavar=("MODE", "PORT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve[0], int(args.serve[1]))
+        return
+    if args.url:
+        parts = urlsplit(args.url)
+        run_routes(args.url, parts.hostname, parts.port or 80, args)
+        return
+
+    for mode in ("development", "production"):
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, __file__, "--serve", mode, str(port)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_for("127.0.0.1", port)
+            run_routes(f"{mode} server", "127.0.0.1", port, args)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Navigation regression run: the wander/avoid behaviour in many random simulated rooms.
+
+Each episode builds a random room (seeded, so every run is reproducible), drops
+the robot in the middle facing a random way and lets SafetyMonitor's wander
+behaviour drive it for `--seconds` of simulated time (see ScenarioRunner in
+src/simulator.py). Episodes run in parallel worker processes. The exit status is
+1 if more than `--max-collision-rate` of the episodes had a collision, so the
+script can gate CI.
+
+Also reports the ray casting throughput of the simulated sensors.
+
+Usage: python benchmarks/run_scenarios.py [--episodes 1000] [--seconds 60] [--jobs 4] [--max-collision-rate 0.1]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import LoggingConfig
+from src.logging_system import LoggingSystem
+from src.simulator import ScenarioRunner, World
+
+_runner = None
+
+
+def _init_worker(log_dir: str):
+    global _runner
+    logger = LoggingSystem(log_dir, config=LoggingConfig(log_directory=log_dir, level="ERROR"))
+    _runner = ScenarioRunner(logger)
+
+
+def _run(args):
+    seed, seconds = args
+    return _runner.run_episode(seed, seconds)
+
+
+def bench_ray_casting(rays: int = 15, iterations: int = 2000) -> float:
+    """Rays cast per second against a random furnished room."""
+    world = World.random(0)
+    rng = np.random.default_rng(0)
+    origins = rng.uniform(50.0, 250.0, size=(rays, 2))
+    angles = rng.uniform(-np.pi, np.pi, size=rays)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        world.cast(origins, angles, 400.0)
+    return rays * iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=60, help="Simulated seconds per episode")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-collision-rate", type=float, default=0.1,
+                        help="Fail if a larger fraction of episodes has any collision")
+    args = parser.parse_args()
+
+    print(f"ray casting: {bench_ray_casting() / 1e6:.2f} M rays/s for one sampling pass (15 rays), "
+          f"{bench_ray_casting(rays=1500, iterations=50) / 1e6:.2f} M rays/s batched (1500 rays)")
+
+    seeds = range(args.first_seed, args.first_seed + args.episodes)
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as log_dir:
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(log_dir,)) as pool:
+            results = list(pool.map(_run, [(seed, args.seconds) for seed in seeds], chunksize=4))
+    wall = time.perf_counter() - start
+
+    colliding = [r for r in results if r.collisions]
+    sim_seconds = sum(r.sim_seconds for r in results)
+    print(f"{len(results)} episodes of {args.seconds:.0f} s in {wall:.1f} s "
+          f"({sim_seconds / wall:.0f}x real time over {args.jobs} jobs)")
+    print(f"episodes with collisions: {len(colliding)} ({len(colliding) / len(results):.1%}), "
+          f"total collisions {sum(r.collisions for r in results)}")
+    print(f"safety halts per episode: median {statistics.median(r.halts for r in results):.0f}, "
+          f"distance per episode: median {statistics.median(r.distance_cm for r in results):.0f} cm")
+    print(f"closest approach: median {statistics.median(r.min_clearance_cm for r in results):.1f} cm, "
+          f"min {min(r.min_clearance_cm for r in results):.1f} cm")
+    if colliding:
+        print("colliding seeds:", " ".join(str(r.seed) for r in colliding[:20]))
+
+    if len(colliding) > args.max_collision_rate * len(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,14 +20,25 @@ def follow_file(filepath):
         print(f"Error reading initial log content: {e}")
 
     # Now, seek to the end and tail for new lines
-    with open(filepath, "r", encoding="utf-8") as f:
-        f.seek(0, 2)
+    f = open(filepath, "r", encoding="utf-8")
+    f.seek(0, 2)
+    try:
         while True:
             line = f.readline()
-            if not line:
-                time.sleep(0.1)
+            if line:
+                yield line
                 continue
-            yield line
+            # Segmented logs are rotated by renaming; reopen when the path points at a new file
+            try:
+                if os.stat(filepath).st_ino != os.fstat(f.fileno()).st_ino:
+                    f.close()
+                    f = open(filepath, "r", encoding="utf-8")
+                    continue
+            except FileNotFoundError:
+                pass
+            time.sleep(0.1)
+    finally:
+        f.close()
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -8,9 +8,15 @@ import threading
 from src.config import load_config
 from src.logging_system import LoggingSystem
 from src.error_handler import handle_error, RobotError
+from src.event_bus import EventBus
+from src.job_manager import JobManager
 from src.ai_processor import AIProcessor
 from src.motor_controller import MotorController
 from src.sensors import SensorManager
+from src.motion_executor import MotionExecutor
+from src.arbiter import Arbiter
+from src.safety_monitor import SafetyMonitor
+from src.simulator import Simulator
 from src.face_display import FaceDisplay
 from src.speech_to_text import SpeechToText
 from src.text_to_speech import TextToSpeech
@@ -24,6 +30,12 @@ class RobotController:
         self.ai_processor = None
         self.motor_controller = None
         self.sensor_manager = None
+        self.motion_executor = None
+        self.arbiter = None
+        self.safety_monitor = None
+        self.simulator = None
+        self.event_bus = None
+        self.job_manager = None
         self.face_display = None
         self.stt = None
         self.tts = None
@@ -34,7 +46,7 @@ class RobotController:
 
     def launch_log_viewers(self):
         log_dir = os.path.abspath(self.config.logging.log_directory)
-        conversation_log = os.path.join(log_dir, "conversation_log.json")
+        conversation_log = os.path.join(log_dir, "conversation_log.jsonl")
         activity_log = os.path.join(log_dir, "combined_activity.txt")
         log_viewer_script = os.path.abspath("log_viewer.py")
 
@@ -67,19 +79,42 @@ class RobotController:
 
     def initialize_components(self) -> bool:
         try:
-            self.logger = LoggingSystem(self.config.logging.log_directory, self.config.logging.max_log_entries)
+            self.logger = LoggingSystem(self.config.logging.log_directory, self.config.logging.max_log_entries, config=self.config.logging)
             self.logger.log_activity("SYSTEM", "Initializing components...")
+            self.event_bus = EventBus(self.logger, config=self.config.events)
 
             self.tts = TextToSpeech(self.config.audio, self.logger)
             self.launch_log_viewers()
 
-            self.face_display = FaceDisplay(self.config.display.screen_size, self.config.display.faces_directory, self.logger)
+            self.face_display = FaceDisplay(self.config.display.screen_size, self.config.display.faces_directory, self.logger,
+                                            config=self.config.display, event_bus=self.event_bus)
             self.face_display.start()
+            self.tts.add_playback_listener(self.face_display.on_playback)
             
             self.ai_processor = AIProcessor(self.config.ai, self.logger)
-            self.motor_controller = MotorController(self.config.hardware.platform, self.config.hardware.motor_pins, self.logger)
-            self.sensor_manager = SensorManager(self.config.hardware.platform, self.config.hardware.sensor_pins, self.logger)
-            self.stt = SpeechToText(self.config.audio.vosk_model_path, self.config.audio.sample_rate, self.config.audio.chunk_size, self.logger)
+            if self.config.hardware.platform == "simulator":
+                self.simulator = Simulator.from_config(self.config.simulator, self.logger)
+                self.simulator.start()
+            self.motor_controller = MotorController(self.config.hardware.platform, self.config.hardware.motor_pins, self.logger,
+                                                   motor_patterns=self.config.hardware.motor_patterns,
+                                                   enable_pins=self.config.hardware.enable_pins,
+                                                   pwm_frequency=self.config.hardware.pwm_frequency,
+                                                   simulator=self.simulator)
+            self.motion_executor = MotionExecutor(self.motor_controller, self.logger, config=self.config.motion,
+                                                  event_bus=self.event_bus)
+            self.motion_executor.start()
+            # Every command source reaches the motors, face and voice through the arbiter
+            self.arbiter = Arbiter(self.logger, self.motion_executor, face_display=self.face_display, tts=self.tts,
+                                   config=self.config.arbiter)
+            self.sensor_manager = SensorManager(self.config.hardware.platform, self.config.hardware.sensor_pins, self.logger,
+                                                config=self.config.sensors, simulator=self.simulator)
+            # One sampling loop feeds every web client through the bus
+            self.sensor_manager.add_listener(lambda snapshot: self.event_bus.publish("sensors", snapshot.to_dict()))
+            self.sensor_manager.start()
+            self.safety_monitor = SafetyMonitor(self.sensor_manager, self.motion_executor, self.logger, config=self.config.safety,
+                                                arbiter=self.arbiter)
+            self.safety_monitor.start()
+            self.stt = SpeechToText(self.config.audio.vosk_model_path, self.config.audio.sample_rate, self.config.audio.chunk_size, self.logger, config=self.config.audio)
 
             self.command_processor = CommandProcessor(
                 motor_controller=self.motor_controller,
@@ -87,16 +122,23 @@ class RobotController:
                 sensor_manager=self.sensor_manager,
                 face_display=self.face_display,
                 tts=self.tts,
-                logger=self.logger
+                logger=self.logger,
+                motion_executor=self.motion_executor,
+                arbiter=self.arbiter,
+                event_bus=self.event_bus
             )
+            self.stt.set_command_grammar(self.command_processor.command_phrases())
+            self.job_manager = JobManager(self.logger, config=self.config.jobs, event_bus=self.event_bus)
+            self.job_manager.start()
             
             # --- Web Server Integration ---
             self.logger.log_activity("SYSTEM", "Initializing web server...")
-            self.web_server = WebServer(robot_controller=self)
+            self.web_server = WebServer(robot_controller=self, config=self.config.web)
             
-            web_thread = threading.Thread(target=self.web_server.run, daemon=True)
+            web_thread = threading.Thread(target=self.web_server.run, name="WebServerThread", daemon=True)
             web_thread.start()
-            self.logger.log_activity("SYSTEM", "Web server started on http://0.0.0.0:5000")
+            self.logger.log_activity("SYSTEM", "Web server started on http://%s:%d (%s mode)",
+                                     self.config.web.host, self.config.web.port, self.config.web.server)
             # --- End Web Server Integration ---
 
             self.logger.log_activity("SYSTEM", "All components initialized successfully.")
@@ -110,24 +152,24 @@ class RobotController:
     def run_main_loop(self):
         self.running = True
         self.logger.log_activity("SYSTEM", "Starting main loop.")
-        self.face_display.set_face("neutral")
-        self.tts.speak("Hello, I am online and ready.")
+        self.arbiter.set_face("neutral", "system")
+        self.arbiter.speak("Hello, I am online and ready.", "system")
 
         while self.running:
             try:
-                self.face_display.set_face("hearing")
+                self.arbiter.set_face("hearing", "voice")
                 voice_command = self.stt.listen_for_speech()
                 if voice_command:
-                    self.command_processor.process_command(voice_command)
+                    self.command_processor.process_command(voice_command, speech_end_time=self.stt.last_speech_end)
                 if self.running:
-                    self.face_display.set_face("neutral")
+                    self.arbiter.set_face("neutral", "voice")
             except KeyboardInterrupt:
                 self.shutdown()
             except RobotError as e:
                 handle_error(e, self.logger)
-                self.face_display.set_face("confused")
+                self.arbiter.set_face("confused", "voice")
                 time.sleep(2)
-                self.face_display.set_face("neutral")
+                self.arbiter.set_face("neutral", "voice")
 
     def shutdown(self):
         if not self.running:
@@ -141,12 +183,33 @@ class RobotController:
             except Exception as e:
                 self.logger.log_activity("SYSTEM_ERROR", f"Failed to terminate log viewer process: {e}")
 
+        if self.web_server:
+            self.web_server.shutdown()
+        if self.job_manager:
+            self.job_manager.shutdown()
+        if self.event_bus:
+            self.event_bus.close()
+        if self.safety_monitor:
+            self.safety_monitor.cleanup()
+        if self.motion_executor:
+            self.motion_executor.shutdown()
+        if self.arbiter:
+            self.logger.log_activity("ARBITER", f"Arbiter stopped: {self.arbiter.stats_summary()}.")
         if self.motor_controller:
             self.motor_controller.stop()
         if self.face_display:
-            self.face_display.set_face("crashed")
+            if self.arbiter:
+                self.arbiter.set_face("crashed", "shutdown")
+            else:
+                self.face_display.set_face("crashed")
             time.sleep(1)
             self.face_display.stop()
+        if self.sensor_manager:
+            self.sensor_manager.cleanup()
+        if self.simulator:
+            self.simulator.stop()
+        if self.ai_processor:
+            self.ai_processor.cleanup()
         if self.stt:
             self.stt.cleanup()
         if self.tts:
@@ -161,6 +224,9 @@ class RobotController:
                 pass
 
         self.logger.log_activity("SYSTEM", "Shutdown complete.")
+        # Make sure records queued by the async log writer reach the disk before exiting
+        self.logger.flush()
+        self.logger.close()
         sys.exit(0)
 
 if __name__ == "__main__":
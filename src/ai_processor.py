@@ -3,6 +3,7 @@ from .openai_client import OpenAIClient
 from .local_llm import LocalLLM
 from .error_handler import AIError
 from .logging_system import LoggingSystem
+from typing import Iterator, Optional
 import time
 
 # System prompt to define the robot's persona
@@ -51,7 +52,13 @@ class AIProcessor:
                     api_key=config.openai_api_key,
                     base_url=config.openai_api_base,
                     model_name=config.openai_model_name,
-                    logger=self.logger
+                    logger=self.logger,
+                    health_check_ttl=config.health_check_ttl,
+                    failure_threshold=config.circuit_failure_threshold,
+                    reset_timeout=config.circuit_reset_timeout,
+                    max_probe_backoff=config.circuit_max_backoff,
+                    model_cache_path=config.model_cache_path,
+                    model_cache_ttl=config.model_cache_ttl
                 )
                 self._select_and_set_model()
             else:
@@ -124,12 +131,23 @@ class AIProcessor:
                 self.logger.log_activity("AI_PROCESSOR_INFO", "Local LLM not loaded or available. No AI backend could process the request.")
 
         processing_time = time.time() - start_time
+        self._finish_turn(message, response, processing_time, ai_source)
+        return response
+
+    def stream_message(self, message: str) -> 'ResponseStream':
+        """Starts a streamed turn. Iterate the returned stream for text chunks, then call complete()."""
+        return ResponseStream(self, message)
+
+    def _finish_turn(self, message: str, response: str, processing_time: float, ai_source: str, **timings):
         # Append the new user message and AI response to the history
         self.conversation_history.extend([{"role": "user", "content": message}, {"role": "assistant", "content": response}])
         self.trim_conversation_history()
 
-        self.logger.log_conversation(user_input=message, ai_response=response, processing_time=processing_time, ai_source=ai_source)
-        return response
+        self.logger.log_conversation(user_input=message, ai_response=response, processing_time=processing_time, ai_source=ai_source, **timings)
+
+    def cleanup(self):
+        if self.openai_client:
+            self.openai_client.close()
 
     def trim_conversation_history(self):
         # Keep the system prompt and the last `max_exchanges` of user/assistant messages.
@@ -140,3 +158,83 @@ class AIProcessor:
         if len(self.conversation_history) > max_messages + 1:
             # Keep the first message (system prompt) and the last `max_messages`
             self.conversation_history = [self.system_prompt_message] + self.conversation_history[-max_messages:]
+
+
+class ResponseStream:
+    """
+    A single streamed conversational turn.
+
+    Iterating yields response text chunks as the backend generates them, falling
+    back from OpenAI to the local LLM if the primary fails before producing any
+    text. Once the caller has consumed (and spoken) the stream it calls
+    complete() to record the turn in the history and conversation log.
+    """
+    FAILURE_RESPONSE = "I am unable to process your request at the moment."
+
+    def __init__(self, processor: AIProcessor, message: str):
+        self.processor = processor
+        self.message = message
+        self.logger = processor.logger
+        self.ai_source = "none"
+        self.text = ""
+        self.start_time = time.time()
+        self.time_to_first_token: Optional[float] = None
+        self.processing_time: Optional[float] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.ai_source == "none" or not self.text.strip()
+
+    def _backends(self):
+        processor = self.processor
+        if processor.openai_client and processor.openai_client.is_available():
+            yield "openai", processor.openai_client.stream_message
+        else:
+            self.logger.log_activity("AI_PROCESSOR_INFO", "OpenAI client not available or configured. Proceeding to fallback.")
+        if processor.local_llm and processor.local_llm.is_model_loaded():
+            yield "local", processor.local_llm.stream_response
+        else:
+            self.logger.log_activity("AI_PROCESSOR_INFO", "Local LLM not loaded or available.")
+
+    def __iter__(self) -> Iterator[str]:
+        history = self.processor.conversation_history
+        for source, stream_fn in self._backends():
+            self.logger.log_activity("AI_PROCESSOR", f"Streaming response from {source}.")
+            chunks = stream_fn(self.message, history)
+            try:
+                for chunk in chunks:
+                    if self.time_to_first_token is None:
+                        self.time_to_first_token = time.time() - self.start_time
+                    self.ai_source = source
+                    self.text += chunk
+                    yield chunk
+            except AIError as e:
+                if self.text:
+                    # Part of the answer has already been spoken; keep what we have.
+                    self.logger.log_activity("AI_PROCESSOR_WARNING", f"{source} stream failed mid-response: {e}")
+                else:
+                    self.logger.log_activity("AI_PROCESSOR_WARNING", f"{source} stream failed: {e}. Attempting fallback.")
+                    continue
+            finally:
+                # Stops the backend's generation right away if this stream is closed early
+                chunks.close()
+            if self.text:
+                break
+        self.processing_time = time.time() - self.start_time
+
+    def complete(self, time_to_first_audio: Optional[float] = None, spoken: Optional[str] = None):
+        """
+        Records the finished turn, including per-turn latency metrics. `spoken` is what
+        was said before the answer was cut off, recorded instead of the generated text.
+        """
+        if self.processing_time is None:
+            self.processing_time = time.time() - self.start_time
+        if spoken is not None:
+            response = spoken.strip()
+        else:
+            response = self.text.strip() if not self.failed else self.FAILURE_RESPONSE
+        self.processor._finish_turn(
+            self.message, response, self.processing_time, self.ai_source,
+            time_to_first_token=self.time_to_first_token,
+            time_to_first_audio=time_to_first_audio
+        )
@@ -0,0 +1,262 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from .config import ArbiterConfig
+from .motion_executor import MotionCommand, PRIORITY_AUTONOMOUS, PRIORITY_NORMAL, PRIORITY_STOP, PRIORITY_VOICE
+
+if TYPE_CHECKING:
+    from .face_display import FaceDisplay
+    from .logging_system import LoggingSystem
+    from .motion_executor import MotionExecutor
+    from .text_to_speech import TextToSpeech
+
+# Priority classes, highest first. Lower numbers win, as in the motion queue.
+PRIORITY_CLASSES = {
+    "safety": PRIORITY_STOP,
+    "manual": PRIORITY_NORMAL,
+    "voice": PRIORITY_VOICE,
+    "autonomous": PRIORITY_AUTONOMOUS,
+}
+CLASS_NAMES = {priority: name for name, priority in PRIORITY_CLASSES.items()}
+
+
+class ActuatorStats:
+    """Requests, queueing delay and preemptions of one actuator, per priority class."""
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self.requests = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self.preempted = dict.fromkeys(PRIORITY_CLASSES, 0)  # Cut short or dropped by a higher (or, for motions, equal) class
+        self.refused = dict.fromkeys(PRIORITY_CLASSES, 0)  # Never carried out: face held by a higher class, motion expired
+        self.delays: Dict[str, Deque[float]] = {name: deque(maxlen=max(1, window)) for name in PRIORITY_CLASSES}
+
+    def count(self, counter: Dict[str, int], name: str):
+        with self._lock:
+            counter[name] += 1
+
+    def record_delay(self, name: str, seconds: float):
+        with self._lock:
+            self.delays[name].append(seconds)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Per class that has been used: counts and the p50/p95 queueing delay in ms."""
+        result = {}
+        with self._lock:
+            for name in PRIORITY_CLASSES:
+                if not self.requests[name]:
+                    continue
+                delays = sorted(self.delays[name])
+                result[name] = {
+                    "requests": self.requests[name],
+                    "preempted": self.preempted[name],
+                    "refused": self.refused[name],
+                    "queued_ms_p50": round(delays[len(delays) // 2] * 1000, 1) if delays else None,
+                    "queued_ms_p95": round(delays[min(len(delays) - 1, int(len(delays) * 0.95))] * 1000, 1)
+                    if delays else None,
+                }
+        return result
+
+
+class _SpeechTurn:
+    def __init__(self, priority: int, source: str):
+        self.priority = priority
+        self.source = source
+        self.requested_at = time.perf_counter()
+        self.cancel = threading.Event()
+
+
+class Arbiter:
+    """
+    The single way commands reach the actuators: the motors, the face and the voice.
+    Every command names its source ("voice", "web", "api", "safety", "wander", ...),
+    which `source_classes` maps to a priority class: safety > manual (web UI and
+    API) > voice > autonomous. Each actuator has one queue with its own rules:
+
+    - Motors go through the MotionExecutor's priority queue. A motion preempts the
+      running and queued motions of its own class and below, and waits behind
+      higher classes; autonomous motions never preempt. A stop from any source
+      cancels everything, and only the safety class may cap the speed.
+    - Speech is taken in turns, highest class first and in arrival order within a
+      class. With `speech_preemption`, a higher class cuts off the utterance being
+      spoken (the rest of a streamed answer is skipped) instead of waiting for it.
+    - The face belongs to the class that last changed it for `face_hold_seconds`;
+      lower classes' changes are refused meanwhile, so a web chat's faces aren't
+      overwritten by the voice loop.
+
+    Queueing delay (request to start) and preemption counts are kept per actuator
+    and class, reported by `stats()` and logged at shutdown.
+    """
+    def __init__(self, logger: 'LoggingSystem', motion_executor: 'MotionExecutor',
+                 face_display: Optional['FaceDisplay'] = None, tts: Optional['TextToSpeech'] = None,
+                 config: Optional[ArbiterConfig] = None):
+        self.logger = logger
+        self.motion = motion_executor
+        self.face_display = face_display
+        self.tts = tts
+        self.config = config or ArbiterConfig()
+        for source, name in self.config.source_classes.items():
+            if name not in PRIORITY_CLASSES:
+                self.logger.log_activity("ARBITER_WARNING", f"Unknown priority class '{name}' for source '{source}'; "
+                                                            f"using '{self.config.default_class}'.")
+
+        self.motion_stats = ActuatorStats(self.config.stats_window)
+        self.speech_stats = ActuatorStats(self.config.stats_window)
+        self.face_stats = ActuatorStats(self.config.stats_window)
+
+        self._speech_cond = threading.Condition()
+        self._speech_waiting: List[Tuple[int, int, _SpeechTurn]] = []
+        self._speech_sequence = itertools.count()
+        self._speaker: Optional[_SpeechTurn] = None
+
+        self._face_lock = threading.Lock()
+        self._face_owner: Optional[Tuple[int, float]] = None  # (priority, time.monotonic() the hold ends)
+
+        self.motion.add_listener(self._on_motion_done)
+
+    def priority_of(self, source: str) -> int:
+        """The priority of a command source; "web:<client>" counts as "web"."""
+        name = self.config.source_classes.get(source.split(":", 1)[0], self.config.default_class)
+        return PRIORITY_CLASSES.get(name, PRIORITY_CLASSES.get(self.config.default_class, PRIORITY_VOICE))
+
+    # --- Motors ---
+
+    def move(self, action: str, duration: Optional[float], source: str,
+             speed: Union[None, str, float] = None) -> MotionCommand:
+        """Queues a timed motion (None: until stopped or preempted) at the source's priority."""
+        priority = self.priority_of(source)
+        self.motion_stats.count(self.motion_stats.requests, CLASS_NAMES[priority])
+        return self.motion.submit(action, duration, speed=speed, priority=priority, source=source,
+                                  preempt=priority < PRIORITY_AUTONOMOUS)
+
+    def turn(self, direction: str, source: str, angle: float = 90.0,
+             speed: Union[None, str, float] = None) -> MotionCommand:
+        """Queues a spin turn of `angle` degrees at the source's priority."""
+        priority = self.priority_of(source)
+        self.motion_stats.count(self.motion_stats.requests, CLASS_NAMES[priority])
+        return self.motion.submit_turn(direction, angle=angle, speed=speed, priority=priority, source=source,
+                                       preempt=priority < PRIORITY_AUTONOMOUS)
+
+    def stop(self, source: str) -> MotionCommand:
+        """Stops the motors and cancels all queued motions, whoever asks."""
+        self.motion_stats.count(self.motion_stats.requests, CLASS_NAMES[self.priority_of(source)])
+        return self.motion.stop(source=source)
+
+    def set_speed_limit(self, limit: float, source: str) -> bool:
+        """Caps the duty cycle of all motions. Only the safety class may do this."""
+        if self.priority_of(source) != PRIORITY_CLASSES["safety"]:
+            self.logger.log_activity("ARBITER_WARNING", f"Ignored speed limit {limit:.2f} from '{source}'.")
+            return False
+        self.motion.set_speed_limit(limit)
+        return True
+
+    def _on_motion_done(self, command: MotionCommand):
+        name = CLASS_NAMES.get(command.priority, self.config.default_class)
+        if command.started_at is not None:
+            self.motion_stats.record_delay(name, command.started_at - command.created_at)
+        if command.status == "preempted":
+            self.motion_stats.count(self.motion_stats.preempted, name)
+            self.logger.log_activity("ARBITER", "Motion #%d %s from %s preempted %s.", command.command_id,
+                                     command.action, command.source or "unknown source",
+                                     "while running" if command.started_at is not None else "before it started")
+        elif command.status == "expired":
+            self.motion_stats.count(self.motion_stats.refused, name)
+
+    # --- Speech ---
+
+    @contextmanager
+    def _speech_turn(self, source: str) -> Iterator[_SpeechTurn]:
+        turn = _SpeechTurn(self.priority_of(source), source)
+        name = CLASS_NAMES[turn.priority]
+        self.speech_stats.count(self.speech_stats.requests, name)
+        preempted = None
+        with self._speech_cond:
+            heapq.heappush(self._speech_waiting, (turn.priority, next(self._speech_sequence), turn))
+            speaker = self._speaker
+            if self.config.speech_preemption and speaker and turn.priority < speaker.priority \
+                    and not speaker.cancel.is_set():
+                speaker.cancel.set()
+                preempted = speaker
+            while self._speaker is not None or self._speech_waiting[0][2] is not turn:
+                self._speech_cond.wait()
+            heapq.heappop(self._speech_waiting)
+            self._speaker = turn
+        if preempted:
+            self.speech_stats.count(self.speech_stats.preempted, CLASS_NAMES[preempted.priority])
+            self.logger.log_activity("ARBITER", "Speech from %s cut off for %s.", preempted.source, source)
+        self.speech_stats.record_delay(name, time.perf_counter() - turn.requested_at)
+        try:
+            yield turn
+        finally:
+            with self._speech_cond:
+                self._speaker = None
+                self._speech_cond.notify_all()
+
+    def speak(self, text: str, source: str) -> bool:
+        """Says `text` when it is the source's turn. Returns False if a higher class cut it off."""
+        with self._speech_turn(source) as turn:
+            self.tts.speak(text, cancel=turn.cancel)
+            return not turn.cancel.is_set()
+
+    def speak_stream(self, sentences: Iterable[str], source: str,
+                     on_first_audio: Optional[Callable[[], None]] = None) -> Tuple[str, bool]:
+        """
+        Speaks a stream of sentences in one turn; see TextToSpeech.speak_stream. Returns the
+        text spoken, and False if a higher class cut it off.
+        """
+        with self._speech_turn(source) as turn:
+            spoken = self.tts.speak_stream(sentences, on_first_audio=on_first_audio, cancel=turn.cancel)
+            return spoken, not turn.cancel.is_set()
+
+    # --- Face ---
+
+    def set_face(self, face_name: str, source: str) -> bool:
+        """Changes the face unless a higher class changed it within `face_hold_seconds`. Returns whether it did."""
+        priority = self.priority_of(source)
+        name = CLASS_NAMES[priority]
+        self.face_stats.count(self.face_stats.requests, name)
+        now = time.monotonic()
+        with self._face_lock:
+            owner = self._face_owner
+            if owner and now < owner[1]:
+                if priority > owner[0]:
+                    self.face_stats.count(self.face_stats.refused, name)
+                    return False
+                if priority < owner[0]:
+                    self.face_stats.count(self.face_stats.preempted, CLASS_NAMES[owner[0]])
+            self._face_owner = (priority, now + self.config.face_hold_seconds)
+            # Under the lock, so the display's queue sees changes in the order they were granted
+            self.face_display.set_face(face_name)
+        return True
+
+    # --- Reporting ---
+
+    def stats(self) -> Dict[str, Any]:
+        with self._speech_cond:
+            speaking = CLASS_NAMES[self._speaker.priority] if self._speaker else None
+            waiting = len(self._speech_waiting)
+        owner = self._face_owner
+        return {
+            "motors": self.motion_stats.to_dict(),
+            "speech": self.speech_stats.to_dict(),
+            "face": self.face_stats.to_dict(),
+            "speaking": speaking,
+            "speech_waiting": waiting,
+            "face_owner": CLASS_NAMES[owner[0]] if owner and time.monotonic() < owner[1] else None,
+        }
+
+    def stats_summary(self) -> str:
+        parts = []
+        for actuator, stats in (("motors", self.motion_stats), ("speech", self.speech_stats),
+                                ("face", self.face_stats)):
+            classes = stats.to_dict()
+            if not classes:
+                continue
+            parts.append(f"{actuator}: " + ", ".join(
+                f"{name} {c['requests']} requests/{c['preempted']} preempted/{c['refused']} refused"
+                + (f"/p95 wait {c['queued_ms_p95']:.0f} ms" if c['queued_ms_p95'] is not None else "")
+                for name, c in classes.items()))
+        return "; ".join(parts) or "no commands"
@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+import pyaudio
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+
+
+class AudioRingBuffer:
+    """
+    A fixed-size ring buffer of int16 samples, addressed by absolute sample position.
+
+    The writer never blocks. Readers keep their own position; a reader that falls
+    more than `capacity` samples behind has lost audio, which is reported as an
+    overrun and its position is moved forward to the oldest sample still held.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._end = 0  # Absolute position one past the newest sample
+        self._cond = threading.Condition()
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def start(self) -> int:
+        return max(0, self._end - self.capacity)
+
+    def write(self, samples: np.ndarray):
+        total = len(samples)
+        if total > self.capacity:
+            samples = samples[-self.capacity:]
+        n = len(samples)
+        with self._cond:
+            # Write so that the last sample lands at absolute position end + total - 1
+            offset = (self._end + total - n) % self.capacity
+            first = min(n, self.capacity - offset)
+            self._data[offset:offset + first] = samples[:first]
+            self._data[:n - first] = samples[first:]
+            self._end += total
+            self._cond.notify_all()
+
+    def read(self, position: int, max_samples: int, timeout: float) -> Tuple[np.ndarray, int, int]:
+        """
+        Waits up to `timeout` for samples after `position` and returns
+        (samples, new_position, samples_lost_to_overrun).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._end > position, timeout=timeout)
+            lost = 0
+            if position < self.start:
+                lost = self.start - position
+                position = self.start
+            n = min(max_samples, self._end - position)
+            if n <= 0:
+                return np.zeros(0, dtype=np.int16), position, lost
+            offset = position % self.capacity
+            first = min(n, self.capacity - offset)
+            samples = np.concatenate((self._data[offset:offset + first], self._data[:n - first]))
+            return samples, position + n, lost
+
+
+class AudioCapture(threading.Thread):
+    """
+    Owns a single, always-open microphone stream and copies everything it hears
+    into an AudioRingBuffer, so no audio is lost between recognition turns.
+    """
+    def __init__(self, pyaudio_instance: 'pyaudio.PyAudio', sample_rate: int, chunk_size: int,
+                 buffer_seconds: float, logger: 'LoggingSystem'):
+        super().__init__(daemon=True)
+        self.name = "AudioCaptureThread"
+        self.pyaudio_instance = pyaudio_instance
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.logger = logger
+        self.ring = AudioRingBuffer(int(buffer_seconds * sample_rate))
+        self.running = False
+        self.stream: Optional['pyaudio.Stream'] = None
+        self.overruns = 0
+
+    def _open_stream(self):
+        self.stream = self.pyaudio_instance.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            input=True,
+            frames_per_buffer=self.chunk_size
+        )
+
+    def run(self):
+        self.running = True
+        while self.running:
+            try:
+                if self.stream is None:
+                    self._open_stream()
+                    self.logger.log_activity("STT", "Microphone stream opened.")
+                data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+                self.ring.write(np.frombuffer(data, dtype=np.int16))
+            except Exception as e:
+                self.logger.log_activity("STT_ERROR", f"Audio capture error: {e}. Reopening stream.")
+                self._close_stream()
+                time.sleep(0.5)
+        self._close_stream()
+
+    def _close_stream(self):
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+    def position_with_preroll(self, preroll_seconds: float, not_before: int = 0) -> int:
+        """A read position `preroll_seconds` before now, clamped to audio still buffered."""
+        position = self.ring.end - int(preroll_seconds * self.sample_rate)
+        return max(position, self.ring.start, not_before)
+
+    def read(self, position: int, max_samples: int, timeout: float = 1.0) -> Tuple[bytes, int]:
+        """Reads up to `max_samples` of int16 PCM starting at `position`."""
+        samples, position, lost = self.ring.read(position, max_samples, timeout)
+        if lost:
+            self.overruns += 1
+            self.logger.log_activity("STT_WARNING", f"Audio ring buffer overrun: {lost} samples "
+                                                    f"({lost / self.sample_rate:.2f}s) lost, {self.overruns} overruns total.")
+        return samples.tobytes(), position
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout=2)
@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Callable
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker driven by the outcome of real requests.
+
+    - closed:    requests flow; `failure_threshold` consecutive failures open the circuit.
+    - open:      requests are refused without touching the network.
+    - half_open: after `reset_timeout`, a single trial request is let through; its
+                 outcome closes the circuit again or re-opens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 15.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Returns True if a request may be attempted now. Never blocks."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Records a failed request. Returns True if this failure opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                was_open = self._state == self.OPEN
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                return not was_open
+            return False
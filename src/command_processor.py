@@ -1,34 +1,58 @@
 from .motor_controller import MotorController
+from .motion_executor import MotionExecutor
 from .ai_processor import AIProcessor
 from .sensors import SensorManager
 from .face_display import FaceDisplay
 from .text_to_speech import TextToSpeech
-from typing import TYPE_CHECKING
+from .streaming import iter_sentences
+from typing import Callable, Iterable, Iterator, List, Optional, TYPE_CHECKING
+import threading
 import time
 
 if TYPE_CHECKING:
+    from .ai_processor import ResponseStream
+    from .arbiter import Arbiter
+    from .event_bus import EventBus
     from .logging_system import LoggingSystem
 
+# Called with (response text so far, whether generation has finished), before the speech ends
+ResponseCallback = Callable[[str, bool], None]
+
 class CommandProcessor:
-    def __init__(self, motor_controller: MotorController, ai_processor: AIProcessor, sensor_manager: SensorManager, face_display: FaceDisplay, tts: TextToSpeech, logger: 'LoggingSystem'):
+    """
+    Turns voice commands and web/API text into robot actions and answers. Faces,
+    speech and motions go through the arbiter under the source of the input
+    ("voice", or the web/API origin), so the arbiter can order them against
+    commands from other sources.
+    """
+    def __init__(self, motor_controller: MotorController, ai_processor: AIProcessor, sensor_manager: SensorManager, face_display: FaceDisplay, tts: TextToSpeech, logger: 'LoggingSystem',
+                 motion_executor: MotionExecutor, arbiter: 'Arbiter', event_bus: Optional['EventBus'] = None):
         self.motor_controller = motor_controller
+        self.motion_executor = motion_executor
+        self.arbiter = arbiter
         self.ai_processor = ai_processor
         self.sensor_manager = sensor_manager
         self.face_display = face_display
         self.tts = tts
         self.logger = logger
+        self.event_bus = event_bus
+
+    def _publish_turn(self, role: str, text: str, origin: str):
+        """Publishes one side of a conversation turn on the "conversation" topic."""
+        if self.event_bus and text:
+            self.event_bus.publish("conversation", {"role": role, "text": text, "origin": origin})
 
-    def speak_and_wait(self, text: str):
+    def speak_and_wait(self, text: str, source: str = "voice"):
         """Change face to speaking, say the text, and revert to neutral."""
         if text:
-            self.face_display.set_face("speaking")
-            self.tts.speak(text)
-            self.face_display.set_face("neutral")
+            self.arbiter.set_face("speaking", source)
+            self.arbiter.speak(text, source)
+            self.arbiter.set_face("neutral", source)
 
-    def _query_ai(self, text: str) -> str:
+    def _query_ai(self, text: str, source: str) -> str:
         """Sets thinking face, queries AI, and handles response, returning the text."""
         self.logger.log_activity("COMMAND_PROCESSOR", f"Querying AI with: '{text}'")
-        self.face_display.set_face("thinking")
+        self.arbiter.set_face("thinking", source)
         time.sleep(0.5)  # Make sure the thinking face is visible
 
         response_text = self.ai_processor.send_message(text)
@@ -39,72 +63,243 @@ class CommandProcessor:
 
         if is_failure:
             self.logger.log_activity("COMMAND_PROCESSOR", "AI response indicates failure.")
-            self.face_display.set_face("confused")
+            self.arbiter.set_face("confused", source)
             time.sleep(0.5)
             return "I'm sorry, I had trouble with that request."
         
         self.logger.log_activity("COMMAND_PROCESSOR", f"AI responded: '{response_text}'")
         return response_text
 
-    def process_text_input(self, text: str) -> str:
-        """Processes direct text input from the web UI."""
+    @staticmethod
+    def _report_sentences(sentences: Iterable[str], stream: 'ResponseStream',
+                          on_response: ResponseCallback) -> Iterator[str]:
+        """Passes sentences through to TTS, reporting the text generated so far as each one arrives."""
+        generated = []
+        for sentence in sentences:
+            generated.append(sentence)
+            on_response(" ".join(generated), False)
+            yield sentence
+        if not stream.failed:
+            on_response(" ".join(generated), True)
+
+    def _stream_ai_and_speak(self, text: str, turn_start: float, on_response: Optional[ResponseCallback] = None,
+                             source: str = "voice") -> str:
+        """
+        Streams the AI response sentence by sentence into TTS, so the first sentence is
+        spoken while the rest is still being generated. Logs time-to-first-audio,
+        measured from `turn_start` (end of the user's speech), with the turn.
+        """
+        self.logger.log_activity("COMMAND_PROCESSOR", f"Streaming AI response for: '{text}'")
+        self.arbiter.set_face("thinking", source)
+
+        stream = self.ai_processor.stream_message(text)
+        chunks = iter(stream)
+        first_audio_at = []
+        finished = threading.Event()
+
+        def on_first_audio():
+            first_audio_at.append(time.perf_counter())
+            self.arbiter.set_face("speaking", source)
+
+        sentences = iter_sentences(chunks)
+        if on_response:
+            sentences = self._report_sentences(sentences, stream, on_response)
+
+        def generate() -> Iterator[str]:
+            # Runs on the TTS producer thread, which closes it early if the turn is cut off
+            try:
+                yield from sentences
+            finally:
+                chunks.close()
+                finished.set()
+
+        spoken_text, completed = self.arbiter.speak_stream(generate(), source, on_first_audio=on_first_audio)
+        # The stream is only recorded once nothing can still be appending to it
+        finished.wait()
+        time_to_first_audio = first_audio_at[0] - turn_start if first_audio_at else None
+
+        if not completed:
+            self.logger.log_activity("COMMAND_PROCESSOR", "Streamed AI response from %s cut off after %d of %d "
+                                     "characters.", source, len(spoken_text), len(stream.text))
+            stream.complete(time_to_first_audio=time_to_first_audio, spoken=spoken_text)
+            if on_response:
+                on_response(spoken_text, True)
+            return spoken_text
+
+        stream.complete(time_to_first_audio=time_to_first_audio)
+
+        if stream.failed:
+            self.logger.log_activity("COMMAND_PROCESSOR", "AI response indicates failure.")
+            self.arbiter.set_face("confused", source)
+            response_text = "I'm sorry, I had trouble with that request."
+            if on_response:
+                on_response(response_text, True)
+            self.speak_and_wait(response_text, source)
+            return response_text
+
+        if time_to_first_audio is not None:
+            self.logger.log_activity("TURN_LATENCY", f"Time to first audio: {time_to_first_audio * 1000:.0f} ms "
+                                                     f"(first token: {(stream.time_to_first_token or 0) * 1000:.0f} ms)")
+        self.arbiter.set_face("neutral", source)
+        return spoken_text or stream.text
+
+    def _respond_with_ai(self, text: str, turn_start: Optional[float] = None,
+                         on_response: Optional[ResponseCallback] = None, source: str = "voice") -> str:
+        """
+        Answers free-form input with the AI, streamed into TTS when enabled. `on_response`
+        receives the text as soon as it is generated, while it is still being spoken.
+        """
+        if turn_start is None:
+            turn_start = time.perf_counter()
+        if self.ai_processor.config.stream_responses:
+            return self._stream_ai_and_speak(text, turn_start, on_response, source)
+        response_text = self._query_ai(text, source)
+        if on_response:
+            on_response(response_text, True)
+        self.speak_and_wait(response_text, source)
+        return response_text
+
+    # --- Command handlers. Each takes the command text and returns the text to speak, or None. ---
+
+    # Speed modifiers accepted after a movement phrase, e.g. "go forward slowly"
+    SPEED_WORDS = {"slowly": "slow", "slow": "slow", "quickly": "fast", "fast": "fast"}
+
+    @classmethod
+    def parse_speed(cls, command_text: str) -> Optional[str]:
+        """Returns "slow" or "fast" if the command asks for it, else None (normal speed)."""
+        for word in command_text.split():
+            if word in cls.SPEED_WORDS:
+                return cls.SPEED_WORDS[word]
+        return None
+
+    def _move(self, action: str, command_text: str):
+        """Hands the motion to the motion thread and returns without waiting for it."""
+        speed = self.parse_speed(command_text)
+        if action in ("left", "right"):
+            self.arbiter.turn(action, "voice", speed=speed)
+        else:
+            self.arbiter.move(action, self.motion_executor.config.voice_move_duration, "voice", speed=speed)
+
+    def _cmd_forward(self, command_text: str) -> Optional[str]:
+        self.arbiter.set_face("thinking", "voice")
+        if self.sensor_manager.is_path_clear("forward"):
+            self.arbiter.set_face("happy", "voice")
+            self._move("forward", command_text)
+            return None
+        self.arbiter.set_face("confused", "voice")
+        return "I can't move forward, there is an obstacle in my way."
+
+    def _cmd_backward(self, command_text: str) -> Optional[str]:
+        self.arbiter.set_face("happy", "voice")
+        self._move("backward", command_text)
+        return None
+
+    def _cmd_left(self, command_text: str) -> Optional[str]:
+        self.arbiter.set_face("thinking", "voice")
+        if self.sensor_manager.is_path_clear("left"):
+            self.arbiter.set_face("happy", "voice")
+            self._move("left", command_text)
+            return None
+        self.arbiter.set_face("confused", "voice")
+        return "I can't turn left, there is something in the way."
+
+    def _cmd_right(self, command_text: str) -> Optional[str]:
+        self.arbiter.set_face("thinking", "voice")
+        if self.sensor_manager.is_path_clear("right"):
+            self.arbiter.set_face("happy", "voice")
+            self._move("right", command_text)
+            return None
+        self.arbiter.set_face("confused", "voice")
+        return "I can't turn right, there is something in the way."
+
+    def _cmd_stop(self, command_text: str) -> Optional[str]:
+        self.arbiter.stop("voice")
+        self.arbiter.set_face("neutral", "voice")
+        return None
+
+    def _cmd_status(self, command_text: str) -> Optional[str]:
+        self.arbiter.set_face("thinking", "voice")
+        distances = self.sensor_manager.get_all_distances()
+        return f"My sensors detect the following distances: Front {distances['front']:.1f} cm, Left {distances['left']:.1f} cm, and Right {distances['right']:.1f} cm."
+
+    # Trigger phrases and their handlers, in match priority order. This table is also
+    # the vocabulary of the speech recognizer's constrained-grammar fast path.
+    COMMANDS = [
+        # Movement Commands
+        (("go forward", "move forward"), _cmd_forward),
+        (("go backward", "move backward"), _cmd_backward),
+        (("turn left",), _cmd_left),
+        (("turn right",), _cmd_right),
+        (("stop",), _cmd_stop),
+        # System Commands
+        (("status",), _cmd_status),
+    ]
+
+    # Commands that accept a speed modifier
+    MOVEMENT_HANDLERS = (_cmd_forward, _cmd_backward, _cmd_left, _cmd_right)
+
+    @classmethod
+    def command_phrases(cls) -> List[str]:
+        """All trigger phrases the processor recognizes without the AI, with speed variants."""
+        phrases_out = []
+        for phrases, handler in cls.COMMANDS:
+            for phrase in phrases:
+                phrases_out.append(phrase)
+                if handler in cls.MOVEMENT_HANDLERS:
+                    phrases_out += [f"{phrase} {word}" for word in cls.SPEED_WORDS]
+        return phrases_out
+
+    @classmethod
+    def match_command(cls, command_text: str) -> Optional[Callable[['CommandProcessor', str], Optional[str]]]:
+        """Returns the handler for the first command whose phrase occurs in the text."""
+        for phrases, handler in cls.COMMANDS:
+            if any(phrase in command_text for phrase in phrases):
+                return handler
+        return None
+
+    def process_text_input(self, text: str, origin: str = "web", on_response: Optional[ResponseCallback] = None) -> str:
+        """
+        Processes direct text input from the web UI and returns once the answer has been
+        spoken. The robot's turn is published as soon as its text is known.
+        """
         if not text:
             return ""
-        
-        response_text = self._query_ai(text)
-        self.speak_and_wait(response_text)
+
+        self._publish_turn("user", text, origin)
+        published = []
+
+        def responded(response_text: str, final: bool):
+            if final and not published:
+                published.append(True)
+                self._publish_turn("robot", response_text, origin)
+            if on_response:
+                on_response(response_text, final)
+
+        response_text = self._respond_with_ai(text, on_response=responded, source=origin)
+        if not published:
+            self._publish_turn("robot", response_text, origin)
         return response_text
 
-    def process_command(self, command_text: str):
+    def process_command(self, command_text: str, speech_end_time: Optional[float] = None):
+        """
+        Processes a recognized voice command. `speech_end_time` is the perf_counter()
+        timestamp at which the user stopped speaking, used for latency metrics.
+        """
         if not command_text:
             return
             
         command_text = command_text.lower().strip()
         self.logger.log_activity("COMMAND_PROCESSOR", f"Processing command: '{command_text}'")
+        self._publish_turn("user", command_text, "voice")
 
-        response_text = None
-
-        # Movement Commands
-        if any(cmd in command_text for cmd in ["go forward", "move forward"]):
-            self.face_display.set_face("thinking")
-            if self.sensor_manager.is_path_clear("forward"):
-                self.face_display.set_face("happy")
-                self.motor_controller.move_forward(duration=2)
-            else:
-                self.face_display.set_face("confused")
-                response_text = "I can't move forward, there is an obstacle in my way."
-        elif any(cmd in command_text for cmd in ["go backward", "move backward"]):
-            self.face_display.set_face("happy")
-            self.motor_controller.move_backward(duration=2)
-        elif "turn left" in command_text:
-            self.face_display.set_face("thinking")
-            if self.sensor_manager.is_path_clear("left"):
-                self.face_display.set_face("happy")
-                self.motor_controller.turn_left(angle=90)
-            else:
-                self.face_display.set_face("confused")
-                response_text = "I can't turn left, there is something in the way."
-        elif "turn right" in command_text:
-            self.face_display.set_face("thinking")
-            if self.sensor_manager.is_path_clear("right"):
-                self.face_display.set_face("happy")
-                self.motor_controller.turn_right(angle=90)
-            else:
-                self.face_display.set_face("confused")
-                response_text = "I can't turn right, there is something in the way."
-        elif "stop" in command_text:
-            self.motor_controller.stop()
-            self.face_display.set_face("neutral")
-        
-        # System Commands
-        elif "status" in command_text:
-            self.face_display.set_face("thinking")
-            distances = self.sensor_manager.get_all_distances()
-            response_text = f"My sensors detect the following distances: Front {distances['front']:.1f} cm, Left {distances['left']:.1f} cm, and Right {distances['right']:.1f} cm."
-        
+        handler = self.match_command(command_text)
+        if handler:
+            response_text = handler(self, command_text)
         # Fallback to AI
         else:
-            response_text = self._query_ai(command_text)
+            response_text = None
+            self._publish_turn("robot", self._respond_with_ai(command_text, speech_end_time), "voice")
 
         if response_text:
+            self._publish_turn("robot", response_text, "voice")
             self.speak_and_wait(response_text)
@@ -1,6 +1,6 @@
 import json
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Tuple
 
 @dataclass
 class AudioConfig:
@@ -8,6 +8,36 @@ class AudioConfig:
     piper_voice: str = "en_US-amy-medium"
     sample_rate: int = 16000
     chunk_size: int = 4096
+    tts_prefetch_sentences: int = 2
+    persistent_stream: bool = True
+    ring_buffer_seconds: float = 10.0
+    preroll_seconds: float = 0.5
+    vad_enabled: bool = True
+    vad_frame_ms: int = 30
+    vad_margin_db: float = 10.0
+    vad_hangover_ms: int = 500
+    vad_preroll_ms: int = 300
+    vad_floor_adapt: float = 0.05
+    max_utterance_seconds: float = 20.0  # Speech extends listen_for_speech's silence timeout by at most this much
+    partial_result_interval: float = 0.5
+    grammar_fast_path: bool = True
+    grammar_min_confidence: float = 0.85
+    tts_engine: str = "auto"  # "auto", "inprocess" or "cli"
+    tts_cache_enabled: bool = True
+    tts_cache_directory: str = "cache/tts"
+    tts_cache_disk_budget_mb: float = 50.0
+    tts_cache_memory_budget_mb: float = 16.0
+    tts_cache_max_chars: int = 200
+    lip_sync_frame_ms: int = 40  # Frame length of the RMS envelope that drives the mouth; cached with the audio
+    tts_prewarm_phrases: List[str] = field(default_factory=lambda: [
+        "Hello, I am online and ready.",
+        "I'm sorry, I had trouble with that request.",
+        "I can't move forward, there is an obstacle in my way.",
+        "I can't turn left, there is something in the way.",
+        "I can't turn right, there is something in the way.",
+        "Command not recognized.",
+        "Executing.",
+    ])
 
 @dataclass
 class AIConfig:
@@ -17,29 +47,190 @@ class AIConfig:
     local_model_path: str = "models/local-model.gguf"
     max_context_length: int = 4096
     temperature: float = 0.7
+    health_check_ttl: float = 30.0
+    circuit_failure_threshold: int = 3
+    circuit_reset_timeout: float = 15.0
+    circuit_max_backoff: float = 120.0
+    model_cache_path: str = "cache/openai_models.json"
+    model_cache_ttl: float = 86400.0
+    stream_responses: bool = True
 
 @dataclass
 class HardwareConfig:
-    platform: str = "windows"
+    platform: str = "windows"  # "windows" (print-only simulation), "simulator" (2D world) or "raspberry_pi"
     motor_pins: Dict[str, List[int]] = field(default_factory=dict)
     sensor_pins: Dict[str, int] = field(default_factory=dict)
+    # Extra or overriding motions: name -> {wheel: 1 | -1 | 0 | "brake"}
+    motor_patterns: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Wheel -> H-bridge enable pin driven with PWM for speed control
+    enable_pins: Dict[str, int] = field(default_factory=dict)
+    pwm_frequency: int = 1000
+
+@dataclass
+class MotionConfig:
+    tick_seconds: float = 0.02  # Motion thread scheduling granularity
+    start_deadline: float = 2.0  # Queued motions that can't start within this many seconds are dropped
+    history_size: int = 256  # Finished commands kept for status polling
+    web_move_duration: float = 0.5
+    voice_move_duration: float = 2.0
+    seconds_per_90_degrees: float = 1.0  # At full speed, not counting ramps
+    default_speed: float = 0.7
+    slow_speed: float = 0.4
+    fast_speed: float = 1.0
+    acceleration: float = 3.0  # Duty cycle change per second during ramps; 0 disables ramps
+
+@dataclass
+class SensorConfig:
+    background_sampling: bool = True
+    sample_rate_hz: float = 10.0
+    max_snapshot_age: float = 0.5  # Older snapshots fall back to a blocking read
+    front_obstacle_cm: float = 20.0
+    side_obstacle_cm: float = 15.0
+    echo_timing: str = "edge"  # "edge" (GPIO edge callbacks) or "poll"
+    echo_timeout_ms: float = 30.0  # About 5 m of round trip
+    sensor_timeouts_ms: Dict[str, float] = field(default_factory=dict)  # Per-sensor overrides
+    ping_gap_ms: float = 10.0  # Quiet time between consecutive pings to avoid crosstalk
+    firing_order: List[str] = field(default_factory=lambda: ["front", "left", "right"])
+    filter_window: int = 16
+    filter_chain: List[str] = field(default_factory=lambda: ["outlier", "median", "ema"])
+    median_size: int = 5
+    ema_alpha: float = 0.4
+    max_rate_cm_s: float = 150.0  # Faster changes are treated as outliers until confirmed
+    velocity_window: int = 8
+    max_range_cm: float = 400.0  # Missing echoes read as this distance
+    obstacle_lookahead_s: float = 0.3
+    obstacle_margin_sigma: float = 1.0
+
+@dataclass
+class SafetyConfig:
+    enabled: bool = True
+    stop_distance_cm: float = 20.0  # Halt when the front reading falls inside this
+    slow_distance_cm: float = 60.0  # Cap the speed between here and stop_distance_cm
+    min_speed: float = 0.25  # Speed cap just outside stop_distance_cm
+    time_to_collision_s: float = 0.4  # Halt when closing faster than this allows
+    margin_sigma: float = 1.0  # Standard deviations of sensor noise subtracted from distances
+    wander_enabled: bool = False
+    wander_speed: float = 0.5
+    wander_leg_seconds: float = 1.5
+    wander_turn_angle: float = 45.0
+    wander_idle_seconds: float = 3.0  # Wandering resumes after other commands have been idle this long
+    wander_tick: float = 0.1
+
+@dataclass
+class SimulatorConfig:
+    world_file: str = ""  # JSON world (see src/simulator.py); empty: a furnished 3 m room
+    seed: int = 0
+    start_pose: List[float] = field(default_factory=lambda: [150.0, 150.0, 0.0])  # x cm, y cm, heading deg
+    wheel_speed_cm_s: float = 50.0  # Wheel surface speed at 100% duty
+    track_width_cm: float = 15.0
+    robot_radius_cm: float = 10.0
+    # Sensor name -> mounting angle in degrees, counter-clockwise from straight ahead
+    sensor_angles: Dict[str, float] = field(default_factory=lambda: {"front": 0.0, "left": 60.0, "right": -60.0})
+    beam_width_deg: float = 30.0  # HC-SR04: about 15 degrees either side of its axis
+    beam_rays: int = 5
+    max_range_cm: float = 400.0
+    noise_cm: float = 0.5
+    noise_fraction: float = 0.01
+    spike_probability: float = 0.01
+    dropout_probability: float = 0.02
+    step_seconds: float = 0.01  # Physics step
+    time_scale: float = 1.0  # Simulated seconds per real second when running live
 
 @dataclass
 class DisplayConfig:
     screen_size: Tuple[int, int] = (800, 600)
     faces_directory: str = "Faces"
+    face_cache_directory: str = "cache/faces"  # Pre-scaled raw face pixels, keyed by size and PNG mtime; "" disables
+    lazy_faces: List[str] = field(default_factory=lambda: ["crashed"])  # Loaded on first use instead of at startup
+    lazy_face_memory_mb: float = 4.0  # Budget for loaded lazy faces, least recently used evicted first
+    event_poll_seconds: float = 0.1  # Longest the display thread blocks before handling window events
+    partial_updates: bool = True  # Push only the region that differs between faces
+    diff_tolerance: int = 16  # Per-channel differences up to this are treated as unchanged (image noise)
+    continuous_redraw: bool = False  # Legacy 20 FPS full redraw, for comparison
+    stats_interval: float = 60.0  # Seconds between DISPLAY_STATS log lines; 0 disables them
+    animation_enabled: bool = True  # Blinking, keyframed animations and lip-sync
+    animation_max_fps: float = 25.0
+    animation_cpu_budget: float = 0.1  # Fraction of one core animation drawing may use; lowers the frame rate if exceeded
+    blink_faces: List[str] = field(default_factory=lambda: ["neutral"])  # Base faces that blink while idle
+    blink_interval: Tuple[float, float] = (2.5, 7.0)  # Random seconds between blinks
+    mouth_frames: List[str] = field(default_factory=lambda: ["neutral", "speaking_alt", "speaking"])  # Closed to wide open
+    mouth_open_threshold: float = 0.2  # Envelope level (0..1) below which the mouth is drawn closed
+    speaking_face: str = "speaking"  # Base face shown with a closed mouth between utterances
+    lip_sync_offset: float = 0.0  # Seconds to delay the mouth by, to match audio output latency
+    animations: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # name -> {"keyframes": [[t, face], ...], "loop": bool}
+
+@dataclass
+class EventsConfig:
+    client_queue_size: int = 100  # Events buffered per web client before the oldest are dropped
+    rate_limits: Dict[str, float] = field(default_factory=lambda: {"sensors": 4.0})  # Max events/s per topic
+    coalesce_topics: List[str] = field(default_factory=lambda: ["sensors"])  # A client only keeps the latest of these
+    keepalive_seconds: float = 15.0  # Comment line sent to idle event streams
+
+@dataclass
+class WebConfig:
+    host: str = "0.0.0.0"
+    port: int = 5000
+    server: str = "production"  # "production" (pooled threaded WSGI server) or "development" (Flask's app.run)
+    threads: int = 16  # Request threads in production mode; /api/events streams run on their own threads
+    max_event_streams: int = 16  # Open /api/events streams; more are answered with 503
+    listen_backlog: int = 64
+    keepalive_timeout: float = 5.0  # Idle keep-alive connections are closed after this many seconds
+    static_cache: bool = True  # Serve pages and static/ from memory with validators and compressed variants
+    static_max_age: int = 3600  # Cache-Control max-age for static/ files, in seconds
+    html_max_age: int = 0  # Pages are revalidated (ETag) on every load by default
+    static_memory_max_file_kb: int = 256  # Larger files (the face PNGs) stay on disk but keep their validators
+    compress_min_bytes: int = 512  # Smaller text assets are not worth compressing
+
+@dataclass
+class JobsConfig:
+    workers: int = 1  # Chat jobs handled at once; the robot has one voice, so more only overlaps AI generation
+    max_queued: int = 8  # Jobs waiting for a worker before new ones are refused with 503
+    history_size: int = 100  # Finished jobs kept for GET /api/jobs/<job_id>
+
+@dataclass
+class ArbiterConfig:
+    # Command source (the part before ":" in e.g. "web:<client>") -> priority class:
+    # "safety" > "manual" > "voice" > "autonomous"
+    source_classes: Dict[str, str] = field(default_factory=lambda: {
+        "safety": "safety", "shutdown": "safety", "web": "manual", "api": "manual",
+        "voice": "voice", "system": "voice", "wander": "autonomous",
+    })
+    default_class: str = "voice"  # For sources not listed above
+    face_hold_seconds: float = 3.0  # After a face change, lower classes can't change the face for this long
+    speech_preemption: bool = True  # A higher class cuts off the utterance playing instead of waiting for it
+    stats_window: int = 200  # Queueing delays kept per actuator and class for percentiles
 
 @dataclass
 class LoggingConfig:
     log_directory: str = "logs"
     max_log_entries: int = 1000
+    segment_max_entries: int = 250
+    segment_max_bytes: int = 262144
+    tail_index_size: int = 100
+    async_writes: bool = False
+    queue_capacity: int = 4096
+    flush_interval: float = 0.2
+    fsync_policy: str = "never"  # "never", "batch" or "interval"
+    fsync_interval: float = 5.0
+    overflow_policy: str = "drop"  # "drop", "block" or "coalesce"
+    block_timeout: float = 0.5
+    level: str = "INFO"  # "DEBUG", "INFO", "WARNING" or "ERROR"
+    category_levels: Dict[str, str] = field(default_factory=dict)
 
 @dataclass
 class RobotConfig:
     audio: AudioConfig = field(default_factory=AudioConfig)
     ai: AIConfig = field(default_factory=AIConfig)
     hardware: HardwareConfig = field(default_factory=HardwareConfig)
+    sensors: SensorConfig = field(default_factory=SensorConfig)
+    motion: MotionConfig = field(default_factory=MotionConfig)
+    safety: SafetyConfig = field(default_factory=SafetyConfig)
+    simulator: SimulatorConfig = field(default_factory=SimulatorConfig)
     display: DisplayConfig = field(default_factory=DisplayConfig)
+    events: EventsConfig = field(default_factory=EventsConfig)
+    jobs: JobsConfig = field(default_factory=JobsConfig)
+    web: WebConfig = field(default_factory=WebConfig)
+    arbiter: ArbiterConfig = field(default_factory=ArbiterConfig)
     logging: LoggingConfig = field(default_factory=LoggingConfig)
 
     @classmethod
@@ -57,7 +248,15 @@ class RobotConfig:
                 audio=AudioConfig(**config_data.get("audio", {})),
                 ai=AIConfig(**config_data.get("ai", {})),
                 hardware=HardwareConfig(**config_data.get("hardware", {})),
+                sensors=SensorConfig(**config_data.get("sensors", {})),
+                motion=MotionConfig(**config_data.get("motion", {})),
+                safety=SafetyConfig(**config_data.get("safety", {})),
+                simulator=SimulatorConfig(**config_data.get("simulator", {})),
                 display=DisplayConfig(**display_config),
+                events=EventsConfig(**config_data.get("events", {})),
+                jobs=JobsConfig(**config_data.get("jobs", {})),
+                web=WebConfig(**config_data.get("web", {})),
+                arbiter=ArbiterConfig(**config_data.get("arbiter", {})),
                 logging=LoggingConfig(**config_data.get("logging", {}))
             )
         except FileNotFoundError:
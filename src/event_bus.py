@@ -0,0 +1,162 @@
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, TYPE_CHECKING
+
+from .config import EventsConfig
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+
+
+@dataclass(frozen=True)
+class Event:
+    topic: str  # "face", "sensors", "motion" or "conversation"
+    data: Dict[str, Any]
+    sequence: int
+    timestamp: float = field(default_factory=time.time)
+
+    def to_sse(self) -> str:
+        """The event in Server-Sent Events wire format."""
+        payload = json.dumps({"timestamp": self.timestamp, **self.data}, default=str)
+        return f"id: {self.sequence}\nevent: {self.topic}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """
+    One client's bounded event queue. Events of a coalesced topic replace the one
+    still waiting in the queue, so a slow client gets the latest sensor values
+    rather than a backlog; when the queue is full, the oldest event is dropped.
+    """
+    def __init__(self, topics: Optional[Iterable[str]], maxsize: int, coalesce_topics: Iterable[str]):
+        self.topics: Optional[Set[str]] = set(topics) if topics is not None else None
+        self.maxsize = max(1, maxsize)
+        self.coalesce_topics = set(coalesce_topics)
+        self._cond = threading.Condition()
+        self._events: Deque[Event] = deque()
+        self.closed = False
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def wants(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+    def offer(self, event: Event):
+        with self._cond:
+            if self.closed:
+                return
+            if event.topic in self.coalesce_topics:
+                for i, queued in enumerate(self._events):
+                    if queued.topic == event.topic:
+                        self._events[i] = event
+                        self.coalesced += 1
+                        return
+            if len(self._events) >= self.maxsize:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """The next event, or None after `timeout` seconds or once closed."""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            if not self._events:
+                return None
+            self.delivered += 1
+            return self._events.popleft()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for robot state: face changes, sensor snapshots,
+    motion commands and conversation turns. Publishers never block on clients:
+    each subscriber has its own bounded queue (see Subscription).
+
+    Topics in `rate_limits` are thinned at the source to at most that many events
+    per second, so sensor data costs the same however many clients are connected.
+    The latest event per topic is always kept (throttled or not) for `snapshot()`
+    and is replayed to each new subscriber so it starts with the current state.
+    """
+    def __init__(self, logger: 'LoggingSystem', config: Optional[EventsConfig] = None):
+        self.logger = logger
+        self.config = config or EventsConfig()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._subscribers: List[Subscription] = []
+        self._latest: Dict[str, Event] = {}
+        self._last_sent: Dict[str, float] = {}
+        self.published = 0
+        self.throttled = 0
+
+    def publish(self, topic: str, data: Dict[str, Any]) -> Event:
+        now = time.monotonic()
+        event = Event(topic, data, next(self._sequence))
+        with self._lock:
+            self._latest[topic] = event
+            rate = self.config.rate_limits.get(topic)
+            if rate and now - self._last_sent.get(topic, float('-inf')) < 1.0 / rate:
+                self.throttled += 1
+                return event
+            self._last_sent[topic] = now
+            self.published += 1
+            subscribers = [sub for sub in self._subscribers if sub.wants(topic)]
+        for subscriber in subscribers:
+            subscriber.offer(event)
+        return event
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, replay: bool = True) -> Subscription:
+        subscription = Subscription(topics, self.config.client_queue_size, self.config.coalesce_topics)
+        with self._lock:
+            self._subscribers.append(subscription)
+            current = sorted(self._latest.values(), key=lambda event: event.sequence) if replay else []
+        for event in current:
+            if subscription.wants(event.topic):
+                subscription.offer(event)
+        self.logger.log_activity("EVENTS", "Client subscribed (%d connected).", len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+        self.logger.log_activity("EVENTS", "Client unsubscribed after %d events, %d coalesced, %d dropped "
+                                           "(%d connected).", subscription.delivered, subscription.coalesced,
+                                 subscription.dropped, len(self._subscribers))
+
+    def latest(self, topic: str) -> Optional[Dict[str, Any]]:
+        event = self._latest.get(topic)
+        return event.data if event else None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """The latest data of every topic."""
+        with self._lock:
+            return {topic: event.data for topic, event in self._latest.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "throttled": self.throttled,
+            "coalesced": sum(sub.coalesced for sub in subscribers),
+            "dropped": sum(sub.dropped for sub in subscribers),
+        }
+
+    def close(self):
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription.close()
@@ -0,0 +1,172 @@
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import DisplayConfig
+
+
+def rms_envelope(pcm: bytes, sample_rate: int, frame_seconds: float) -> np.ndarray:
+    """
+    Loudness of 16-bit mono PCM per `frame_seconds` frame, as float32 in 0..1. Each
+    utterance is normalised to its own 95th percentile so quiet and loud voices
+    animate alike; the floor keeps near-silence from being amplified into chatter.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    frame = max(1, int(sample_rate * frame_seconds))
+    frames = -(-len(samples) // frame)
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    padded = np.zeros(frames * frame, dtype=np.float32)
+    padded[:len(samples)] = samples
+    rms = np.sqrt(np.mean(padded.reshape(frames, frame) ** 2, axis=1))
+    reference = max(float(np.percentile(rms, 95)), 500.0)
+    return np.clip(rms / reference, 0.0, 1.0).astype(np.float32)
+
+
+@dataclass(frozen=True)
+class Animation:
+    """
+    A keyframed sprite sequence: (seconds from the start, face) pairs, where a face of
+    None shows the base face. The last keyframe marks the end (or the loop point).
+    """
+    keyframes: Tuple[Tuple[float, Optional[str]], ...]
+    loop: bool = False
+
+    @classmethod
+    def from_config(cls, spec: Sequence[Sequence], loop: bool = False) -> 'Animation':
+        return cls(tuple((float(t), face) for t, face in spec), loop)
+
+    @property
+    def duration(self) -> float:
+        return self.keyframes[-1][0] if self.keyframes else 0.0
+
+    def frame_at(self, t: float) -> Tuple[Optional[str], Optional[float]]:
+        """(face at `t` seconds in, seconds-in of the next keyframe), or (None, None) once finished."""
+        if self.loop and self.duration > 0:
+            cycle_start = (t // self.duration) * self.duration
+            t -= cycle_start
+        else:
+            cycle_start = 0.0
+            if t >= self.duration:
+                return None, None
+        face = None
+        for start, keyframe_face in self.keyframes:
+            if start > t:
+                return face, cycle_start + start
+            face = keyframe_face
+        return face, cycle_start + self.duration
+
+
+BLINK = Animation(((0.0, "blink"), (0.15, None)))
+
+
+class FaceAnimator:
+    """
+    Decides which face image to show at any moment. No pygame here: the display
+    thread asks `frame(now)` for the face and the time it next changes, and sleeps
+    until then. Layers, highest first:
+
+    - lip-sync: while speech plays, the mouth frame follows the audio's RMS envelope
+      (`mouth_frames`, ordered from closed to wide open);
+    - a one-shot or looping keyframed animation started with `play`;
+    - idle blinking on a randomised schedule while the base face is in `blink_faces`;
+    - the base face set with `set_face`. The `speaking_face` is shown with the mouth
+      closed (the first mouth frame) whenever no audio is playing, e.g. between
+      sentences of a streamed reply.
+    """
+    def __init__(self, config: DisplayConfig, available_faces: Sequence[str] = (), seed: Optional[int] = None):
+        self.config = config
+        self.rng = random.Random(seed)
+        self.base_face = "neutral"
+        self.animations: Dict[str, Animation] = {"blink": BLINK}
+        for name, spec in config.animations.items():
+            self.animations[name] = Animation.from_config(spec["keyframes"], spec.get("loop", False))
+        self.mouth_frames: List[str] = [face for face in config.mouth_frames
+                                        if not available_faces or face in available_faces]
+        self.blink_animation = BLINK if not available_faces or "blink" in available_faces else None
+
+        self._envelope: Optional[np.ndarray] = None
+        self._envelope_frame = 0.04
+        self._speech_start = 0.0
+        self._animation: Optional[Animation] = None
+        self._animation_start = 0.0
+        self._next_blink: Optional[float] = None
+
+    # --- Inputs ---
+
+    def set_face(self, face: str, now: float):
+        self.base_face = face
+        self._animation = None
+        self._next_blink = None
+        self._schedule_blink(now)
+
+    def start_lip_sync(self, envelope: np.ndarray, frame_seconds: float, start: float):
+        if not self.mouth_frames or envelope is None or len(envelope) == 0:
+            return
+        self._envelope = envelope
+        self._envelope_frame = frame_seconds
+        self._speech_start = start
+
+    def stop_lip_sync(self):
+        self._envelope = None
+
+    def play(self, name: str, now: float) -> bool:
+        animation = self.animations.get(name)
+        if animation is None:
+            return False
+        self._animation = animation
+        self._animation_start = now
+        return True
+
+    @property
+    def speaking(self) -> bool:
+        return self._envelope is not None
+
+    # --- Output ---
+
+    def frame(self, now: float) -> Tuple[str, float]:
+        """(face to show at `now`, time at which that may next change; inf if never by itself)."""
+        if self._envelope is not None:
+            index = int((now - self._speech_start) / self._envelope_frame)
+            if index < 0:
+                return self.base_face, self._speech_start
+            if index < len(self._envelope):
+                next_change = self._speech_start + (index + 1) * self._envelope_frame
+                return self._mouth_frame(float(self._envelope[index])), next_change
+            self._envelope = None
+
+        if self._animation is not None:
+            elapsed = now - self._animation_start
+            face, next_keyframe = self._animation.frame_at(elapsed)
+            if next_keyframe is not None:
+                return face or self.base_face, self._animation_start + next_keyframe
+            self._animation = None
+            self._schedule_blink(now)
+
+        if self.base_face == self.config.speaking_face and self.mouth_frames:
+            return self.mouth_frames[0], float('inf')
+        if self.blink_animation is not None and self.base_face in self.config.blink_faces:
+            self._schedule_blink(now)
+            if now >= self._next_blink:
+                self._animation, self._animation_start = self.blink_animation, now
+                self._next_blink = None
+                return self.frame(now)
+            return self.base_face, self._next_blink
+        return self.base_face, float('inf')
+
+    def _mouth_frame(self, level: float) -> str:
+        # Below the threshold the mouth is closed; above it, the rest of the range is
+        # split evenly between the open frames.
+        threshold = self.config.mouth_open_threshold
+        if level < threshold or len(self.mouth_frames) == 1:
+            return self.mouth_frames[0]
+        open_frames = self.mouth_frames[1:]
+        index = int((level - threshold) / (1.0 - threshold + 1e-9) * len(open_frames))
+        return open_frames[min(index, len(open_frames) - 1)]
+
+    def _schedule_blink(self, now: float):
+        if self._next_blink is None:
+            low, high = self.config.blink_interval
+            self._next_blink = now + self.rng.uniform(low, high)
@@ -0,0 +1,228 @@
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+import pygame
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+
+
+class FaceLibrary:
+    """
+    Face images for the display, pre-scaled once and kept as raw pixel dumps.
+
+    The first time a face is needed at a given screen size, its PNG is decoded,
+    smooth-scaled and written to `cache_directory` as `<name>-<w>x<h>-<mtime>.rgb`
+    (or `.rgba` if it has any transparency), so later starts skip PNG decoding and
+    scaling entirely. Dumps are memory-mapped and converted to the display's pixel
+    format: opaque faces with `convert()` for fast, blend-free blits, the rest with
+    `convert_alpha()`. Editing a PNG changes its mtime and so its cache file.
+
+    Faces in `lazy_faces` (rarely shown, like "crashed") are only loaded on first
+    use; together they are kept under `memory_budget_bytes`, least recently used
+    first out. All other faces are loaded by `preload()` and stay resident.
+    """
+    def __init__(self, faces_directory: str, screen_size: Tuple[int, int], logger: 'LoggingSystem',
+                 cache_directory: Optional[str] = None, lazy_faces: Sequence[str] = (),
+                 memory_budget_bytes: int = 8 * 1024 * 1024):
+        self.faces_directory = faces_directory
+        self.screen_size = tuple(screen_size)
+        self.logger = logger
+        self.cache_directory = cache_directory
+        self.lazy_faces = set(lazy_faces)
+        self.memory_budget_bytes = memory_budget_bytes
+
+        self._lock = threading.Lock()
+        self._sources: Dict[str, str] = {}
+        try:
+            for filename in sorted(os.listdir(faces_directory)):
+                if filename.endswith(".png"):
+                    self._sources[os.path.splitext(filename)[0]] = os.path.join(faces_directory, filename)
+        except OSError as e:
+            self.logger.log_activity("DISPLAY_ERROR", f"Failed to read faces directory: {e}")
+        self._resident: Dict[str, pygame.Surface] = {}
+        self._lazy: 'OrderedDict[str, pygame.Surface]' = OrderedDict()
+        self._lazy_bytes = 0
+        self._failed = set()
+
+        self.cache_hits = 0
+        self.cache_builds = 0
+        self.lazy_loads = 0
+
+    # --- Dict-like access for the display ---
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name in self._sources if name not in self._failed]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sources and name not in self._failed
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get(self, name: str) -> Optional[pygame.Surface]:
+        """The display surface for `name`, loading it first if it is lazy or not yet loaded."""
+        if name not in self:
+            return None
+        with self._lock:
+            surface = self._resident.get(name)
+            if surface is None and name in self._lazy:
+                self._lazy.move_to_end(name)
+                surface = self._lazy[name]
+        if surface is None:
+            surface = self._load(name)
+        return surface
+
+    def __getitem__(self, name: str) -> pygame.Surface:
+        surface = self.get(name)
+        if surface is None:
+            raise KeyError(name)
+        return surface
+
+    def preload(self):
+        """Loads every face not in `lazy_faces`. Needs the display mode to be set."""
+        start = time.perf_counter()
+        for name in self.names:
+            if name not in self.lazy_faces:
+                self._load(name)
+        self.logger.log_activity("DISPLAY", "Loaded %d faces in %.0f ms (%d from cache, %d built), %.1f MiB of surfaces; "
+                                            "lazy: %s.", len(self._resident), (time.perf_counter() - start) * 1000,
+                                 self.cache_hits, self.cache_builds, self.resident_bytes / (1024 * 1024),
+                                 sorted(self.lazy_faces & set(self.names)) or "none")
+
+    def warm_cache(self):
+        """Builds missing cache files for every face (lazy ones included) without loading surfaces."""
+        for name in self.names:
+            try:
+                self._cached_pixels(name)
+            except (OSError, pygame.error) as e:
+                self.logger.log_activity("DISPLAY_WARNING", f"Could not cache face '{name}': {e}")
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            surfaces = list(self._resident.values()) + list(self._lazy.values())
+        return sum(_surface_bytes(surface) for surface in surfaces)
+
+    # --- Raw pixel access ---
+
+    def pixels(self, name: str) -> Optional[np.ndarray]:
+        """
+        Read-only, memory-mapped RGB(A) pixels of a face, indexed [y, x, channel], without
+        creating a surface. None if the face cannot be cached.
+        """
+        try:
+            path, channels = self._cached_pixels(name)
+        except (OSError, pygame.error):
+            return None
+        if path is None:
+            return None
+        width, height = self.screen_size
+        return np.memmap(path, dtype=np.uint8, mode='r', shape=(height, width, channels))
+
+    # --- Loading ---
+
+    def _load(self, name: str) -> Optional[pygame.Surface]:
+        try:
+            surface = self._load_surface(name)
+        except (OSError, ValueError, pygame.error) as e:
+            self.logger.log_activity("DISPLAY_ERROR", f"Failed to load face '{name}': {e}")
+            self._failed.add(name)
+            return None
+        with self._lock:
+            if name in self.lazy_faces:
+                self.lazy_loads += 1
+                self._lazy[name] = surface
+                self._lazy_bytes += _surface_bytes(surface)
+                while self._lazy_bytes > self.memory_budget_bytes and len(self._lazy) > 1:
+                    _, evicted = self._lazy.popitem(last=False)
+                    self._lazy_bytes -= _surface_bytes(evicted)
+            else:
+                self._resident[name] = surface
+        return surface
+
+    def _load_surface(self, name: str) -> pygame.Surface:
+        path, channels = self._cached_pixels(name)
+        if path is None:
+            # No usable cache directory: decode and scale in memory
+            image = pygame.image.load(self._sources[name])
+            opaque = _is_opaque(image)
+            image = pygame.transform.smoothscale(image.convert_alpha(), self.screen_size)
+            return image.convert() if opaque else image
+        fmt = "RGB" if channels == 3 else "RGBA"
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # frombuffer shares the mapped pages; convert() copies them once into display format
+            raw = pygame.image.frombuffer(mapped, self.screen_size, fmt)
+            surface = raw.convert() if channels == 3 else raw.convert_alpha()
+            del raw
+        return surface
+
+    def _cache_path(self, name: str, channels: int) -> str:
+        width, height = self.screen_size
+        mtime = os.stat(self._sources[name]).st_mtime_ns
+        suffix = "rgb" if channels == 3 else "rgba"
+        return os.path.join(self.cache_directory, f"{name}-{width}x{height}-{mtime}.{suffix}")
+
+    def _cached_pixels(self, name: str) -> Tuple[Optional[str], int]:
+        """(path of the raw pixel dump for `name`, channels), building it if needed; (None, 0) without a cache."""
+        if not self.cache_directory:
+            return None, 0
+        for channels in (3, 4):
+            path = self._cache_path(name, channels)
+            if os.path.exists(path):
+                self.cache_hits += 1
+                return path, channels
+        with self._lock:
+            # Another thread may have built it while we waited
+            for channels in (3, 4):
+                path = self._cache_path(name, channels)
+                if os.path.exists(path):
+                    return path, channels
+            return self._build_cache(name)
+
+    def _build_cache(self, name: str) -> Tuple[str, int]:
+        image = pygame.image.load(self._sources[name])
+        if image.get_bitsize() < 24:
+            image = image.convert(24, 0) if not image.get_flags() & pygame.SRCALPHA else image.convert(32, pygame.SRCALPHA)
+        # Judge opacity before scaling: smoothscale can leave alpha slightly below 255
+        channels = 3 if _is_opaque(image) else 4
+        scaled = pygame.transform.smoothscale(image, self.screen_size)
+        data = pygame.image.tostring(scaled, "RGB" if channels == 3 else "RGBA")
+
+        os.makedirs(self.cache_directory, exist_ok=True)
+        path = self._cache_path(name, channels)
+        stale_prefix = f"{name}-"
+        for filename in os.listdir(self.cache_directory):
+            # Older dumps of this face (other sizes or an earlier PNG)
+            if filename.startswith(stale_prefix) and filename[len(stale_prefix):len(stale_prefix) + 1].isdigit():
+                try:
+                    os.remove(os.path.join(self.cache_directory, filename))
+                except OSError:
+                    pass
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.cache_builds += 1
+        self.logger.log_activity("DISPLAY_DEBUG", "Cached face '%s' at %dx%d (%s).", name,
+                                 self.screen_size[0], self.screen_size[1], "opaque" if channels == 3 else "alpha")
+        return path, channels
+
+
+def _is_opaque(surface: pygame.Surface) -> bool:
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return True
+    return bool(np.all(pygame.surfarray.pixels_alpha(surface) == 255))
+
+
+def _surface_bytes(surface: pygame.Surface) -> int:
+    return surface.get_pitch() * surface.get_height()
@@ -1,27 +1,93 @@
 import pygame
-import os
+import numpy as np
 import time
 import threading
 import queue
-from typing import Tuple, Dict, TYPE_CHECKING
+from collections import deque
+from .config import DisplayConfig
+from .face_animation import FaceAnimator
+from .face_assets import FaceLibrary
+from typing import Any, Deque, Dict, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from .event_bus import EventBus
     from .logging_system import LoggingSystem
+    from .text_to_speech import Utterance
+
+# Window events after which the whole screen must be repainted. Looked up by name
+# because the WINDOW* events only exist in pygame 2.
+_REDRAW_EVENT_NAMES = ("VIDEOEXPOSE", "VIDEORESIZE", "WINDOWEXPOSED", "WINDOWSHOWN", "WINDOWRESTORED",
+                       "WINDOWSIZECHANGED")
+REDRAW_EVENTS = frozenset(getattr(pygame, name) for name in _REDRAW_EVENT_NAMES if hasattr(pygame, name))
+
+# Frame period of the legacy continuous redraw mode
+CONTINUOUS_FRAME_SECONDS = 0.05
+
+# Weight of the newest frame in the moving average of draw CPU time used for pacing
+_DRAW_COST_SMOOTHING = 0.1
+
 
 class FaceDisplay(threading.Thread):
-    def __init__(self, screen_size: Tuple[int, int], faces_directory: str, logger: 'LoggingSystem'):
+    """
+    Shows the robot's face. The display thread sleeps on the command queue and only
+    draws when the face changes or the window needs repainting (exposed, restored,
+    resized). When switching faces, only the bounding box of the pixels that differ
+    by more than `diff_tolerance` is blitted and pushed with `display.update(rect)`;
+    the box for each pair of faces is computed once with NumPy and cached. Faces
+    come from a FaceLibrary (see face_assets.py), which pre-scales them once to a
+    raw pixel cache and loads rarely used ones only when they are shown.
+
+    With `animation_enabled`, a FaceAnimator (see face_animation.py) adds idle
+    blinks, keyframed animations and lip-sync on top of the face that was set. The
+    thread sleeps until the animator's next change is due, and frames are spaced at
+    least 1 / `animation_max_fps` apart, or further if drawing would take more than
+    `animation_cpu_budget` of a core. Lip-sync starts from TextToSpeech playback
+    notifications (`on_playback`) carrying the utterance's precomputed envelope.
+
+    Frames drawn, pixels pushed and CPU time per frame are counted; `get_stats()`
+    returns them and they are logged under DISPLAY_STATS every `stats_interval`.
+    """
+    def __init__(self, screen_size: Tuple[int, int], faces_directory: str, logger: 'LoggingSystem',
+                 config: Optional[DisplayConfig] = None, event_bus: Optional['EventBus'] = None):
         super().__init__(daemon=True)
         self.name = "FaceDisplayThread"
         self.screen_size = screen_size
         self.faces_directory = faces_directory
         self.logger = logger
-        
-        self.faces: Dict[str, pygame.Surface] = {}
+        self.event_bus = event_bus
+        self.config = config or DisplayConfig(screen_size=screen_size, faces_directory=faces_directory)
+
+        self.faces = FaceLibrary(faces_directory, screen_size, logger,
+                                 cache_directory=self.config.face_cache_directory,
+                                 lazy_faces=self.config.lazy_faces,
+                                 memory_budget_bytes=int(self.config.lazy_face_memory_mb * 1024 * 1024))
         self.screen = None
         self.initialized = False
         self.running = False
         self.command_queue = queue.Queue()
         self.current_face = "neutral"  # Instance variable for current face
+        self._requested_face = self.current_face  # Last face passed to set_face, for change events
+        self.animator: Optional[FaceAnimator] = None
+        self._target_face = self.current_face  # Frame to show now, after animation
+        self._shown_face: Optional[str] = None  # What is on the screen right now
+        self._next_frame_at: Optional[float] = None  # time.monotonic() of the next animation change
+        self._last_frame_at = 0.0
+        self._frame_due: Optional[float] = None
+        self._full_redraw = True
+        self._changed_rects: Dict[Tuple[str, str], Optional[pygame.Rect]] = {}
+
+        # Rendering statistics
+        self.frames_drawn = 0
+        self.pixels_pushed = 0
+        self.draw_cpu_seconds = 0.0
+        self.diff_cpu_seconds = 0.0  # One-off cost of computing changed regions, not counted per frame
+        self.wakeups = 0
+        self.animation_frames = 0
+        self._draw_cost = 0.0  # Moving average of draw CPU seconds per frame
+        self.frame_lateness: Deque[float] = deque(maxlen=512)  # Seconds each animation frame was drawn after it was due
+        self._started_at = time.perf_counter()
+        self._loop_cpu_start = 0.0
+        self._last_stats: Tuple[float, float, int] = (self._started_at, 0.0, 0)  # (wall, thread CPU, frames)
 
     def _initialize_display(self):
         """Initializes the pygame display and loads face images."""
@@ -32,29 +98,26 @@ class FaceDisplay(threading.Thread):
             pygame.display.set_caption("Robot Face")
             self.logger.log_activity("DISPLAY", "Pygame display initialized.")
             self._load_faces()
+            if self.config.animation_enabled:
+                self.animator = FaceAnimator(self.config, available_faces=list(self.faces))
+                self.animator.set_face(self.current_face, time.monotonic())
             self.initialized = True
         except Exception as e:
             self.logger.log_activity("DISPLAY_ERROR", f"Failed to initialize Pygame display: {e}")
             self.initialized = False
 
     def _load_faces(self):
-        """Loads all face images from the specified directory."""
+        """Loads the face images, from the pre-scaled cache where possible."""
         try:
-            for filename in os.listdir(self.faces_directory):
-                if filename.endswith(".png"):
-                    name = os.path.splitext(filename)[0]
-                    path = os.path.join(self.faces_directory, filename)
-                    try:
-                        image = pygame.image.load(path).convert_alpha()
-                        self.faces[name] = pygame.transform.scale(image, self.screen_size)
-                    except pygame.error as e:
-                        self.logger.log_activity("DISPLAY_ERROR", f"Failed to load image '{path}': {e}")
+            self.faces.preload()
             if not self.faces:
                 self.logger.log_activity("DISPLAY_WARNING", "No face images were loaded.")
             else:
-                self.logger.log_activity("DISPLAY", f"Loaded face images: {list(self.faces.keys())}")
+                self.logger.log_activity("DISPLAY", f"Loaded face images: {self.faces.names}")
+                # Prepare cache files for lazy faces so their first appearance is quick
+                threading.Thread(target=self.faces.warm_cache, name="FaceCacheThread", daemon=True).start()
         except Exception as e:
-            self.logger.log_activity("DISPLAY_ERROR", f"Failed to read faces directory: {e}")
+            self.logger.log_activity("DISPLAY_ERROR", f"Failed to load faces: {e}")
 
     def run(self):
         """The main loop of the display thread."""
@@ -63,47 +126,217 @@ class FaceDisplay(threading.Thread):
             return
 
         self.running = True
+        self._started_at = time.perf_counter()
+        self._loop_cpu_start = time.thread_time()
+        self._last_stats = (self._started_at, self._loop_cpu_start, 0)
+        timeout = CONTINUOUS_FRAME_SECONDS if self.config.continuous_redraw else self.config.event_poll_seconds
 
         while self.running:
             try:
-                # Check for commands without blocking
+                # Sleep until a command arrives or the next animation frame is due, waking
+                # up now and then for window events
+                wait = timeout
+                if self._next_frame_at is not None:
+                    wait = min(wait, max(0.0, self._next_frame_at - time.monotonic()))
                 try:
-                    new_face = self.command_queue.get_nowait()
-                    if new_face in self.faces:
-                        self.current_face = new_face
-                    elif new_face == "_shutdown":
-                        self.running = False
-                        continue
+                    self._handle_command(self.command_queue.get(timeout=wait))
+                    # Apply a burst of commands at once; only the last face is drawn.
+                    while self.running:
+                        self._handle_command(self.command_queue.get_nowait())
                 except queue.Empty:
                     pass
+                self.wakeups += 1
 
-                # Draw the current face
-                if self.current_face in self.faces:
-                    self.screen.blit(self.faces[self.current_face], (0, 0))
-                    pygame.display.flip()
-                
                 # Handle pygame events
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         self.running = False
+                    elif event.type in REDRAW_EVENTS:
+                        self._full_redraw = True
 
-                time.sleep(0.05) # Reduce CPU usage
+                if self.running:
+                    self._update_target()
+                if self.running and (self.config.continuous_redraw or self._full_redraw
+                                     or self._target_face != self._shown_face):
+                    self._draw()
+                self._log_stats_if_due()
 
             except Exception as e:
                 self.logger.log_activity("DISPLAY_ERROR", f"Error in display loop: {e}")
                 self.running = False
-        
+
         self._cleanup()
 
+    def _handle_command(self, command):
+        if isinstance(command, tuple):
+            self._handle_animation_command(*command)
+        elif command == "_shutdown":
+            self.running = False
+        elif command in self.faces:
+            self.current_face = command
+            if self.animator:
+                self.animator.set_face(command, time.monotonic())
+
+    def _handle_animation_command(self, name: str, *args):
+        if self.animator is None:
+            return
+        if name == "_lip_sync":
+            envelope, frame_seconds, start = args
+            self.animator.start_lip_sync(envelope, frame_seconds, start + self.config.lip_sync_offset)
+        elif name == "_lip_sync_end":
+            self.animator.stop_lip_sync()
+        elif name == "_animate":
+            if not self.animator.play(args[0], time.monotonic()):
+                self.logger.log_activity("DISPLAY_WARNING", f"Unknown animation '{args[0]}'.")
+
+    def _frame_period(self) -> float:
+        """Shortest time between animation frames: the FPS cap, stretched to stay within the CPU budget."""
+        period = 1.0 / self.config.animation_max_fps
+        if self.config.animation_cpu_budget > 0:
+            period = max(period, self._draw_cost / self.config.animation_cpu_budget)
+        return period
+
+    def _update_target(self):
+        """Asks the animator what to show now and when to wake up next, holding frames back to the pace limit."""
+        if self.animator is None:
+            self._target_face = self.current_face
+            return
+        now = time.monotonic()
+        face, next_change = self.animator.frame(now)
+        self._target_face = face if face in self.faces else self.current_face
+        earliest = self._last_frame_at + self._frame_period()
+        if self._target_face != self._shown_face and not self._full_redraw and now < earliest:
+            # Too soon after the last frame: show this one when the pace allows
+            self._target_face = self._shown_face
+            self._next_frame_at = earliest
+        else:
+            self._next_frame_at = None if next_change == float('inf') else max(next_change, earliest)
+        if self._target_face != self._shown_face and self._frame_due is not None and now >= self._frame_due:
+            self.frame_lateness.append(max(0.0, now - self._frame_due))
+            self.animation_frames += 1
+        self._frame_due = self._next_frame_at
+
+    def _draw(self):
+        face = self.faces.get(self._target_face)
+        if face is None:
+            return
+        full = self.config.continuous_redraw or self._full_redraw or self._shown_face is None \
+            or not self.config.partial_updates
+        rect = None if full else self._changed_rect(self._shown_face, self._target_face)
+        cpu_start = time.thread_time()
+        if rect is None:
+            self.screen.blit(face, (0, 0))
+            pygame.display.flip()
+            self.pixels_pushed += self.screen_size[0] * self.screen_size[1]
+        elif rect.width and rect.height:
+            self.screen.blit(face, rect.topleft, area=rect)
+            pygame.display.update(rect)
+            self.pixels_pushed += rect.width * rect.height
+        self._shown_face = self._target_face
+        self._full_redraw = False
+        self.frames_drawn += 1
+        cost = time.thread_time() - cpu_start
+        self.draw_cpu_seconds += cost
+        self._draw_cost += _DRAW_COST_SMOOTHING * (cost - self._draw_cost)
+        self._last_frame_at = time.monotonic()
+
+    def _changed_rect(self, old: str, new: str) -> Optional[pygame.Rect]:
+        """Bounding box of the pixels that differ between two faces (cached), or None to redraw all."""
+        key = (old, new) if old <= new else (new, old)
+        if key not in self._changed_rects:
+            cpu_start = time.thread_time()
+            try:
+                # Faces share a noisy background, so differences within the tolerance
+                # are ignored or the box is the whole screen.
+                differs = self._face_delta(old, new) > self.config.diff_tolerance
+                xs = np.flatnonzero(differs.any(axis=0))
+                ys = np.flatnonzero(differs.any(axis=1))
+                if len(xs) == 0:
+                    rect = pygame.Rect(0, 0, 0, 0)
+                else:
+                    rect = pygame.Rect(int(xs[0]), int(ys[0]), int(xs[-1] - xs[0] + 1), int(ys[-1] - ys[0] + 1))
+            except (ValueError, KeyError, pygame.error) as e:
+                self.logger.log_activity("DISPLAY_WARNING", f"Could not diff faces '{old}' and '{new}': {e}")
+                rect = None
+            self._changed_rects[key] = rect
+            self.diff_cpu_seconds += time.thread_time() - cpu_start
+        return self._changed_rects[key]
+
+    def _face_delta(self, old: str, new: str) -> np.ndarray:
+        """Largest per-channel difference between two faces, indexed [y, x]."""
+        old_pixels, new_pixels = self.faces.pixels(old), self.faces.pixels(new)
+        if old_pixels is None or new_pixels is None or old_pixels.shape[2] != new_pixels.shape[2]:
+            # No raw cache: read the surfaces (indexed [x, y, channel]) instead
+            old_pixels = pygame.surfarray.array3d(self.faces[old]).swapaxes(0, 1)
+            new_pixels = pygame.surfarray.array3d(self.faces[new]).swapaxes(0, 1)
+        delta = np.zeros(old_pixels.shape[:2], dtype=np.int16)
+        for channel in range(3):
+            np.maximum(delta, np.abs(old_pixels[:, :, channel].astype(np.int16)
+                                     - new_pixels[:, :, channel].astype(np.int16)), out=delta)
+        return delta
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Rendering statistics since the display started."""
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        screen_pixels = self.screen_size[0] * self.screen_size[1]
+        lateness = sorted(self.frame_lateness)
+        return {
+            "frames_drawn": self.frames_drawn,
+            "fps": self.frames_drawn / elapsed,
+            "cpu_ms_per_frame": self.draw_cpu_seconds / self.frames_drawn * 1000 if self.frames_drawn else 0.0,
+            "screens_pushed": self.pixels_pushed / screen_pixels,
+            "diff_cpu_ms": self.diff_cpu_seconds * 1000,
+            "wakeups": self.wakeups,
+            "animation_frames": self.animation_frames,
+            "frame_late_ms_p95": lateness[int(len(lateness) * 0.95)] * 1000 if lateness else 0.0,
+            "frame_period_ms": self._frame_period() * 1000,
+            "elapsed_s": elapsed,
+        }
+
+    def _log_stats_if_due(self):
+        interval = self.config.stats_interval
+        now = time.perf_counter()
+        last_wall, last_cpu, last_frames = self._last_stats
+        if interval <= 0 or now - last_wall < interval:
+            return
+        cpu = time.thread_time()
+        frames = self.frames_drawn - last_frames
+        self.logger.log_activity("DISPLAY_STATS", "%.2f frames/s, %.1f ms CPU per frame, display thread at %.2f%% CPU.",
+                                 frames / (now - last_wall), self.draw_cpu_seconds / max(self.frames_drawn, 1) * 1000,
+                                 (cpu - last_cpu) / (now - last_wall) * 100)
+        self._last_stats = (now, cpu, self.frames_drawn)
+
     def _cleanup(self):
         """Shuts down the pygame display."""
-        self.logger.log_activity("DISPLAY", "Pygame display shutting down.")
+        stats = self.get_stats()
+        cpu_percent = (time.thread_time() - self._loop_cpu_start) / stats["elapsed_s"] * 100
+        self.logger.log_activity("DISPLAY", "Pygame display shutting down: %d frames in %.0f s (%.2f/s), "
+                                            "%.1f ms CPU per frame, display thread at %.2f%% CPU.",
+                                 stats["frames_drawn"], stats["elapsed_s"], stats["fps"],
+                                 stats["cpu_ms_per_frame"], cpu_percent)
         pygame.quit()
 
     def set_face(self, face_name: str):
-        """Thread-safe method to change the displayed face."""
+        """Thread-safe method to change the displayed face. Changes are published on the "face" topic."""
         if self.is_alive():
             self.command_queue.put(face_name)
+            if self.event_bus and face_name != self._requested_face:
+                self.event_bus.publish("face", {"face": face_name})
+            self._requested_face = face_name
+
+    def play_animation(self, name: str):
+        """Thread-safe method to start a keyframed animation from `DisplayConfig.animations` (or "blink")."""
+        if self.is_alive():
+            self.command_queue.put(("_animate", name))
+
+    def on_playback(self, utterance: Optional['Utterance'], at: float):
+        """TextToSpeech playback listener: lip-syncs to each utterance while it plays."""
+        if not self.is_alive():
+            return
+        if utterance is None:
+            self.command_queue.put(("_lip_sync_end",))
+        else:
+            self.command_queue.put(("_lip_sync", utterance.envelope, utterance.frame_seconds, at))
 
     def get_current_face(self) -> str:
         """Thread-safe method to get the current face name."""
@@ -115,4 +348,4 @@ class FaceDisplay(threading.Thread):
             self.command_queue.put("_shutdown")
             self.join(timeout=2) # Wait for the thread to finish
             if self.is_alive():
-                self.logger.log_activity("DISPLAY_WARNING", "Display thread did not shut down gracefully.")
\ No newline at end of file
+                self.logger.log_activity("DISPLAY_WARNING", "Display thread did not shut down gracefully.")
@@ -0,0 +1,195 @@
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+SPEED_OF_SOUND_CM_S = 34300
+
+
+class FakePWM:
+    """Records the duty cycle changes of one software PWM channel."""
+    def __init__(self, gpio: 'FakeGPIO', pin: int, frequency: float):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0.0
+        self.running = False
+
+    def start(self, duty_cycle: float):
+        self.running = True
+        self.ChangeDutyCycle(duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle: float):
+        if not 0.0 <= duty_cycle <= 100.0:
+            raise ValueError("dutycycle must have a value from 0.0 to 100.0")
+        self.duty_cycle = duty_cycle
+        self.gpio.pwm_log.append((self.pin, duty_cycle, time.perf_counter_ns()))
+
+    def ChangeFrequency(self, frequency: float):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+
+
+class FakeGPIO:
+    """
+    An in-memory stand-in for the RPi.GPIO module, for exercising sensor and motor
+    code on a machine without GPIO hardware.
+
+    Output levels and PWM duty cycles are recorded. Input levels can be set directly or scripted: an
+    ultrasonic echo registered with `set_echo` is emitted on the echo pin, with real
+    timing, every time its trigger pin falls. Edge callbacks run on a dispatcher
+    thread, as they do in RPi.GPIO. Every emitted input edge is recorded in
+    `edge_log` as (pin, level, perf_counter_ns), so a harness can compare measured
+    pulse widths with what was actually generated.
+    """
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+
+    def __init__(self):
+        self.mode = None
+        self.pin_modes: Dict[int, int] = {}
+        self.levels: Dict[int, int] = {}
+        self.output_log: List[Tuple[int, int, int]] = []
+        self.edge_log: List[Tuple[int, int, int]] = []
+        self.pwm_log: List[Tuple[int, float, int]] = []  # (pin, duty cycle %, perf_counter_ns)
+        self._callbacks: Dict[int, Tuple[int, Callable[[int], None]]] = {}
+        # trigger pin -> (echo pin, distance in cm or None for no echo, response delay in s)
+        self._echoes: Dict[int, Tuple[int, Optional[float], float]] = {}
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._schedule: List[Tuple[int, int, int, int]] = []  # (due_ns, seq, pin, level)
+        self._seq = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FakeGPIOThread", daemon=True)
+        self._thread.start()
+
+    # --- RPi.GPIO API ---
+
+    def setmode(self, mode: int):
+        self.mode = mode
+
+    def setwarnings(self, flag: bool):
+        pass
+
+    def setup(self, channel, direction: int, pull_up_down: int = PUD_OFF, initial: int = LOW):
+        for pin in self._channels(channel):
+            self.pin_modes[pin] = direction
+            self.levels.setdefault(pin, initial if direction == self.OUT else self.LOW)
+
+    def output(self, channel, value):
+        pins = self._channels(channel)
+        values = list(value) if isinstance(value, (list, tuple)) else [value] * len(pins)
+        if len(values) != len(pins):
+            raise RuntimeError("Number of channels != number of values")
+        now = time.perf_counter_ns()
+        for pin, level in zip(pins, values):
+            if self.pin_modes.get(pin) != self.OUT:
+                raise RuntimeError(f"The GPIO channel {pin} has not been set up as an OUTPUT")
+            level = self.HIGH if level else self.LOW
+            previous = self.levels.get(pin, self.LOW)
+            self.levels[pin] = level
+            self.output_log.append((pin, level, now))
+            if previous == self.HIGH and level == self.LOW and pin in self._echoes:
+                self._fire_echo(pin, now)
+
+    def PWM(self, channel: int, frequency: float) -> FakePWM:
+        if self.pin_modes.get(channel) != self.OUT:
+            raise RuntimeError(f"The GPIO channel {channel} has not been set up as an OUTPUT")
+        return FakePWM(self, channel, frequency)
+
+    def input(self, channel: int) -> int:
+        return self.levels.get(channel, self.LOW)
+
+    def add_event_detect(self, channel: int, edge: int, callback: Optional[Callable[[int], None]] = None,
+                         bouncetime: Optional[int] = None):
+        if self.pin_modes.get(channel) != self.IN:
+            raise RuntimeError(f"The GPIO channel {channel} has not been set up as an INPUT")
+        if channel in self._callbacks:
+            raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+        self._callbacks[channel] = (edge, callback)
+
+    def remove_event_detect(self, channel: int):
+        self._callbacks.pop(channel, None)
+
+    def cleanup(self, channel=None):
+        pins = self._channels(channel) if channel is not None else list(self.pin_modes)
+        for pin in pins:
+            self.pin_modes.pop(pin, None)
+            self.levels.pop(pin, None)
+            self._callbacks.pop(pin, None)
+
+    # --- Scripting ---
+
+    def set_echo(self, trigger_pin: int, echo_pin: int, distance_cm: Optional[float], response_delay: float = 0.0005):
+        """Answers each trigger pulse with an echo from an object `distance_cm` away (None: no echo)."""
+        self._echoes[trigger_pin] = (echo_pin, distance_cm, response_delay)
+
+    def set_input(self, pin: int, level: int, at_ns: Optional[int] = None):
+        """Drives an input pin to `level`, now or at the perf_counter_ns time `at_ns`."""
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._schedule, (at_ns or time.perf_counter_ns(), self._seq, pin, level))
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=1)
+
+    # --- Internals ---
+
+    @staticmethod
+    def _channels(channel) -> List[int]:
+        return list(channel) if isinstance(channel, (list, tuple)) else [channel]
+
+    def _fire_echo(self, trigger_pin: int, now_ns: int):
+        echo_pin, distance_cm, response_delay = self._echoes[trigger_pin]
+        if distance_cm is None:
+            return
+        rise_ns = now_ns + int(response_delay * 1e9)
+        width_ns = int(2 * distance_cm / SPEED_OF_SOUND_CM_S * 1e9)
+        self.set_input(echo_pin, self.HIGH, rise_ns)
+        self.set_input(echo_pin, self.LOW, rise_ns + width_ns)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._schedule:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                due_ns = self._schedule[0][0]
+                wait_s = (due_ns - time.perf_counter_ns()) / 1e9
+                if wait_s > 0.0002:
+                    # Sleep most of the way; the last stretch is spun for timing accuracy.
+                    self._cond.wait(wait_s - 0.0002)
+                    continue
+            while time.perf_counter_ns() < due_ns:
+                pass
+            with self._cond:
+                _, _, pin, level = heapq.heappop(self._schedule)
+            self._emit(pin, level)
+
+    def _emit(self, pin: int, level: int):
+        previous = self.levels.get(pin, self.LOW)
+        self.levels[pin] = level
+        if previous == level:
+            return
+        self.edge_log.append((pin, level, time.perf_counter_ns()))
+        edge, callback = self._callbacks.get(pin, (None, None))
+        if callback and (edge == self.BOTH or (edge == self.RISING) == (level == self.HIGH)):
+            callback(pin)
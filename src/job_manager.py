@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+
+from .config import JobsConfig
+from .error_handler import RobotError
+
+if TYPE_CHECKING:
+    from .event_bus import EventBus
+    from .logging_system import LoggingSystem
+
+# A job's work: called with (payload, on_response) on a worker thread; returns the final text.
+# on_response(text, final) reports the response as soon as it is generated.
+JobFunction = Callable[[str, Callable[[str, bool], None]], Optional[str]]
+
+
+class JobQueueFullError(RobotError):
+    """Raised when a job is submitted while the job queue is full."""
+    pass
+
+
+@dataclass
+class Job:
+    """A request handled in the background, as seen by pollers and event subscribers."""
+    job_id: str
+    kind: str
+    payload: str
+    origin: str = ""
+    status: str = "queued"  # queued, running, responded (text ready, still speaking), completed, failed
+    response: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.perf_counter)
+    started_at: Optional[float] = None
+    responded_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(start, end):
+            return round((end - start) * 1000, 1) if start is not None and end is not None else None
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "response": self.response,
+            "error": self.error,
+            "queued_ms": ms(self.created_at, self.started_at),
+            "response_ms": ms(self.created_at, self.responded_at),
+            "total_ms": ms(self.created_at, self.finished_at),
+        }
+
+
+class JobManager:
+    """
+    Runs slow requests (an AI answer that is then spoken) on a fixed pool of
+    `workers` threads, so HTTP handlers return at once with a job ID. At most
+    `max_queued` jobs wait for a worker; beyond that `submit` raises
+    JobQueueFullError rather than letting the backlog grow.
+
+    Every status change is published on the "job" topic of the event bus: queued,
+    running (with the response text so far as it is generated), responded (the
+    full text, while it is still being spoken) and completed once speech is done,
+    or failed. Finished jobs stay queryable by ID for the last `history_size` jobs.
+    """
+    def __init__(self, logger: 'LoggingSystem', config: Optional[JobsConfig] = None,
+                 event_bus: Optional['EventBus'] = None):
+        self.logger = logger
+        self.config = config or JobsConfig()
+        self.event_bus = event_bus
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, self.config.max_queued))
+        self._lock = threading.Lock()
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._workers: List[threading.Thread] = []
+        self.running_jobs = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        for i in range(max(1, self.config.workers)):
+            worker = threading.Thread(target=self._worker_loop, name=f"JobWorker-{i + 1}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        self.logger.log_activity("JOBS", "Job pool started with %d workers, queue limit %d.",
+                                 len(self._workers), self._queue.maxsize)
+
+    # --- Submission and status (any thread) ---
+
+    def submit(self, kind: str, payload: str, function: JobFunction, origin: str = "") -> Job:
+        job = Job(uuid.uuid4().hex[:12], kind, payload, origin)
+        if self._queue.full():
+            self.rejected += 1
+            raise JobQueueFullError(f"Job queue is full ({self._queue.maxsize} waiting)")
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.config.history_size:
+                self._jobs.popitem(last=False)
+        # Published before a worker can pick it up, so "queued" always comes first
+        self._publish(job)
+        try:
+            self._queue.put_nowait((job, function))
+        except queue.Full:
+            job.status = "failed"
+            job.error = "Job queue is full"
+            self.rejected += 1
+            self._publish(job)
+            raise JobQueueFullError(f"Job queue is full ({self._queue.maxsize} waiting)")
+        with self._lock:
+            self.peak_queue_depth = max(self.peak_queue_depth, self._queue.qsize())
+        self.logger.log_activity("JOBS", "Queued %s job %s (queue depth %d).", kind, job.job_id, self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "running": self.running_jobs,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "queue_limit": self._queue.maxsize,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def _publish(self, job: Job):
+        if self.event_bus:
+            self.event_bus.publish("job", job.to_dict())
+
+    # --- Workers ---
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job, function = item
+            with self._lock:
+                self.running_jobs += 1
+            try:
+                self._run(job, function)
+            finally:
+                with self._lock:
+                    self.running_jobs -= 1
+
+    def _run(self, job: Job, function: JobFunction):
+        job.started_at = time.perf_counter()
+        job.status = "running"
+        self._publish(job)
+
+        def on_response(text: str, final: bool):
+            job.response = text
+            if final and job.responded_at is None:
+                job.responded_at = time.perf_counter()
+                job.status = "responded"
+            self._publish(job)
+
+        try:
+            result = function(job.payload, on_response)
+            if result:
+                job.response = result
+            if job.responded_at is None:
+                job.responded_at = time.perf_counter()
+            job.status = "completed"
+            self.completed += 1
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self.failed += 1
+            self.logger.log_activity("JOBS_ERROR", f"Job {job.job_id} ({job.kind}) failed: {e}")
+        job.finished_at = time.perf_counter()
+        self.logger.log_activity("JOBS", "Job %s %s in %.0f ms (queued %.0f ms, response after %.0f ms).",
+                                 job.job_id, job.status, (job.finished_at - job.created_at) * 1000,
+                                 (job.started_at - job.created_at) * 1000,
+                                 ((job.responded_at or job.finished_at) - job.created_at) * 1000)
+        self._publish(job)
+
+    def shutdown(self, timeout: float = 1.0):
+        """Stops the workers once their current jobs end; jobs still queued are dropped."""
+        while True:
+            try:
+                job, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job.status = "failed"
+            job.error = "Shut down before it started"
+            job.finished_at = time.perf_counter()
+            self.failed += 1
+            self._publish(job)
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self.logger.log_activity("JOBS", "Job pool stopped: %d completed, %d failed, %d rejected, peak queue depth %d.",
+                                 self.completed, self.failed, self.rejected, self.peak_queue_depth)
@@ -2,6 +2,7 @@ from llama_cpp import Llama
 from .error_handler import AIError
 from .logging_system import LoggingSystem
 import os
+from typing import Iterator
 
 class LocalLLM:
     def __init__(self, model_path: str, max_context_length: int, logger: LoggingSystem):
@@ -63,6 +64,32 @@ class LocalLLM:
                 self.logger.log_activity("LOCAL_LLM_ERROR", f"Error during simple generation: {inner_e}")
                 raise AIError(f"Local LLM generation failed: {inner_e}")
 
+    def stream_response(self, prompt: str, context: list = None) -> Iterator[str]:
+        """
+        Yields the local LLM's chat completion as it is generated. Falls back to the
+        blocking generate_response() if streaming fails before any text was produced.
+        """
+        if not self.is_model_loaded():
+            raise AIError("Local LLM model is not loaded.")
+
+        messages = (context or []) + [{"role": "user", "content": prompt}]
+        produced = False
+        try:
+            self.logger.log_activity("LOCAL_LLM", "Attempting streamed chat completion with local model.")
+            for chunk in self.model.create_chat_completion(messages=messages, max_tokens=150, stream=True):
+                choices = chunk.get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    produced = True
+                    yield content
+        except Exception as e:
+            if produced:
+                self.logger.log_activity("LOCAL_LLM_ERROR", f"Streamed chat completion failed mid-response: {e}")
+                raise AIError(f"Local LLM streaming failed: {e}")
+            self.logger.log_activity("LOCAL_LLM_WARNING", f"Streamed chat completion failed: {e}. Falling back to blocking generation.")
+        if not produced:
+            yield self.generate_response(prompt, context)
+
     def is_model_loaded(self) -> bool:
         """
         Checks if the local LLM model is loaded and ready.
@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+
+class JsonlLogStore:
+    """
+    An append-only, segment-based JSON Lines log.
+
+    New entries are appended to the active segment (`<name>.jsonl`). When the
+    active segment exceeds its entry or byte budget it is sealed by renaming it to
+    `<name>.<seq>.jsonl` and a fresh active segment is started. Whole sealed
+    segments are deleted once the remaining ones still hold `max_entries`, so a
+    write never has to re-read or rewrite existing data.
+
+    A small in-memory tail index keeps the newest entries so that history reads
+    are usually served without touching the disk at all.
+    """
+    def __init__(self, log_directory: str, name: str, max_entries: int = 1000,
+                 segment_max_entries: int = 250, segment_max_bytes: int = 256 * 1024,
+                 tail_size: int = 100):
+        self.log_directory = log_directory
+        self.name = name
+        self.max_entries = max_entries
+        self.segment_max_entries = max(1, segment_max_entries)
+        self.segment_max_bytes = max(1, segment_max_bytes)
+        self.active_path = os.path.join(self.log_directory, f"{self.name}.jsonl")
+
+        self._lock = threading.Lock()
+        self._segment_pattern = re.compile(rf"^{re.escape(self.name)}\.(\d+)\.jsonl$")
+        # Index of sealed segments, oldest first: [(seq, path, entry_count)]
+        self._segments: List[Tuple[int, str, int]] = []
+        self._active_entries = 0
+        self._active_bytes = 0
+        self._tail: Deque[Dict[str, Any]] = deque(maxlen=max(1, min(tail_size, max_entries)))
+
+        os.makedirs(self.log_directory, exist_ok=True)
+        self._build_index()
+
+    def _build_index(self):
+        """Scans the log directory once at startup to rebuild the segment index."""
+        for filename in os.listdir(self.log_directory):
+            match = self._segment_pattern.match(filename)
+            if match:
+                path = os.path.join(self.log_directory, filename)
+                self._segments.append((int(match.group(1)), path, self._count_lines(path)))
+        self._segments.sort()
+
+        if os.path.exists(self.active_path):
+            self._active_entries = self._count_lines(self.active_path)
+            self._active_bytes = os.path.getsize(self.active_path)
+
+        # Prime the tail index from the newest entries on disk.
+        for entry in reversed(self._read_newest(self._tail.maxlen)):
+            self._tail.appendleft(entry)
+
+    @staticmethod
+    def _count_lines(path: str) -> int:
+        with open(path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+
+    @staticmethod
+    def _read_segment(path: str) -> List[Dict[str, Any]]:
+        """Reads a segment oldest-first, skipping lines torn by a crash."""
+        entries = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _read_newest(self, limit: int) -> List[Dict[str, Any]]:
+        """Reads up to `limit` entries newest-first, walking segments backwards."""
+        result: List[Dict[str, Any]] = []
+        paths = [self.active_path] + [path for _, path, _ in reversed(self._segments)]
+        for path in paths:
+            if len(result) >= limit:
+                break
+            result.extend(reversed(self._read_segment(path)))
+        return result[:limit]
+
+    @property
+    def tail_size(self) -> int:
+        return self._tail.maxlen
+
+    def remember(self, entry: Dict[str, Any]):
+        """Adds an entry to the in-memory tail index without writing it."""
+        with self._lock:
+            self._tail.appendleft(entry)
+
+    def append(self, entry: Dict[str, Any]):
+        """Appends a single entry to the log. O(1) in the size of the log."""
+        self.remember(entry)
+        self.write_entries([entry])
+
+    def write_entries(self, entries: Iterable[Dict[str, Any]], fsync: bool = False):
+        """Writes entries to disk in order, rotating segments as they fill up."""
+        lines = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries]
+        with self._lock:
+            while lines:
+                room = self.segment_max_entries - self._active_entries
+                chunk, lines = lines[:max(1, room)], lines[max(1, room):]
+                data = "".join(chunk).encode('utf-8')
+                with open(self.active_path, 'ab') as f:
+                    f.write(data)
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                self._active_entries += len(chunk)
+                self._active_bytes += len(data)
+                if self._active_entries >= self.segment_max_entries or self._active_bytes >= self.segment_max_bytes:
+                    self._rotate()
+
+    def _rotate(self):
+        """Seals the active segment and drops sealed segments no longer needed."""
+        seq = self._segments[-1][0] + 1 if self._segments else 1
+        sealed_path = os.path.join(self.log_directory, f"{self.name}.{seq:06d}.jsonl")
+        os.replace(self.active_path, sealed_path)
+        self._segments.append((seq, sealed_path, self._active_entries))
+        self._active_entries = 0
+        self._active_bytes = 0
+
+        total = sum(count for _, _, count in self._segments)
+        while self._segments and total - self._segments[0][2] >= self.max_entries:
+            _, oldest_path, oldest_count = self._segments.pop(0)
+            total -= oldest_count
+            try:
+                os.remove(oldest_path)
+            except OSError:
+                pass
+
+    def read_latest(self, limit: int) -> List[Dict[str, Any]]:
+        """Returns up to `limit` entries, newest first."""
+        limit = min(limit, self.max_entries)
+        with self._lock:
+            if limit <= len(self._tail) or len(self._tail) < self._tail.maxlen:
+                return list(self._tail)[:limit]
+            return self._read_newest(limit)
+
+
+def migrate_json_array_log(json_path: str, store: JsonlLogStore) -> int:
+    """
+    One-shot migration of a legacy newest-first JSON array log into a JSONL store.
+    The original file is renamed to `<file>.migrated` so the migration never runs twice.
+    Returns the number of migrated entries.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            log_data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        log_data = []
+    if not isinstance(log_data, list):
+        log_data = []
+
+    # Legacy files are newest-first; the store is appended oldest-first.
+    entries = list(reversed(log_data[:store.max_entries]))
+    for entry in entries:
+        store.remember(entry)
+    store.write_entries(entries)
+    os.replace(json_path, json_path + ".migrated")
+    return len(entries)
@@ -0,0 +1,224 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .log_store import JsonlLogStore
+
+OVERFLOW_POLICIES = ("drop", "block", "coalesce")
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+
+class _LogRecord:
+    __slots__ = ("seq", "store", "payload", "category", "coalesced")
+
+    def __init__(self, seq: int, store: Optional['JsonlLogStore'], payload: Any, category: str):
+        self.seq = seq
+        self.store = store          # None for the combined text log
+        self.payload = payload      # Text line or JSON entry
+        self.category = category
+        self.coalesced = 0
+
+
+class AsyncLogWriter(threading.Thread):
+    """
+    A dedicated writer thread that takes log file I/O off the caller's thread.
+
+    Log calls enqueue records into a bounded buffer; the writer wakes up at most
+    every `flush_interval` seconds and group-commits everything queued with one
+    write per file. When the buffer is full the `overflow_policy` decides what
+    happens to a new record:
+      - "drop":     the new record is discarded and counted.
+      - "block":    the caller waits up to `block_timeout` for space, then drops.
+      - "coalesce": the new text record replaces the newest queued record of the
+                    same category (latest value wins); otherwise it is dropped.
+    Structured JSONL records are never coalesced; unless blocking, they evict the
+    oldest queued text line instead, so only free-text activity lines are lost.
+
+    A batch that fails to write (e.g. a full disk) is counted in `write_errors`
+    and reported in the text log by the next batch that succeeds. `flush()`
+    returns False if a write failed since the previous flush, and `close()`
+    reports any failures on stderr.
+    """
+    def __init__(self, text_log_path: str, capacity: int = 4096, flush_interval: float = 0.2,
+                 fsync_policy: str = "never", fsync_interval: float = 5.0,
+                 overflow_policy: str = "drop", block_timeout: float = 0.5):
+        super().__init__(daemon=True)
+        self.name = "LogWriterThread"
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}', expected one of {FSYNC_POLICIES}")
+
+        self.text_log_path = text_log_path
+        self.capacity = max(1, capacity)
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._buffer: Deque[_LogRecord] = deque()
+        self._cond = threading.Condition()
+        self._next_seq = 0
+        self._committed_seq = 0
+        self._flush_requested = False
+        self._closing = False
+        self._last_fsync = time.monotonic()
+        self._text_file = None
+
+        self.dropped = 0
+        self.coalesced = 0
+        self.batches_written = 0
+        self.records_written = 0
+        self._dropped_reported = 0
+        self.write_errors = 0
+        self.last_error: Optional[str] = None
+        self._errors_reported = 0  # Failures already noted in the text log
+        self._errors_flushed = 0  # Failures already returned by flush()
+
+    def submit(self, store: Optional['JsonlLogStore'], payload: Any, category: str) -> bool:
+        """Queues a record. Returns False if the record was dropped."""
+        with self._cond:
+            if self._closing:
+                return False
+            if len(self._buffer) >= self.capacity:
+                if self.overflow_policy == "block":
+                    self._cond.wait_for(lambda: len(self._buffer) < self.capacity or self._closing, timeout=self.block_timeout)
+                elif self.overflow_policy == "coalesce" and store is None and self._coalesce(payload, category):
+                    return True
+                elif store is not None:
+                    self._evict_text_record()
+                if len(self._buffer) >= self.capacity or self._closing:
+                    self.dropped += 1
+                    return False
+
+            self._next_seq += 1
+            self._buffer.append(_LogRecord(self._next_seq, store, payload, category))
+            if len(self._buffer) == 1 or len(self._buffer) >= self.capacity // 2:
+                self._cond.notify_all()
+            return True
+
+    def _evict_text_record(self):
+        """Makes room for a structured record by dropping the oldest queued text line. Caller holds the lock."""
+        for record in self._buffer:
+            if record.store is None:
+                self._buffer.remove(record)
+                self.dropped += 1
+                return
+
+    def _coalesce(self, payload: Any, category: str) -> bool:
+        """Replaces the newest queued text record of the same category. Caller holds the lock."""
+        for record in reversed(self._buffer):
+            if record.store is None and record.category == category:
+                record.payload = payload
+                record.coalesced += 1
+                self.coalesced += 1
+                return True
+        return False
+
+    def run(self):
+        self._text_file = open(self.text_log_path, 'a', encoding='utf-8')
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._buffer or self._flush_requested or self._closing)
+                    # Give other records a chance to join this batch unless someone is waiting on us.
+                    if not (self._flush_requested or self._closing):
+                        self._cond.wait_for(
+                            lambda: self._flush_requested or self._closing or len(self._buffer) >= self.capacity // 2,
+                            timeout=self.flush_interval
+                        )
+                    batch = list(self._buffer)
+                    self._buffer.clear()
+                    self._flush_requested = False
+                    closing = self._closing
+                    self._cond.notify_all()  # Wake producers blocked on a full buffer
+
+                if batch:
+                    self._write_batch(batch)
+                with self._cond:
+                    if batch:
+                        self._committed_seq = batch[-1].seq
+                    self._cond.notify_all()  # Wake callers waiting in flush()
+                if closing and not self._buffer:
+                    break
+        finally:
+            self._text_file.close()
+
+    def _write_batch(self, batch: List[_LogRecord]):
+        """Group-commits a batch: one write for the text log and one per JSONL store."""
+        do_fsync = self.fsync_policy == "batch" or \
+            (self.fsync_policy == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval)
+
+        lines: List[str] = []
+        entries_by_store: Dict[int, List[Any]] = {}
+        stores: Dict[int, 'JsonlLogStore'] = {}
+        for record in batch:
+            if record.store is None:
+                line = record.payload
+                if record.coalesced:
+                    line = f"{line.rstrip()} (+{record.coalesced} coalesced)\n"
+                lines.append(line)
+            else:
+                stores[id(record.store)] = record.store
+                entries_by_store.setdefault(id(record.store), []).append(record.payload)
+
+        dropped = self.dropped
+        if dropped > self._dropped_reported:
+            lines.append(f"{datetime.now().isoformat()} - [LOGGING_WARNING] Log queue full, "
+                         f"{dropped - self._dropped_reported} records dropped ({dropped} total).\n")
+            self._dropped_reported = dropped
+        errors = self.write_errors
+        if errors > self._errors_reported:
+            lines.append(f"{datetime.now().isoformat()} - [LOGGING_ERROR] {errors - self._errors_reported} log batches "
+                         f"failed to write ({errors} total), last error: {self.last_error}.\n")
+
+        try:
+            for key, entries in entries_by_store.items():
+                stores[key].write_entries(entries, fsync=do_fsync)
+            if lines:
+                self._text_file.write("".join(lines))
+                self._text_file.flush()
+                if do_fsync:
+                    os.fsync(self._text_file.fileno())
+            self._errors_reported = errors
+        except OSError as e:
+            # Never let a disk error kill the writer thread; the failure is surfaced by flush() and close().
+            self.write_errors += 1
+            self.last_error = f"batch of {len(batch)} records: {e}"
+
+        if do_fsync:
+            self._last_fsync = time.monotonic()
+        self.batches_written += 1
+        self.records_written += len(batch)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Blocks until every record queued before this call has been processed. Returns
+        False on timeout or if a batch failed to write since the previous flush.
+        """
+        with self._cond:
+            target = self._next_seq
+            if self._committed_seq < target and self.is_alive():
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._committed_seq >= target, timeout=timeout)
+            failed = self.write_errors > self._errors_flushed
+            self._errors_flushed = self.write_errors
+            return self._committed_seq >= target and not failed
+
+    def close(self, timeout: float = 5.0):
+        """Flushes outstanding records and stops the writer thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout=timeout)
+        if self.write_errors:
+            # The log files themselves may be what is failing, so stderr is the place left to say so
+            sys.stderr.write(f"Log writer: {self.write_errors} batches failed to write, last {self.last_error}\n")
@@ -1,44 +1,104 @@
-import json
+import atexit
 import os
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .config import LoggingConfig
+from .log_store import JsonlLogStore, migrate_json_array_log
+from .log_writer import AsyncLogWriter
+
+# Severity levels, ordered like the standard library's logging levels.
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+
+def level_for_category(activity_type: str) -> int:
+    """Infers the severity of an activity category from its suffix (e.g. TTS_DEBUG, MOTOR_ERROR)."""
+    if activity_type.endswith("_ERROR") or activity_type == "ERROR":
+        return ERROR
+    if activity_type.endswith(("_WARNING", "_WARN")):
+        return WARNING
+    if activity_type.endswith("_DEBUG"):
+        return DEBUG
+    return INFO
+
 
 class LoggingSystem:
-    def __init__(self, log_directory: str, max_log_entries: int = 1000):
+    def __init__(self, log_directory: str, max_log_entries: int = 1000, config: Optional[LoggingConfig] = None):
         self.log_directory = log_directory
         self.max_log_entries = max_log_entries
+        self.config = config or LoggingConfig(log_directory=log_directory, max_log_entries=max_log_entries)
         os.makedirs(self.log_directory, exist_ok=True)
 
-        self.conversation_log_path = os.path.join(self.log_directory, "conversation_log.json")
-        self.movement_log_path = os.path.join(self.log_directory, "movement_log.json")
-        self.stt_log_path = os.path.join(self.log_directory, "stt_log.json")
-        self.tts_log_path = os.path.join(self.log_directory, "tts_log.json")
+        self.level = LEVELS.get(self.config.level.upper(), INFO)
+        self.category_levels = {category: LEVELS.get(name.upper(), INFO) for category, name in self.config.category_levels.items()}
+        # Per-category caches so filtering a record costs two dict lookups.
+        self._default_levels: Dict[str, int] = {}
+        self._thresholds: Dict[str, int] = {}
+
         self.combined_activity_path = os.path.join(self.log_directory, "combined_activity.txt")
 
-    def _write_json_log(self, file_path: str, entry: Dict[str, Any]):
-        """Writes a new entry to a JSON log file, handling rotation."""
-        log_data = []
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except json.JSONDecodeError:
-                    log_data = []
-        
-        log_data.insert(0, entry)
-        
-        if len(log_data) > self.max_log_entries:
-            log_data = log_data[:self.max_log_entries]
-            
-        with open(file_path, 'w') as f:
-            json.dump(log_data, f, indent=4)
+        self._writer = None
+        if self.config.async_writes:
+            self._writer = AsyncLogWriter(
+                self.combined_activity_path,
+                capacity=self.config.queue_capacity,
+                flush_interval=self.config.flush_interval,
+                fsync_policy=self.config.fsync_policy,
+                fsync_interval=self.config.fsync_interval,
+                overflow_policy=self.config.overflow_policy,
+                block_timeout=self.config.block_timeout
+            )
+            self._writer.start()
+            atexit.register(self.close)
+
+        self.conversation_log = self._open_store("conversation_log")
+        self.movement_log = self._open_store("movement_log")
+        self.stt_log = self._open_store("stt_log")
+        self.tts_log = self._open_store("tts_log")
 
-    def _write_text_log(self, message: str):
+        self.conversation_log_path = self.conversation_log.active_path
+        self.movement_log_path = self.movement_log.active_path
+        self.stt_log_path = self.stt_log.active_path
+        self.tts_log_path = self.tts_log.active_path
+
+    def _open_store(self, name: str) -> JsonlLogStore:
+        """Opens a JSONL log store, migrating a legacy JSON array log on first use."""
+        store = JsonlLogStore(
+            self.log_directory, name,
+            max_entries=self.max_log_entries,
+            segment_max_entries=self.config.segment_max_entries,
+            segment_max_bytes=self.config.segment_max_bytes,
+            tail_size=self.config.tail_index_size
+        )
+        legacy_path = os.path.join(self.log_directory, f"{name}.json")
+        if os.path.exists(legacy_path):
+            migrated = migrate_json_array_log(legacy_path, store)
+            self._write_text_log(f"[LOGGING] Migrated {migrated} entries from {legacy_path} to {store.active_path}")
+        return store
+
+    def _write_json_log(self, store: JsonlLogStore, entry: Dict[str, Any]):
+        """Appends a new entry to a JSONL log store; rotation is handled by the store."""
+        if self._writer:
+            if self._writer.submit(store, entry, store.name):
+                store.remember(entry)
+        else:
+            store.append(entry)
+
+    def _write_text_log(self, message: str, category: str = "TEXT"):
         """Appends a message to the combined text log."""
+        line = f"{datetime.now().isoformat()} - {message}\n"
+        if self._writer:
+            self._writer.submit(None, line, category)
+            return
         with open(self.combined_activity_path, 'a', encoding='utf-8') as f:
-            f.write(f"{datetime.now().isoformat()} - {message}\n")
+            f.write(line)
 
-    def log_conversation(self, user_input: str, ai_response: str, processing_time: float, ai_source: str):
+    def log_conversation(self, user_input: str, ai_response: str, processing_time: float, ai_source: str,
+                         time_to_first_token: Optional[float] = None, time_to_first_audio: Optional[float] = None):
         entry = {
             "timestamp": datetime.now().isoformat(),
             "user_input": user_input,
@@ -46,7 +106,12 @@ class LoggingSystem:
             "processing_time": processing_time,
             "ai_source": ai_source
         }
-        self._write_json_log(self.conversation_log_path, entry)
+        # Latency metrics are only known for streamed turns
+        if time_to_first_token is not None:
+            entry["time_to_first_token"] = time_to_first_token
+        if time_to_first_audio is not None:
+            entry["time_to_first_audio"] = time_to_first_audio
+        self._write_json_log(self.conversation_log, entry)
         self.log_activity("CONVERSATION", f"User: {user_input}, AI: {ai_response}")
 
     def log_movement(self, command: str, duration: float, success: bool):
@@ -56,7 +121,7 @@ class LoggingSystem:
             "duration": duration,
             "success": success
         }
-        self._write_json_log(self.movement_log_path, entry)
+        self._write_json_log(self.movement_log, entry)
         self.log_activity("MOVEMENT", f"Command: {command}, Duration: {duration}, Success: {success}")
 
     def log_stt(self, recognized_text: str, confidence: float):
@@ -65,7 +130,7 @@ class LoggingSystem:
             "recognized_text": recognized_text,
             "confidence": confidence
         }
-        self._write_json_log(self.stt_log_path, entry)
+        self._write_json_log(self.stt_log, entry)
         self.log_activity("STT", f"Recognized: '{recognized_text}', Confidence: {confidence:.2f}")
 
     def log_tts(self, text: str, success: bool):
@@ -74,27 +139,61 @@ class LoggingSystem:
             "text": text,
             "success": success
         }
-        self._write_json_log(self.tts_log_path, entry)
+        self._write_json_log(self.tts_log, entry)
         if success:
             self.log_activity("TTS", f"Spoke: '{text}'")
         else:
             self.log_activity("TTS_ERROR", f"Failed to speak: '{text}'")
             
-    def log_activity(self, activity_type: str, details: str):
-        self._write_text_log(f"[{activity_type}] {details}")
-
-    def _read_json_log(self, file_path: str, limit: int) -> List[Dict[str, Any]]:
-        if not os.path.exists(file_path):
-            return []
-        with open(file_path, 'r') as f:
-            try:
-                log_data = json.load(f)
-                return log_data[:limit]
-            except json.JSONDecodeError:
-                return []
+    def is_enabled_for(self, activity_type: str, level: Optional[int] = None) -> bool:
+        """Returns True if a record of this category and level would be written."""
+        if level is None:
+            level = self._default_levels.get(activity_type)
+            if level is None:
+                level = self._default_levels[activity_type] = level_for_category(activity_type)
+        threshold = self._thresholds.get(activity_type)
+        if threshold is None:
+            threshold = self._thresholds[activity_type] = self.category_levels.get(activity_type, self.level)
+        return level >= threshold
+
+    def log_activity(self, activity_type: str, details: Union[str, Callable[[], str]], *args: Any, level: Optional[int] = None):
+        """
+        Logs an activity line. Formatting is deferred until the record is known to pass
+        the level filter: `details` may be a %-style format string with `args`, or a
+        zero-argument callable returning the message.
+        """
+        if not self.is_enabled_for(activity_type, level):
+            return
+        if callable(details):
+            details = details()
+        elif args:
+            details = details % args
+        self._write_text_log(f"[{activity_type}] {details}", activity_type)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Blocks until all queued log records have been written. Returns False on timeout or
+        if the background writer failed to write a batch since the last flush.
+        No-op in synchronous mode.
+        """
+        if self._writer:
+            return self._writer.flush(timeout)
+        return True
+
+    def close(self):
+        """Flushes and stops the background writer, if any. Safe to call more than once."""
+        if self._writer:
+            self._writer.close()
+
+    def _read_json_log(self, store: JsonlLogStore, limit: int) -> List[Dict[str, Any]]:
+        """Returns the newest `limit` entries of a log store, newest first."""
+        if self._writer and limit > store.tail_size:
+            # Reads beyond the tail index go to disk, so make sure queued entries are there.
+            self._writer.flush()
+        return store.read_latest(limit)
 
     def get_conversation_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        return self._read_json_log(self.conversation_log_path, limit)
+        return self._read_json_log(self.conversation_log, limit)
 
     def get_movement_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        return self._read_json_log(self.movement_log_path, limit)
+        return self._read_json_log(self.movement_log, limit)
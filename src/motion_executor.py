@@ -0,0 +1,357 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from .config import MotionConfig
+from .error_handler import MotorError
+from .motor_controller import STATIONARY_MOTIONS
+
+if TYPE_CHECKING:
+    from .event_bus import EventBus
+    from .logging_system import LoggingSystem
+    from .motor_controller import MotorController
+
+# Lower numbers run first. A stop always outranks any motion.
+PRIORITY_STOP = 0
+PRIORITY_NORMAL = 10  # Manual control from the web UI and API
+PRIORITY_VOICE = 15
+PRIORITY_AUTONOMOUS = 20  # Wander/avoid behaviour; any interactive command outranks it
+
+
+def trapezoid_duty(elapsed: float, duration: Optional[float], speed: float, ramp: float) -> float:
+    """
+    Duty cycle `elapsed` seconds into a move of `duration` seconds (None: open-ended)
+    that accelerates to `speed` over `ramp` seconds and decelerates over the last
+    `ramp` seconds. Moves shorter than two ramps get a triangular profile.
+    """
+    if ramp <= 0:
+        return speed
+    up = elapsed / ramp
+    down = (duration - elapsed) / ramp if duration is not None else 1.0
+    return speed * max(0.0, min(1.0, up, down))
+
+
+@dataclass
+class MotionCommand:
+    """A timed motion primitive and its lifecycle, as seen by pollers."""
+    command_id: int
+    action: str  # A motion in the motor controller's pattern table, or "stop"
+    duration: Optional[float]  # None runs until stopped or preempted
+    speed: float  # Cruise duty cycle, 0..1
+    priority: int
+    deadline: float  # perf_counter() by which it must start, or it expires
+    source: str = ""
+    status: str = "queued"  # queued, running, completed, preempted, expired, failed
+    created_at: float = field(default_factory=time.perf_counter)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def describe_duration(self) -> str:
+        return f"for {self.duration}s" if self.duration is not None else "until stopped"
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ("queued", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(start, end):
+            return round((end - start) * 1000, 1) if start is not None and end is not None else None
+        return {
+            "command_id": self.command_id,
+            "action": self.action,
+            "duration": self.duration,
+            "speed": self.speed,
+            "priority": self.priority,
+            "source": self.source,
+            "status": self.status,
+            "queued_ms": ms(self.created_at, self.started_at),
+            "run_ms": ms(self.started_at, self.finished_at),
+            "error": self.error,
+        }
+
+
+class MotionExecutor(threading.Thread):
+    """
+    The only thread that drives the motors. Callers submit timed motion primitives
+    and get a MotionCommand back immediately; the motion thread runs them in
+    (priority, deadline) order and ends each one by stopping the motors.
+
+    A stop jumps the queue: it cancels everything queued, interrupts the running
+    motion and drives the pins LOW within one scheduler tick. The delay from the
+    stop request to the pins going LOW is logged and kept in `stop_latencies`.
+
+    With an event bus, each command is published on the "motion" topic when it
+    starts running and when it finishes. Listeners added with `add_listener` are
+    called with every command once it is done, including queued commands that were
+    preempted before they started.
+    """
+    def __init__(self, motor_controller: 'MotorController', logger: 'LoggingSystem', config: Optional[MotionConfig] = None,
+                 event_bus: Optional['EventBus'] = None):
+        super().__init__(daemon=True)
+        self.name = "MotionExecutorThread"
+        self.motor_controller = motor_controller
+        self.logger = logger
+        self.config = config or MotionConfig()
+        self.event_bus = event_bus
+
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, float, int, MotionCommand]] = []
+        self._ids = itertools.count(1)
+        self._history: 'OrderedDict[int, MotionCommand]' = OrderedDict()
+        self._current: Optional[MotionCommand] = None
+        self._interrupt = False
+        self.running = False
+        self.stop_latencies: List[float] = []
+        self.speed_limit = 1.0  # Cap on the duty cycle of every motion, e.g. from the safety monitor
+        self.listeners: List[Callable[[MotionCommand], None]] = []
+
+    # --- Submission (any thread) ---
+
+    def resolve_speed(self, speed: Union[None, str, float]) -> float:
+        """Maps None, "slow", "normal", "fast" or a number above 0 to a duty cycle in 0..1."""
+        if speed is None or speed == "normal":
+            return self.config.default_speed
+        if speed == "slow":
+            return self.config.slow_speed
+        if speed == "fast":
+            return self.config.fast_speed
+        try:
+            value = float(speed)
+        except (TypeError, ValueError):
+            raise MotorError(f"Invalid speed: {speed!r}")
+        if not value > 0:
+            # A duty cycle of 0 would queue a motion that never moves
+            raise MotorError(f"Speed must be above 0: {speed!r}")
+        return min(1.0, value)
+
+    def ramp_seconds(self, speed: float) -> float:
+        """Time to accelerate from rest to `speed` (and to brake back down)."""
+        return speed / self.config.acceleration if self.config.acceleration > 0 else 0.0
+
+    def turn_duration(self, angle: float, speed: float) -> float:
+        """
+        How long to run a spin turn of `angle` degrees at `speed`. The trapezoid covers
+        speed * (T - ramp) of full-speed time, so T = base / speed + ramp.
+        """
+        base = self.config.seconds_per_90_degrees * angle / 90.0
+        return base / max(speed, 0.05) + self.ramp_seconds(speed)
+
+    def submit_turn(self, direction: str, angle: float = 90.0, speed: Union[None, str, float] = None,
+                    **kwargs) -> MotionCommand:
+        try:
+            angle = float(angle)
+        except (TypeError, ValueError):
+            raise MotorError(f"Invalid angle: {angle!r}")
+        if not 0 < angle <= 360:
+            raise MotorError(f"Angle must be in (0, 360] degrees: {angle!r}")
+        resolved = self.resolve_speed(speed)
+        return self.submit(direction, self.turn_duration(angle, resolved), speed=resolved, **kwargs)
+
+    def submit(self, action: str, duration: Optional[float], speed: Union[None, str, float] = None,
+               priority: int = PRIORITY_NORMAL, source: str = "", preempt: bool = True,
+               deadline: Optional[float] = None) -> MotionCommand:
+        """
+        Queues a motion for `duration` seconds (None: until stopped or preempted), ramping
+        up to `speed` and back down within that time. With `preempt`, it replaces the
+        running motion and anything queued at the same or a lower priority, which is
+        what interactive control wants; otherwise it runs after them.
+        """
+        if action not in self.motor_controller.motion_names or action in STATIONARY_MOTIONS:
+            raise MotorError(f"Unknown motion: {action}")
+        now = time.perf_counter()
+        command = MotionCommand(
+            next(self._ids), action, duration, self.resolve_speed(speed), priority,
+            deadline=now + (deadline if deadline is not None else self.config.start_deadline),
+            source=source, created_at=now
+        )
+        dropped = []
+        with self._cond:
+            if preempt:
+                dropped = self._drop_queued(lambda queued: queued.priority >= priority, "preempted")
+                if self._current and self._current.priority >= priority:
+                    self._interrupt = True
+            self._enqueue(command)
+        self._notify(dropped)
+        self.logger.log_activity("MOTION", "Queued #%d %s %s at speed %.2f (priority %d, %s).", command.command_id, action,
+                                 command.describe_duration(), command.speed, priority, source or "unknown source")
+        return command
+
+    def stop(self, source: str = "") -> MotionCommand:
+        """Stops the motors as soon as possible, cancelling all queued motions."""
+        now = time.perf_counter()
+        command = MotionCommand(next(self._ids), "stop", 0.0, 0.0, PRIORITY_STOP, deadline=float('inf'),
+                                source=source, created_at=now)
+        with self._cond:
+            dropped = self._drop_queued(lambda queued: True, "preempted")
+            if self._current:
+                self._interrupt = True
+            self._enqueue(command)
+        self._notify(dropped)
+        return command
+
+    def _enqueue(self, command: MotionCommand):
+        heapq.heappush(self._queue, (command.priority, command.deadline, command.command_id, command))
+        self._history[command.command_id] = command
+        while len(self._history) > self.config.history_size:
+            self._history.popitem(last=False)
+        self._cond.notify()
+
+    def _drop_queued(self, predicate, status: str) -> List[MotionCommand]:
+        kept, dropped = [], []
+        for entry in self._queue:
+            command = entry[3]
+            if predicate(command):
+                command.status = status
+                command.finished_at = time.perf_counter()
+                dropped.append(command)
+            else:
+                kept.append(entry)
+        heapq.heapify(kept)
+        self._queue = kept
+        return dropped
+
+    def add_listener(self, listener: Callable[[MotionCommand], None]):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[MotionCommand], None]):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, commands: List[MotionCommand]):
+        for command in commands:
+            for listener in self.listeners:
+                try:
+                    listener(command)
+                except Exception as e:
+                    self.logger.log_activity("MOTION_ERROR", f"Motion listener failed: {e}")
+
+    # --- Status (any thread) ---
+
+    def get_status(self, command_id: int) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            command = self._history.get(command_id)
+        return command.to_dict() if command else None
+
+    @property
+    def current(self) -> Optional[MotionCommand]:
+        return self._current
+
+    @property
+    def idle(self) -> bool:
+        """True when nothing is running or queued."""
+        with self._cond:
+            return self._current is None and not self._queue
+
+    def set_speed_limit(self, limit: float):
+        """Caps the duty cycle of the running and all later motions; takes effect within one tick."""
+        self.speed_limit = max(0.0, min(1.0, limit))
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats_summary(self) -> str:
+        if not self.stop_latencies:
+            return "no stops"
+        latencies = sorted(self.stop_latencies)
+        return (f"{len(latencies)} stops, latency median {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+                f"max {latencies[-1] * 1000:.1f} ms")
+
+    # --- Motion thread ---
+
+    def run(self):
+        self.running = True
+        while self.running:
+            with self._cond:
+                if not self._queue:
+                    self._cond.wait(self.config.tick_seconds)
+                if not self._queue:
+                    continue
+                command = heapq.heappop(self._queue)[3]
+                self._current = command
+                self._interrupt = False
+            try:
+                self._execute(command)
+            except Exception as e:
+                command.status = "failed"
+                command.error = str(e)
+                self.logger.log_activity("MOTION_ERROR", f"Motion #{command.command_id} {command.action} failed: {e}")
+                self._halt()
+            finally:
+                if command.finished_at is None:
+                    command.finished_at = time.perf_counter()
+                with self._cond:
+                    self._current = None
+                self._publish(command)
+                self._notify([command])
+
+    def _publish(self, command: MotionCommand):
+        if self.event_bus:
+            self.event_bus.publish("motion", command.to_dict())
+
+    def _execute(self, command: MotionCommand):
+        command.started_at = time.perf_counter()
+        if command.action == "stop":
+            self._halt()
+            command.status = "completed"
+            command.finished_at = time.perf_counter()
+            latency = command.finished_at - command.created_at
+            self.stop_latencies.append(latency)
+            self.logger.log_activity("MOTION", "Stop #%d (%s): pins LOW %.1f ms after the request.",
+                                     command.command_id, command.source or "unknown source", latency * 1000)
+            self.logger.log_movement("stop", 0, True)
+            return
+
+        if command.started_at > command.deadline:
+            command.status = "expired"
+            self.logger.log_activity("MOTION_WARNING", f"Motion #{command.command_id} {command.action} expired "
+                                                       f"after waiting {(command.started_at - command.created_at):.2f}s.")
+            return
+
+        command.status = "running"
+        self._publish(command)
+        self.logger.log_activity("MOTOR_COMMAND", f"{command.action} {command.describe_duration()} (#{command.command_id})")
+        # Start from rest and ramp up; the profile brings the duty back to 0 by the end.
+        ramp = self.ramp_seconds(command.speed)
+        self.motor_controller.start_motion(command.action,
+                                           speed=min(trapezoid_duty(0.0, command.duration, command.speed, ramp), self.speed_limit))
+        end = command.started_at + command.duration if command.duration is not None else float('inf')
+        while True:
+            now = time.perf_counter()
+            with self._cond:
+                if not self.running or self._interrupt or now >= end:
+                    break
+            duty = trapezoid_duty(now - command.started_at, command.duration, command.speed, ramp)
+            self.motor_controller.set_speed(min(duty, self.speed_limit))
+            with self._cond:
+                # Wakes on notify(), so a stop lands well within one tick.
+                if not self._interrupt:
+                    self._cond.wait(min(end - now, self.config.tick_seconds))
+        with self._cond:
+            interrupted = self._interrupt
+            # If a stop interrupted us it is next in line and drives the pins LOW itself.
+            stop_next = interrupted and bool(self._queue) and self._queue[0][3].action == "stop"
+        if not stop_next:
+            self._halt()
+        command.finished_at = time.perf_counter()
+        command.status = "preempted" if interrupted else "completed"
+        self.logger.log_movement(command.action, round(command.finished_at - command.started_at, 3), not interrupted)
+
+    def _halt(self):
+        self.motor_controller.halt()
+
+    def shutdown(self, timeout: float = 1.0):
+        """Stops the motors and the motion thread."""
+        self.stop("shutdown")
+        deadline = time.time() + timeout
+        while self._queue and time.time() < deadline:
+            time.sleep(self.config.tick_seconds)
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout=timeout)
+        self.logger.log_activity("MOTION", f"Motion executor stopped: {self.stats_summary()}.")
@@ -1,53 +1,213 @@
 import time
+from collections import deque
 from .error_handler import MotorError
 from .logging_system import LoggingSystem
-from typing import TYPE_CHECKING
+from typing import Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .logging_system import LoggingSystem
+    from .simulator import Simulator
+
+WHEELS = ("front_left", "front_right", "rear_left", "rear_right")
+
+# Per-wheel drive: 1 forward, -1 backward, 0 coast (both inputs LOW), "brake" (both HIGH).
+WheelDrive = Union[int, str]
+
+# Built-in motions. Custom ones from HardwareConfig.motor_patterns are merged over these.
+MOTION_PATTERNS: Dict[str, Dict[str, WheelDrive]] = {
+    "forward": {"front_left": 1, "front_right": 1, "rear_left": 1, "rear_right": 1},
+    "backward": {"front_left": -1, "front_right": -1, "rear_left": -1, "rear_right": -1},
+    # Spin turns in place: one side backward, the other forward
+    "left": {"front_left": -1, "front_right": 1, "rear_left": -1, "rear_right": 1},
+    "right": {"front_left": 1, "front_right": -1, "rear_left": 1, "rear_right": -1},
+    # Arc turns: the inner side coasts
+    "arc_left": {"front_left": 0, "front_right": 1, "rear_left": 0, "rear_right": 1},
+    "arc_right": {"front_left": 1, "front_right": 0, "rear_left": 1, "rear_right": 0},
+    "brake": {"front_left": "brake", "front_right": "brake", "rear_left": "brake", "rear_right": "brake"},
+    "coast": {"front_left": 0, "front_right": 0, "rear_left": 0, "rear_right": 0},
+}
+
+SIMULATOR_MESSAGES = {
+    "forward": "Moving forward.",
+    "backward": "Moving backward.",
+    "left": "Turning left.",
+    "right": "Turning right.",
+    "coast": "Stopping motors.",
+}
+
+# Motions that hold the robot still rather than drive it
+STATIONARY_MOTIONS = ("brake", "coast")
+
+
+def _input_levels(drive: WheelDrive) -> Tuple[int, int]:
+    """H-bridge input levels (IN1, IN2) for one wheel's drive value."""
+    if drive == "brake":
+        return 1, 1
+    if drive == 1:
+        return 1, 0
+    if drive == -1:
+        return 0, 1
+    if drive == 0:
+        return 0, 0
+    raise MotorError(f"Invalid wheel drive value: {drive!r}")
+
 
 class MotorController:
-    def __init__(self, platform: str, motor_pins: dict, logger: 'LoggingSystem'):
+    """
+    Drives the four wheel motors. Every motion is a precomputed vector of pin
+    levels (see MOTION_PATTERNS), applied with one batched `gpio.output(pins, levels)`
+    call that only includes pins whose level actually changes, so all wheels switch
+    together. Speed is a PWM duty cycle on each wheel's H-bridge enable pin
+    (`enable_pins`); every change is recorded in `duty_timeline`, in simulation
+    too, so acceleration ramps can be checked without hardware.
+    `start_motion` and `halt` only set the pins and return immediately,
+    for use by the MotionExecutor's motion thread; the move/turn methods below are
+    blocking conveniences built on them.
+    """
+    def __init__(self, platform: str, motor_pins: dict, logger: 'LoggingSystem',
+                 motor_patterns: Optional[Dict[str, Dict[str, WheelDrive]]] = None, gpio=None,
+                 enable_pins: Optional[Dict[str, int]] = None, pwm_frequency: int = 1000,
+                 timeline_size: int = 10000, simulator: Optional['Simulator'] = None):
         self.platform = platform
+        self.simulator = simulator
         self.motor_pins = motor_pins
+        self.enable_pins = enable_pins or {}
+        self.pwm_frequency = pwm_frequency
         self.logger = logger
         self.gpio = None
+        self._pin_state: Dict[int, int] = {}  # Last level written to each pin
+        self._pwm: Dict[str, object] = {}  # Wheel -> PWM channel on its H-bridge enable pin
+        self.current_motion = "coast"
+        self.pin_writes = 0
+        self.duty = 0.0
+        # (perf_counter, motion, duty) at every speed change, for inspecting ramps
+        self.duty_timeline = deque(maxlen=timeline_size)
+
+        self.patterns = dict(MOTION_PATTERNS)
+        self.patterns.update(motor_patterns or {})
+        self._vectors = self._build_vectors()
 
-        if self.platform == "raspberry_pi":
+        # A GPIO module (e.g. FakeGPIO) can be injected to drive the hardware path without a Pi.
+        if gpio is not None or self.platform == "raspberry_pi":
             try:
-                import RPi.GPIO as GPIO
-                self.gpio = GPIO
+                if gpio is None:
+                    import RPi.GPIO as gpio
+                self.gpio = gpio
                 self.gpio.setmode(self.gpio.BCM)
                 # Setup motor pins
                 for motor in self.motor_pins.values():
                     for pin in motor:
                         self.gpio.setup(pin, self.gpio.OUT)
                         self.gpio.output(pin, self.gpio.LOW)
+                        self._pin_state[pin] = 0
+                self._setup_pwm()
+                self.platform = "raspberry_pi"
                 self.logger.log_activity("MOTOR", "GPIO pins initialized for motors.")
             except (ImportError, RuntimeError) as e:
+                self.gpio = None
                 self.logger.log_activity("MOTOR_ERROR", f"Failed to initialize GPIO: {e}. Running in simulation mode.")
                 self.platform = "windows" # Fallback to simulation
-        
+
+        if self.platform == "simulator" and self.simulator is None:
+            self.logger.log_activity("MOTOR_ERROR", "No simulator given for the simulator platform. Running in print-only simulation mode.")
+            self.platform = "windows"
+
         self.logger.log_activity("MOTOR", f"Motor controller initialized in {self.platform} mode.")
 
+    def _setup_pwm(self):
+        for wheel, pin in self.enable_pins.items():
+            self.gpio.setup(pin, self.gpio.OUT)
+            pwm = self.gpio.PWM(pin, self.pwm_frequency)
+            pwm.start(0)
+            self._pwm[wheel] = pwm
+        if self._pwm:
+            self.logger.log_activity("MOTOR", f"PWM speed control on {sorted(self._pwm)} at {self.pwm_frequency} Hz.")
+        else:
+            self.logger.log_activity("MOTOR_WARNING", "No enable_pins configured; motors run at full speed only.")
+
+    def _build_vectors(self) -> Dict[str, Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+        """Precomputes (pins, levels) for every motion over the configured wheels."""
+        vectors = {}
+        for name, pattern in self.patterns.items():
+            pins: List[int] = []
+            levels: List[int] = []
+            for wheel, wheel_pins in self.motor_pins.items():
+                in1, in2 = _input_levels(pattern.get(wheel, 0))
+                pins += [wheel_pins[0], wheel_pins[1]]
+                levels += [in1, in2]
+            vectors[name] = (tuple(pins), tuple(levels))
+        return vectors
+
+    @property
+    def motion_names(self) -> List[str]:
+        return list(self.patterns)
+
+    def _apply(self, name: str, force: bool = False):
+        """
+        Writes the pin vector for motion `name`, skipping pins already at their level.
+        With `force`, every pin is written regardless of the cached levels.
+        """
+        vector = self._vectors.get(name)
+        if vector is None:
+            raise MotorError(f"Unknown motion: {name}")
+        self.current_motion = name
+        if self.simulator is not None:
+            self.simulator.set_motion(self.patterns[name])
+            return
+        if self.platform != "raspberry_pi":
+            print(f"SIMULATOR: {SIMULATOR_MESSAGES.get(name, f'Applying {name} motion.')}")
+            return
+
+        changed_pins = []
+        changed_levels = []
+        for pin, level in zip(*vector):
+            if force or self._pin_state.get(pin) != level:
+                changed_pins.append(pin)
+                changed_levels.append(level)
+        if not changed_pins:
+            return
+        try:
+            self.gpio.output(changed_pins, changed_levels)
+        except (TypeError, ValueError):
+            # Very old RPi.GPIO releases only accept one channel per call.
+            for pin, level in zip(changed_pins, changed_levels):
+                self.gpio.output(pin, level)
+        for pin, level in zip(changed_pins, changed_levels):
+            self._pin_state[pin] = level
+        self.pin_writes += len(changed_pins)
+
+    def set_speed(self, duty: float, force: bool = False):
+        """Sets the PWM duty cycle (0..1) on every wheel's enable pin; unchanged duties are skipped unless `force`."""
+        duty = max(0.0, min(1.0, duty))
+        if duty == self.duty and not force:
+            return
+        self.duty = duty
+        self.duty_timeline.append((time.perf_counter(), self.current_motion, duty))
+        if self.simulator is not None:
+            self.simulator.set_duty(duty)
+        for pwm in self._pwm.values():
+            pwm.ChangeDutyCycle(duty * 100.0)
+
+    def start_motion(self, direction: str, speed: Optional[float] = None):
+        """
+        Applies motion `direction` (any name in the pattern table) without blocking. If
+        `speed` is given, the duty cycle is set first so the wheels never see a jump.
+        """
+        if speed is not None:
+            self.set_speed(speed)
+        self._apply(direction)
+
+    def halt(self):
+        """
+        Drives every motor pin LOW and the duty cycle to 0 without blocking. All pins
+        are written, whatever the cache says, so a stop never depends on it.
+        """
+        self._apply("coast", force=True)
+        self.set_speed(0.0, force=True)
+
     def move_forward(self, duration: float = None):
         self.logger.log_activity("MOTOR_COMMAND", f"move_forward for {duration}s")
-        if self.platform == "raspberry_pi":
-            # Assuming a simple HIGH/LOW for direction for now.
-            # Front Left
-            self.gpio.output(self.motor_pins['front_left'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['front_left'][1], self.gpio.LOW)
-            # Front Right
-            self.gpio.output(self.motor_pins['front_right'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['front_right'][1], self.gpio.LOW)
-            # Rear Left
-            self.gpio.output(self.motor_pins['rear_left'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['rear_left'][1], self.gpio.LOW)
-            # Rear Right
-            self.gpio.output(self.motor_pins['rear_right'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['rear_right'][1], self.gpio.LOW)
-        else:
-            print("SIMULATOR: Moving forward.")
+        self.start_motion("forward", speed=1.0)
 
         if duration:
             time.sleep(duration)
@@ -57,21 +217,7 @@ class MotorController:
 
     def move_backward(self, duration: float = None):
         self.logger.log_activity("MOTOR_COMMAND", f"move_backward for {duration}s")
-        if self.platform == "raspberry_pi":
-            # Front Left
-            self.gpio.output(self.motor_pins['front_left'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['front_left'][1], self.gpio.HIGH)
-            # Front Right
-            self.gpio.output(self.motor_pins['front_right'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['front_right'][1], self.gpio.HIGH)
-            # Rear Left
-            self.gpio.output(self.motor_pins['rear_left'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['rear_left'][1], self.gpio.HIGH)
-            # Rear Right
-            self.gpio.output(self.motor_pins['rear_right'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['rear_right'][1], self.gpio.HIGH)
-        else:
-            print("SIMULATOR: Moving backward.")
+        self.start_motion("backward", speed=1.0)
 
         if duration:
             time.sleep(duration)
@@ -81,19 +227,8 @@ class MotorController:
     def turn_left(self, angle: float = 90):
         duration = angle / 90.0 # Simple linear relationship, assuming 1s for 90 degrees
         self.logger.log_activity("MOTOR_COMMAND", f"turn_left for {angle} degrees ({duration}s)")
-        if self.platform == "raspberry_pi":
-            # Left side backward, right side forward
-            self.gpio.output(self.motor_pins['front_left'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['front_left'][1], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['rear_left'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['rear_left'][1], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['front_right'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['front_right'][1], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['rear_right'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['rear_right'][1], self.gpio.LOW)
-        else:
-            print("SIMULATOR: Turning left.")
-        
+        self.start_motion("left", speed=1.0)
+
         time.sleep(duration)
         self.stop()
         self.logger.log_movement("left", duration, True)
@@ -101,18 +236,7 @@ class MotorController:
     def turn_right(self, angle: float = 90):
         duration = angle / 90.0 # Simple linear relationship, assuming 1s for 90 degrees
         self.logger.log_activity("MOTOR_COMMAND", f"turn_right for {angle} degrees ({duration}s)")
-        if self.platform == "raspberry_pi":
-            # Right side backward, left side forward
-            self.gpio.output(self.motor_pins['front_right'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['front_right'][1], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['rear_right'][0], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['rear_right'][1], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['front_left'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['front_left'][1], self.gpio.LOW)
-            self.gpio.output(self.motor_pins['rear_left'][0], self.gpio.HIGH)
-            self.gpio.output(self.motor_pins['rear_left'][1], self.gpio.LOW)
-        else:
-            print("SIMULATOR: Turning right.")
+        self.start_motion("right", speed=1.0)
 
         time.sleep(duration)
         self.stop()
@@ -120,15 +244,13 @@ class MotorController:
 
     def stop(self):
         self.logger.log_activity("MOTOR_COMMAND", "stop")
-        if self.platform == "raspberry_pi":
-            for motor in self.motor_pins.values():
-                for pin in motor:
-                    self.gpio.output(pin, self.gpio.LOW)
-        else:
-            print("SIMULATOR: Stopping motors.")
+        self.halt()
         self.logger.log_movement("stop", 0, True)
 
     def cleanup(self):
+        for pwm in self._pwm.values():
+            pwm.stop()
+        self._pwm.clear()
         if self.platform == "raspberry_pi" and self.gpio:
             self.gpio.cleanup()
             self.logger.log_activity("MOTOR", "GPIO cleanup complete.")
@@ -1,29 +1,83 @@
+import json
+import os
+import threading
+import time
 import openai
+from .circuit_breaker import CircuitBreaker
 from .error_handler import AIError
-from typing import List, TYPE_CHECKING
+from .logging_system import DEBUG
+from typing import Iterator, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .logging_system import LoggingSystem
 
 class OpenAIClient:
-    def __init__(self, api_key: str, base_url: str, model_name: str, logger: 'LoggingSystem'):
+    def __init__(self, api_key: str, base_url: str, model_name: str, logger: 'LoggingSystem',
+                 health_check_ttl: float = 30.0, failure_threshold: int = 3, reset_timeout: float = 15.0,
+                 max_probe_backoff: float = 120.0, model_cache_path: Optional[str] = None, model_cache_ttl: float = 86400.0):
         self.logger = logger
         if not api_key or api_key == "your-openai-api-key-here":
             self.logger.log_activity("OPENAI_CLIENT", "No API key provided. Assuming local server doesn't need one.")
-        
+
         self.logger.log_activity("OPENAI_CLIENT", f"Initializing OpenAI client with base_url: {base_url}")
         self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        self.base_url = base_url
         self.model_name = model_name
 
-    def get_available_models(self) -> List[str]:
-        """Fetches the list of available model IDs from the API."""
+        # Health state: the breaker is driven by real request outcomes, the TTL
+        # decides when a background probe should refresh an idle connection's health.
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self.health_check_ttl = health_check_ttl
+        self.max_probe_backoff = max_probe_backoff
+        self._last_health_check = time.monotonic()
+        self._probe_lock = threading.Lock()
+        self._probe_thread = None
+        self._stop_probing = threading.Event()
+
+        self.model_cache_path = model_cache_path
+        self.model_cache_ttl = model_cache_ttl
+
+    def _load_cached_models(self) -> Optional[List[str]]:
+        if not self.model_cache_path or not os.path.exists(self.model_cache_path):
+            return None
+        try:
+            with open(self.model_cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if cache.get("base_url") != self.base_url or time.time() - cache.get("fetched_at", 0) > self.model_cache_ttl:
+            return None
+        return cache.get("models")
+
+    def _save_cached_models(self, model_ids: List[str]):
+        if not self.model_cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.model_cache_path) or ".", exist_ok=True)
+            tmp_path = self.model_cache_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"base_url": self.base_url, "fetched_at": time.time(), "models": model_ids}, f)
+            os.replace(tmp_path, self.model_cache_path)
+        except OSError as e:
+            self.logger.log_activity("OPENAI_CLIENT_WARNING", f"Could not write model cache: {e}")
+
+    def get_available_models(self, use_cache: bool = True) -> List[str]:
+        """Fetches the list of available model IDs, preferring the on-disk cache."""
+        if use_cache:
+            cached = self._load_cached_models()
+            if cached is not None:
+                self.logger.log_activity("OPENAI_CLIENT", f"Using cached model list: {cached}")
+                return cached
         try:
             self.logger.log_activity("OPENAI_CLIENT", "Fetching available models...")
             models = self.client.models.list()
             model_ids = [model.id for model in models.data]
             self.logger.log_activity("OPENAI_CLIENT", f"Found models: {model_ids}")
+            self._record_outcome(None)
+            self._save_cached_models(model_ids)
             return model_ids
         except openai.APIError as e:
+            self._record_outcome(e)
             self.logger.log_activity("OPENAI_CLIENT_ERROR", f"Failed to fetch models: {e}")
             raise AIError(f"Failed to fetch models: {e}")
 
@@ -35,31 +89,103 @@ class OpenAIClient:
             context = []
 
         messages = context + [{"role": "user", "content": message}]
-        
+
         try:
             self.logger.log_activity("OPENAI_CLIENT", f"Sending message to model: {self.model_name}")
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
             )
-            self.logger.log_activity("OPENAI_CLIENT", f"Received response: {response}")
+            self._record_outcome(None)
+            self.logger.log_activity("OPENAI_CLIENT", "Received response: %r", response, level=DEBUG)
             if response.choices:
                 return response.choices[0].message.content
             else:
                 raise AIError("No response choices received from the API.")
         except openai.APIError as e:
+            self._record_outcome(e)
             self.logger.log_activity("OPENAI_CLIENT_ERROR", f"OpenAI API error: {e}")
             raise AIError(f"OpenAI API error: {e}")
 
-    def is_available(self) -> bool:
+    def stream_message(self, message: str, context: list = None) -> Iterator[str]:
         """
-        Checks if the OpenAI API is available.
+        Sends a message to the OpenAI API and yields the response text as it is generated.
         """
+        messages = (context or []) + [{"role": "user", "content": message}]
+
+        try:
+            self.logger.log_activity("OPENAI_CLIENT", f"Streaming message from model: {self.model_name}")
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                stream=True,
+            )
+            self._record_outcome(None)
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except openai.APIError as e:
+            self._record_outcome(e)
+            self.logger.log_activity("OPENAI_CLIENT_ERROR", f"OpenAI API streaming error: {e}")
+            raise AIError(f"OpenAI API error: {e}")
+
+    @staticmethod
+    def _is_outage(error: openai.APIError) -> bool:
+        """Only errors that say the server is unreachable or unhealthy count against the circuit."""
+        if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        status_code = getattr(error, "status_code", None)
+        return status_code is None or status_code >= 500
+
+    def _record_outcome(self, error: Optional[openai.APIError]):
+        self._last_health_check = time.monotonic()
+        if error is None or not self._is_outage(error):
+            if self.breaker.state != CircuitBreaker.CLOSED:
+                self.logger.log_activity("OPENAI_CLIENT", "API recovered. Circuit closed.")
+            self.breaker.record_success()
+        elif self.breaker.record_failure():
+            self.logger.log_activity("OPENAI_CLIENT_WARNING", f"API marked unavailable. Circuit opened for {self.breaker.reset_timeout}s.")
+            self._schedule_probe(initial_delay=self.breaker.reset_timeout)
+
+    def _probe(self) -> bool:
+        """One health probe. Only ever called from the background probe thread."""
         try:
             self.logger.log_activity("OPENAI_CLIENT", "Checking API availability...")
             self.client.models.list()
             self.logger.log_activity("OPENAI_CLIENT", "API is available.")
+            self._record_outcome(None)
             return True
         except openai.APIError as e:
             self.logger.log_activity("OPENAI_CLIENT_ERROR", f"API availability check failed: {e}")
+            self._record_outcome(e)
             return False
+
+    def _probe_loop(self, initial_delay: float):
+        delay = initial_delay
+        backoff = max(self.breaker.reset_timeout, 1.0)
+        while not self._stop_probing.wait(delay):
+            if self._probe() or self.breaker.state == CircuitBreaker.CLOSED:
+                return
+            delay = backoff
+            backoff = min(backoff * 2, self.max_probe_backoff)
+
+    def _schedule_probe(self, initial_delay: float = 0.0):
+        """Starts a background probe unless one is already running."""
+        with self._probe_lock:
+            if self._probe_thread and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(target=self._probe_loop, args=(initial_delay,), name="OpenAIHealthProbe", daemon=True)
+            self._probe_thread.start()
+
+    def is_available(self) -> bool:
+        """
+        Checks if the OpenAI API is available, from cached health state only.
+        Stale health state triggers a background probe; this call never touches the network.
+        """
+        if time.monotonic() - self._last_health_check > self.health_check_ttl and self.breaker.state == CircuitBreaker.CLOSED:
+            self._schedule_probe()
+        return self.breaker.allow_request()
+
+    def close(self):
+        """Stops any background health probing."""
+        self._stop_probing.set()
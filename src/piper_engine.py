@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import threading
+from typing import Optional, TYPE_CHECKING
+
+from .error_handler import TTSError
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+
+DEFAULT_SAMPLE_RATE = 22050
+
+
+def read_voice_sample_rate(model_path: str) -> int:
+    """Reads the output sample rate from the voice's `<model>.onnx.json` config."""
+    config_path = f"{model_path}.json"
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return int(json.load(f).get("audio", {}).get("sample_rate", DEFAULT_SAMPLE_RATE))
+    except (OSError, ValueError):
+        return DEFAULT_SAMPLE_RATE
+
+
+class PiperVoiceEngine:
+    """
+    A long-lived, in-process Piper synthesizer. The ONNX voice is loaded once and
+    every utterance is synthesized straight to 16-bit mono PCM in memory.
+    """
+    name = "inprocess"
+
+    def __init__(self, model_path: str):
+        try:
+            from piper.voice import PiperVoice
+        except ImportError as e:
+            raise TTSError(f"Piper Python package not available: {e}")
+        try:
+            self.voice = PiperVoice.load(model_path)
+        except Exception as e:
+            raise TTSError(f"Failed to load Piper voice '{model_path}': {e}")
+        self.sample_rate = int(getattr(self.voice.config, "sample_rate", read_voice_sample_rate(model_path)))
+        # onnxruntime sessions are not guaranteed to be re-entrant across all builds.
+        self._lock = threading.Lock()
+
+    def synthesize(self, text: str) -> bytes:
+        with self._lock:
+            if hasattr(self.voice, "synthesize_stream_raw"):
+                # piper-tts 1.2.x
+                return b"".join(self.voice.synthesize_stream_raw(text))
+            # piper-tts >= 1.3 yields AudioChunk objects
+            return b"".join(chunk.audio_int16_bytes for chunk in self.voice.synthesize(text))
+
+
+class PiperCliEngine:
+    """
+    Fallback synthesizer that runs the piper CLI once per utterance. The text is
+    passed on stdin and raw PCM is read back from stdout, so no shell and no
+    temporary files are involved, but the voice model is reloaded every time.
+    """
+    name = "cli"
+
+    def __init__(self, model_path: str, executable: str = "piper"):
+        self.model_path = model_path
+        self.executable = executable
+        self.sample_rate = read_voice_sample_rate(model_path)
+
+    def synthesize(self, text: str) -> bytes:
+        result = subprocess.run(
+            [self.executable, "--model", self.model_path, "--output_raw"],
+            input=text.encode('utf-8'), capture_output=True, check=True
+        )
+        return result.stdout
+
+
+def create_engine(model_path: str, preference: str, logger: 'LoggingSystem'):
+    """
+    Creates the synthesis engine for `preference` ("auto", "inprocess" or "cli").
+    "auto" uses the in-process engine when the piper package can load the voice and
+    falls back to the CLI otherwise.
+    """
+    engine: Optional[object] = None
+    if preference in ("auto", "inprocess"):
+        try:
+            engine = PiperVoiceEngine(model_path)
+            logger.log_activity("TTS", f"Loaded Piper voice in-process ({engine.sample_rate} Hz).")
+        except TTSError as e:
+            if preference == "inprocess":
+                raise
+            logger.log_activity("TTS_WARNING", f"{e}. Falling back to the piper CLI.")
+    if engine is None:
+        if not os.path.exists(model_path):
+            raise TTSError(f"Voice model file not found at: {model_path}")
+        engine = PiperCliEngine(model_path)
+        logger.log_activity("TTS", "Using the piper CLI for synthesis.")
+    return engine
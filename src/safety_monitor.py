@@ -0,0 +1,224 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .arbiter import Arbiter
+from .config import SafetyConfig
+from .motion_executor import MotionCommand
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+    from .motion_executor import MotionExecutor
+    from .sensor_filter import FilteredReading
+    from .sensors import SensorManager, SensorSnapshot
+
+# Command sources that are not the user: their motions and stops don't count as user activity
+INTERNAL_SOURCES = ("wander", "safety", "shutdown")
+
+# Motions that carry the robot towards whatever the front sensor sees. Spin turns
+# don't translate, so they are only checked before they start.
+GUARDED_MOTIONS = ("forward", "arc_left", "arc_right")
+
+
+@dataclass
+class SafetyStop:
+    """One halt issued by the monitor, kept for reaction-latency reporting."""
+    snapshot_time: float  # time.monotonic() when the triggering snapshot was published
+    decided_at: float     # time.monotonic() when the monitor decided to halt
+    distance: float       # Effective front distance that triggered it, in cm
+    reason: str
+    stop: MotionCommand
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from snapshot publication until the pins went LOW, once the stop has run."""
+        if self.stop.finished_at is None:
+            return None
+        return (self.decided_at - self.snapshot_time) + (self.stop.finished_at - self.stop.created_at)
+
+
+class SafetyMonitor:
+    """
+    Watches every sensor snapshot while a motion is running and reacts without
+    waiting for the motion to end. The front reading is reduced by
+    `margin_sigma` standard deviations of noise; inside `slow_distance_cm` the
+    executor's speed limit is lowered in proportion, and inside
+    `stop_distance_cm`, or when the closing speed would cover the remaining gap
+    within `time_to_collision_s`, the motion is stopped.
+
+    The check runs on the sensor sampler thread as a snapshot listener, so the
+    reaction takes one listener call plus the executor's stop latency. Both are
+    recorded per halt in `stops`.
+
+    With `wander_enabled`, a background thread also drives the robot around on its
+    own when nothing else has moved it for `wander_idle_seconds`: short forward legs,
+    turning away from the closer side when the way ahead is blocked. Wandering runs
+    at autonomous priority, so any voice, web or API command takes over. An explicit
+    stop from one of those sources pauses wandering until the next command that
+    moves the robot, so "stop" keeps it still.
+
+    Stops, speed limits and wander motions go through `arbiter` as the "safety"
+    and "wander" sources; without one, a motors-only Arbiter is made for the executor.
+    """
+    def __init__(self, sensor_manager: 'SensorManager', motion_executor: 'MotionExecutor', logger: 'LoggingSystem',
+                 config: Optional[SafetyConfig] = None, arbiter: Optional[Arbiter] = None):
+        self.sensor_manager = sensor_manager
+        self.executor = motion_executor
+        self.arbiter = arbiter or Arbiter(logger, motion_executor)
+        self.logger = logger
+        self.config = config or SafetyConfig()
+        self.stops: List[SafetyStop] = []
+        self._halted_command_id: Optional[int] = None
+        self._limited = False
+        self._last_commanded = time.monotonic()  # Last time a user command was seen running or finished
+        self.wander_paused = False
+        self._stop_event = threading.Event()
+        self._wander_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not self.config.enabled:
+            self.logger.log_activity("SAFETY_WARNING", "Safety monitor disabled; motions are only checked before they start.")
+            return
+        if not self.sensor_manager.sampling:
+            self.logger.log_activity("SAFETY_WARNING", "Sensor background sampling is off, so running motions are "
+                                                       "not checked; motions are only checked before they start.")
+        self.sensor_manager.add_listener(self._on_snapshot)
+        self.executor.add_listener(self._on_motion_done)
+        if self.config.wander_enabled and not self._wander_thread:
+            self._stop_event.clear()
+            self._wander_thread = threading.Thread(target=self._wander_loop, name="WanderThread", daemon=True)
+            self._wander_thread.start()
+        self.logger.log_activity("SAFETY", "Safety monitor started (stop at %.0f cm, slow from %.0f cm, wander %s).",
+                                 self.config.stop_distance_cm, self.config.slow_distance_cm,
+                                 "on" if self.config.wander_enabled else "off")
+
+    # --- Reactive check (sensor sampler thread) ---
+
+    def assess(self, snapshot: 'SensorSnapshot') -> Tuple[str, float, float]:
+        """
+        Returns (decision, speed limit, effective front distance) for a snapshot, where
+        decision is "halt", "slow" or "clear".
+        """
+        reading = snapshot.filtered.get("front")
+        if reading is None:
+            return "clear", 1.0, float('inf')
+        cfg = self.config
+        distance = reading.distance - cfg.margin_sigma * reading.variance ** 0.5
+        gap = distance - cfg.stop_distance_cm
+        if gap <= 0:
+            return "halt", 0.0, distance
+        if reading.closing_speed > 0 and gap / reading.closing_speed < cfg.time_to_collision_s:
+            return "halt", 0.0, distance
+        if distance < cfg.slow_distance_cm:
+            fraction = gap / (cfg.slow_distance_cm - cfg.stop_distance_cm)
+            return "slow", cfg.min_speed + (1.0 - cfg.min_speed) * fraction, distance
+        return "clear", 1.0, distance
+
+    def _on_snapshot(self, snapshot: 'SensorSnapshot'):
+        command = self.executor.current
+        if command is not None and command.source != "wander":
+            self._last_commanded = time.monotonic()
+        if command is None or command.action not in GUARDED_MOTIONS:
+            self._release_limit()
+            return
+
+        decision, limit, distance = self.assess(snapshot)
+        if decision == "halt":
+            if self._halted_command_id == command.command_id:
+                return
+            decided_at = time.monotonic()
+            stop = self.arbiter.stop("safety")
+            self._halted_command_id = command.command_id
+            reason = "inside stop distance" if distance <= self.config.stop_distance_cm else "time to collision"
+            self.stops.append(SafetyStop(snapshot.timestamp, decided_at, distance, reason, stop))
+            self.logger.log_activity("SAFETY_WARNING", "Halting #%d %s: front %.1f cm, %s.",
+                                     command.command_id, command.action, distance, reason)
+            self._release_limit()
+        elif decision == "slow":
+            if not self._limited:
+                self.logger.log_activity("SAFETY", "Slowing #%d %s: front %.1f cm.", command.command_id, command.action, distance)
+            self._limited = True
+            self.arbiter.set_speed_limit(limit, "safety")
+        else:
+            self._release_limit()
+
+    def _on_motion_done(self, command: MotionCommand):
+        """Executor listener: user commands restart the idle timer, and a user stop pauses wandering."""
+        if command.source in INTERNAL_SOURCES:
+            return
+        self._last_commanded = time.monotonic()
+        if command.action == "stop":
+            if self.config.wander_enabled and not self.wander_paused:
+                self.logger.log_activity("SAFETY", "Wandering paused by a stop from %s.", command.source or "unknown source")
+            self.wander_paused = True
+        elif command.started_at is not None and self.wander_paused:
+            self.wander_paused = False
+            self.logger.log_activity("SAFETY", "Wandering re-enabled by %s.", command.source or "unknown source")
+
+    def _release_limit(self):
+        if self._limited:
+            self._limited = False
+            self.arbiter.set_speed_limit(1.0, "safety")
+
+    # --- Wander behaviour ---
+
+    def _wander_loop(self):
+        cfg = self.config
+        while not self._stop_event.wait(cfg.wander_tick):
+            try:
+                if self.wander_paused or not self.executor.idle \
+                        or time.monotonic() - self._last_commanded < cfg.wander_idle_seconds:
+                    continue
+                self._wander_step()
+            except Exception as e:
+                self.logger.log_activity("SAFETY_ERROR", f"Wander step failed: {e}")
+
+    def wander_decision(self, readings: Dict[str, 'FilteredReading']) -> Tuple[str, float]:
+        """
+        The next wander move for a set of readings: ("forward", leg seconds) when the
+        way ahead is clear, else (turn direction, angle in degrees).
+        """
+        cfg = self.config
+        front = readings["front"]
+        if front.distance - cfg.margin_sigma * front.variance ** 0.5 > cfg.slow_distance_cm:
+            return "forward", cfg.wander_leg_seconds
+        left_blocked = self.sensor_manager.is_obstacle("left", readings["left"])
+        right_blocked = self.sensor_manager.is_obstacle("right", readings["right"])
+        if left_blocked and right_blocked:
+            return "right", 180.0
+        if left_blocked or right_blocked:
+            return ("right" if left_blocked else "left"), cfg.wander_turn_angle
+        # Turn towards the side with more room
+        return ("left" if readings["left"].distance >= readings["right"].distance else "right"), cfg.wander_turn_angle
+
+    def _wander_step(self):
+        cfg = self.config
+        action, amount = self.wander_decision(self.sensor_manager.get_all_readings())
+        if action == "forward":
+            self.arbiter.move("forward", amount, "wander", speed=cfg.wander_speed)
+        else:
+            self.arbiter.turn(action, "wander", angle=amount, speed=cfg.wander_speed)
+
+    # --- Reporting ---
+
+    @property
+    def reaction_latencies(self) -> List[float]:
+        return [stop.latency for stop in self.stops if stop.latency is not None]
+
+    def stats_summary(self) -> str:
+        latencies = sorted(self.reaction_latencies)
+        if not latencies:
+            return "no safety stops"
+        return (f"{len(latencies)} safety stops, reaction median {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+                f"max {latencies[-1] * 1000:.1f} ms")
+
+    def cleanup(self):
+        self.sensor_manager.remove_listener(self._on_snapshot)
+        self.executor.remove_listener(self._on_motion_done)
+        if self._wander_thread:
+            self._stop_event.set()
+            self._wander_thread.join(timeout=1)
+            self._wander_thread = None
+        self._release_limit()
+        self.logger.log_activity("SAFETY", f"Safety monitor stopped: {self.stats_summary()}.")
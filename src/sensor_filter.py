@@ -0,0 +1,145 @@
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FILTER_STAGES = ("outlier", "median", "ema")
+
+
+@dataclass(frozen=True)
+class FilteredReading:
+    """One sensor's state after a filter update."""
+    distance: float       # Output of the filter chain, in cm
+    variance: float       # Robust variance of accepted samples around their linear trend, in cm^2
+    closing_speed: float  # cm/s; positive when the obstacle is getting closer
+    raw: float            # The sample that produced this reading
+    samples: int          # Samples currently in the window
+    rejected: bool        # Whether `raw` was rejected as an outlier
+
+
+class SampleRing:
+    """A fixed-size ring buffer of (timestamp, value) samples backed by NumPy arrays."""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._next = 0
+        self.count = 0
+
+    def append(self, value: float, timestamp: float):
+        self._values[self._next] = value
+        self._times[self._next] = timestamp
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def window(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (times, values) in chronological order."""
+        if self.count < self.capacity:
+            return self._times[:self.count].copy(), self._values[:self.count].copy()
+        order = np.roll(np.arange(self.capacity), -self._next)
+        return self._times[order], self._values[order]
+
+
+class SensorFilter:
+    """
+    Filters one range sensor over a rolling window. Every update re-runs the
+    configured chain over the whole window with NumPy, which for a window of a few
+    dozen samples is cheaper and simpler than keeping per-stage incremental state:
+
+    - "outlier": drops samples that differ from the median of their neighbours by
+      more than a surface moving at `max_rate` could have moved (spikes and
+      missing echoes up to two samples long). A genuine jump is accepted once a
+      majority of the recent samples confirm it.
+    - "median": sliding median of `median_size` samples.
+    - "ema": exponentially weighted moving average with smoothing factor `ema_alpha`.
+
+    Closing speed and noise variance come from a robust (Theil-Sen) line through
+    the last `velocity_window` samples that survived outlier rejection.
+    """
+    def __init__(self, capacity: int = 16, chain: Sequence[str] = FILTER_STAGES, median_size: int = 5,
+                 ema_alpha: float = 0.4, max_rate: float = 150.0, velocity_window: int = 8,
+                 max_range: float = 400.0):
+        unknown = [stage for stage in chain if stage not in FILTER_STAGES]
+        if unknown:
+            raise ValueError(f"Unknown filter stages: {unknown}")
+        self.ring = SampleRing(capacity)
+        self.chain: List[str] = list(chain)
+        self.median_size = median_size
+        self.ema_alpha = ema_alpha
+        self.max_rate = max_rate
+        self.velocity_window = velocity_window
+        self.max_range = max_range
+        self._lock = threading.Lock()
+        self.latest: Optional[FilteredReading] = None
+
+    def update(self, value: float, timestamp: float) -> FilteredReading:
+        # No echo (inf) means nothing within range.
+        clipped = self.max_range if np.isnan(value) else min(value, self.max_range)
+        with self._lock:
+            self.ring.append(clipped, timestamp)
+            times, values = self.ring.window()
+            accepted = self._reject_outliers(times, values) if "outlier" in self.chain else np.ones(len(values), bool)
+            v = values[accepted]
+            delay = 0.0  # Group delay of the chain, in samples
+            for stage in self.chain:
+                if stage == "median":
+                    v = self._median(v)
+                    delay += (min(self.median_size, len(values)) - 1) / 2
+                elif stage == "ema":
+                    v = self._ema(v)
+                    delay += (1.0 - self.ema_alpha) / self.ema_alpha
+            closing_speed, variance = self._trend(times[accepted], values[accepted])
+            # Smoothing lags a moving target; project the output forward by the chain's delay.
+            period = float(np.median(np.diff(times))) if len(times) > 1 else 0.0
+            distance = min(max(float(v[-1]) - closing_speed * delay * period, 0.0), self.max_range)
+            self.latest = FilteredReading(
+                distance=distance, variance=variance, closing_speed=closing_speed,
+                raw=value, samples=len(values), rejected=not bool(accepted[-1])
+            )
+            return self.latest
+
+    def _reject_outliers(self, times: np.ndarray, values: np.ndarray) -> np.ndarray:
+        accepted = np.ones(len(values), dtype=bool)
+        if len(values) < 3:
+            return accepted
+        # Reference for each sample: the median of the 5 samples around it (the last
+        # 5 for the newest ones), so spikes up to 2 samples long cannot drag it along.
+        size = min(5, len(values))
+        medians = np.median(np.lib.stride_tricks.sliding_window_view(values, size), axis=1)
+        centres = np.clip(np.arange(len(values)) - size // 2, 0, len(medians) - 1)
+        # The most a real surface can move between a sample and its reference
+        period = float(np.median(np.diff(times)))
+        limit = self.max_rate * period * (size // 2)
+        accepted = np.abs(values - medians[centres]) <= limit
+        if not accepted.any():
+            accepted[-1] = True
+        return accepted
+
+    def _median(self, values: np.ndarray) -> np.ndarray:
+        if len(values) < self.median_size:
+            return np.array([np.median(values)])
+        windows = np.lib.stride_tricks.sliding_window_view(values, self.median_size)
+        return np.median(windows, axis=1)
+
+    def _ema(self, values: np.ndarray) -> np.ndarray:
+        # y[i] = sum_j a(1-a)^(i-j) x[j], normalised so the first output equals x[0]
+        n = len(values)
+        lags = np.subtract.outer(np.arange(n), np.arange(n))
+        weights = np.where(lags >= 0, (1.0 - self.ema_alpha) ** np.maximum(lags, 0), 0.0)
+        return weights @ values / weights.sum(axis=1)
+
+    def _trend(self, times: np.ndarray, values: np.ndarray) -> Tuple[float, float]:
+        times, values = times[-self.velocity_window:], values[-self.velocity_window:]
+        if len(values) < 3 or np.ptp(times) <= 0:
+            return 0.0, 0.0
+        # Theil-Sen: the median of all pairwise slopes, robust to the odd bad sample
+        i, j = np.triu_indices(len(values), k=1)
+        dt = times[j] - times[i]
+        valid = dt > 0
+        slope = float(np.median((values[j] - values[i])[valid] / dt[valid]))
+        residuals = values - slope * times
+        residuals -= np.median(residuals)
+        # Robust variance from the median absolute deviation
+        sigma = 1.4826 * float(np.median(np.abs(residuals)))
+        return -slope, sigma ** 2
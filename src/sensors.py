@@ -1,106 +1,432 @@
+import threading
 import time
 import random
+from dataclasses import dataclass
+from .config import SensorConfig
 from .error_handler import SensorError
-from typing import TYPE_CHECKING
+from .logging_system import DEBUG
+from .sensor_filter import FilteredReading, SensorFilter
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .logging_system import LoggingSystem
+    from .simulator import Simulator
+
+# Sensor name -> (trigger pin key, echo pin key) in HardwareConfig.sensor_pins
+SENSORS = {
+    "front": ("front_trigger", "front_echo"),
+    "left": ("left_trigger", "left_echo"),
+    "right": ("right_trigger", "right_echo"),
+}
+
+# Movement direction -> the sensor that guards it
+DIRECTION_SENSORS = {"forward": "front", "left": "left", "right": "right"}
+
+SPEED_OF_SOUND_CM_S = 34300
+
+
+class EchoTimer:
+    """
+    Times the echo pulse of one ultrasonic sensor from GPIO edge callbacks instead of
+    polling the pin. Both edges are timestamped with time.perf_counter_ns() as they
+    arrive; the waiting thread just blocks on an Event.
+    """
+    def __init__(self, gpio, echo_pin: int):
+        self.gpio = gpio
+        self.echo_pin = echo_pin
+        self._rise_ns: Optional[int] = None
+        self._fall_ns: Optional[int] = None
+        self._armed = False
+        self._done = threading.Event()
+        gpio.add_event_detect(echo_pin, gpio.BOTH, callback=self._on_edge)
+
+    def _on_edge(self, channel: int):
+        now = time.perf_counter_ns()
+        if not self._armed:
+            return
+        if self._rise_ns is None:
+            self._rise_ns = now
+        else:
+            self._fall_ns = now
+            self._armed = False
+            self._done.set()
+
+    def arm(self):
+        """Prepares for the next pulse. Call right before firing the trigger."""
+        self._rise_ns = None
+        self._fall_ns = None
+        self._done.clear()
+        self._armed = True
+
+    def wait(self, timeout: float) -> Optional[int]:
+        """Returns the echo pulse width in ns, or None if it did not complete within `timeout`."""
+        completed = self._done.wait(timeout)
+        self._armed = False
+        if not completed or self._rise_ns is None or self._fall_ns is None:
+            return None
+        return self._fall_ns - self._rise_ns
+
+    def close(self):
+        try:
+            self.gpio.remove_event_detect(self.echo_pin)
+        except RuntimeError:
+            pass
+
+
+class SimulatedRangeSensor:
+    """
+    Produces a realistic HC-SR04-like trace for simulation mode: the true distance
+    drifts smoothly (a random walk in velocity, bounced between `min_cm` and
+    `max_cm`), and each reading adds distance-dependent Gaussian noise, occasional
+    multipath spikes and occasional missing echoes (inf). The current true distance
+    is kept in `true_distance` so filters can be scored offline.
+    """
+    def __init__(self, seed: Optional[int] = None, min_cm: float = 10.0, max_cm: float = 300.0,
+                 noise_cm: float = 0.5, noise_fraction: float = 0.01, spike_probability: float = 0.03,
+                 dropout_probability: float = 0.02, max_speed: float = 60.0, acceleration: float = 40.0):
+        self.rng = random.Random(seed)
+        self.min_cm = min_cm
+        self.max_cm = max_cm
+        self.noise_cm = noise_cm
+        self.noise_fraction = noise_fraction
+        self.spike_probability = spike_probability
+        self.dropout_probability = dropout_probability
+        self.max_speed = max_speed
+        self.acceleration = acceleration
+        self.true_distance = self.rng.uniform(min_cm, max_cm)
+        self.velocity = 0.0
+        self._last_time: Optional[float] = None
+
+    def read(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        dt = 0.0 if self._last_time is None else min(now - self._last_time, 1.0)
+        self._last_time = now
+
+        self.velocity += self.rng.gauss(0.0, self.acceleration * dt ** 0.5)
+        self.velocity = max(-self.max_speed, min(self.max_speed, self.velocity))
+        self.true_distance += self.velocity * dt
+        if not self.min_cm <= self.true_distance <= self.max_cm:
+            self.true_distance = max(self.min_cm, min(self.max_cm, self.true_distance))
+            self.velocity = -self.velocity
+
+        roll = self.rng.random()
+        if roll < self.dropout_probability:
+            return float('inf')
+        if roll < self.dropout_probability + self.spike_probability:
+            # Multipath: the echo took a longer path, or crosstalk arrived early
+            return self.rng.choice([self.rng.uniform(2.0, self.true_distance), self.true_distance * 2])
+        return max(2.0, self.rng.gauss(self.true_distance, self.noise_cm + self.noise_fraction * self.true_distance))
+
+
+@dataclass(frozen=True)
+class SensorSnapshot:
+    """An immutable set of readings taken in one sampling pass."""
+    distances: Dict[str, float]  # Raw readings
+    filtered: Dict[str, FilteredReading]
+    timestamp: float  # time.monotonic() when the pass completed
+    sequence: int
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sequence": self.sequence,
+            "distances": {name: round(reading.distance, 1) for name, reading in self.filtered.items()},
+            "closing_speeds": {name: round(reading.closing_speed, 1) for name, reading in self.filtered.items()},
+        }
+
 
 class SensorManager:
-    def __init__(self, platform: str, sensor_pins: dict, logger: 'LoggingSystem'):
+    def __init__(self, platform: str, sensor_pins: dict, logger: 'LoggingSystem', config: Optional[SensorConfig] = None,
+                 gpio=None, simulator: Optional['Simulator'] = None):
         self.platform = platform
+        self.simulator = simulator
         self.sensor_pins = sensor_pins
         self.logger = logger
+        self.config = config or SensorConfig()
         self.gpio = None
 
-        if self.platform == "raspberry_pi":
+        # The sampler publishes a new snapshot by rebinding this attribute, which is
+        # atomic, so readers never need a lock.
+        self.snapshot: Optional[SensorSnapshot] = None
+        self._sequence = 0
+        self._read_lock = threading.Lock()  # Serializes trigger/echo cycles on the GPIO pins
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.stale_reads = 0
+        self.echo_timeouts = 0
+        self._echo_timers: Dict[str, EchoTimer] = {}
+        self._last_ping_end = 0.0  # perf_counter() when the previous echo finished or timed out
+        self.filters = {
+            name: SensorFilter(
+                capacity=self.config.filter_window, chain=self.config.filter_chain,
+                median_size=self.config.median_size, ema_alpha=self.config.ema_alpha,
+                max_rate=self.config.max_rate_cm_s, velocity_window=self.config.velocity_window,
+                max_range=self.config.max_range_cm
+            ) for name in SENSORS
+        }
+        self._simulated: Dict[str, SimulatedRangeSensor] = {}
+        self._listeners: List[Callable[['SensorSnapshot'], None]] = []
+        self._firing_order = self._validate_firing_order(self.config.firing_order)
+
+        # A GPIO module (e.g. FakeGPIO) can be injected to drive the hardware path without a Pi.
+        if gpio is not None or self.platform == "raspberry_pi":
             try:
-                import RPi.GPIO as GPIO
-                self.gpio = GPIO
+                if gpio is None:
+                    import RPi.GPIO as gpio
+                self.gpio = gpio
                 self.gpio.setmode(self.gpio.BCM)
                 # Setup sensor pins
-                for trigger_pin_key, echo_pin_key in [("front_trigger", "front_echo"), ("left_trigger", "left_echo"), ("right_trigger", "right_echo")]:
+                for trigger_pin_key, echo_pin_key in SENSORS.values():
                     if trigger_pin_key in self.sensor_pins and echo_pin_key in self.sensor_pins:
                         self.gpio.setup(self.sensor_pins[trigger_pin_key], self.gpio.OUT)
                         self.gpio.setup(self.sensor_pins[echo_pin_key], self.gpio.IN)
+                self.platform = "raspberry_pi"
                 self.logger.log_activity("SENSOR", "GPIO pins initialized for sensors.")
             except (ImportError, RuntimeError) as e:
+                self.gpio = None
                 self.logger.log_activity("SENSOR_ERROR", f"Failed to initialize GPIO for sensors: {e}. Running in simulation mode.")
                 self.platform = "windows" # Fallback to simulation
-        
+
+        if self.gpio is not None and self.config.echo_timing == "edge":
+            self._setup_echo_timers()
+        if self.platform == "simulator" and self.simulator is None:
+            self.logger.log_activity("SENSOR_ERROR", "No simulator given for the simulator platform. Using random traces.")
+            self.platform = "windows"
+        if self.gpio is None and self.simulator is None:
+            self._simulated = {name: SimulatedRangeSensor() for name in SENSORS}
+
         self.logger.log_activity("SENSOR", f"Sensor manager initialized in {self.platform} mode.")
 
+    def _validate_firing_order(self, order: List[str]) -> List[str]:
+        """
+        The configured order as a permutation of SENSORS: unknown and repeated names
+        are dropped and missing sensors are appended, so every snapshot has all keys.
+        """
+        valid = []
+        for name in order:
+            if name in SENSORS and name not in valid:
+                valid.append(name)
+            else:
+                self.logger.log_activity("SENSOR_WARNING", f"Ignoring '{name}' in firing_order: unknown or repeated sensor.")
+        missing = [name for name in SENSORS if name not in valid]
+        if missing:
+            self.logger.log_activity("SENSOR_WARNING", f"firing_order leaves out {missing}; they fire last.")
+        return valid + missing
+
+    def _setup_echo_timers(self):
+        for name, (trigger_pin_key, echo_pin_key) in SENSORS.items():
+            if echo_pin_key not in self.sensor_pins:
+                continue
+            try:
+                self._echo_timers[name] = EchoTimer(self.gpio, self.sensor_pins[echo_pin_key])
+            except (RuntimeError, AttributeError) as e:
+                self.logger.log_activity("SENSOR_WARNING", f"Edge detection unavailable for the {name} sensor ({e}). "
+                                                           f"Falling back to polling.")
+        if self._echo_timers:
+            self.logger.log_activity("SENSOR", f"Edge-triggered echo timing enabled for {sorted(self._echo_timers)}.")
+
+    def _echo_timeout(self, name: str) -> float:
+        return self.config.sensor_timeouts_ms.get(name, self.config.echo_timeout_ms) / 1000.0
+
+    def start(self):
+        """Starts the background sampler if `background_sampling` is enabled."""
+        if not self.config.background_sampling or self._sampler:
+            return
+        self._stop_event.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="SensorSamplerThread", daemon=True)
+        self._sampler.start()
+        self.logger.log_activity("SENSOR", f"Background sampling started at {self.config.sample_rate_hz} Hz.")
+
+    def _sample_loop(self):
+        period = 1.0 / self.config.sample_rate_hz
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self._publish({name: self._read(name) for name in self.firing_order})
+            except Exception as e:
+                self.logger.log_activity("SENSOR_ERROR", f"Background sampling failed: {e}")
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay < 0:
+                # Sampling took longer than the period; don't try to catch up.
+                next_time = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def _publish(self, distances: Dict[str, float]) -> SensorSnapshot:
+        self._sequence += 1
+        filtered = {name: self.filters[name].latest for name in distances}
+        snapshot = SensorSnapshot(distances, filtered, time.monotonic(), self._sequence)
+        self.snapshot = snapshot
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                self.logger.log_activity("SENSOR_ERROR", f"Snapshot listener failed: {e}")
+        return snapshot
+
+    def add_listener(self, listener: Callable[['SensorSnapshot'], None]):
+        """
+        Calls `listener(snapshot)` on the publishing thread every time a snapshot is
+        published. Listeners must return quickly: the next sampling pass waits for them.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[['SensorSnapshot'], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def fresh_snapshot(self) -> Optional[SensorSnapshot]:
+        """The latest snapshot if it is no older than `max_snapshot_age`, else None."""
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.age <= self.config.max_snapshot_age:
+            return snapshot
+        if self._sampler:
+            self.stale_reads += 1
+        return None
+
+    @property
+    def sampling(self) -> bool:
+        """Whether the background sampler is publishing snapshots."""
+        return self._sampler is not None
+
+    @property
+    def firing_order(self) -> List[str]:
+        return self._firing_order
+
     def _get_distance(self, trigger_pin_key: str, echo_pin_key: str) -> float:
-        if self.platform == "raspberry_pi":
+        name = trigger_pin_key.rsplit("_", 1)[0]
+        if self.gpio is not None:
             if trigger_pin_key not in self.sensor_pins or echo_pin_key not in self.sensor_pins:
                 self.logger.log_activity("SENSOR_ERROR", f"Sensor pins {trigger_pin_key} or {echo_pin_key} not configured.")
                 return float('inf')
 
             trigger_pin = self.sensor_pins[trigger_pin_key]
             echo_pin = self.sensor_pins[echo_pin_key]
-            
+            timeout = self._echo_timeout(name)
+
+            # Let the previous ping's reflections die out before firing, so one sensor
+            # never hears another's echo.
+            gap = self._last_ping_end + self.config.ping_gap_ms / 1000.0 - time.perf_counter()
+            if gap > 0:
+                time.sleep(gap)
+
+            timer = self._echo_timers.get(name)
+            if timer:
+                timer.arm()
             self.gpio.output(trigger_pin, True)
             time.sleep(0.00001)
             self.gpio.output(trigger_pin, False)
 
-            start_time = time.time()
-            stop_time = time.time()
+            if timer:
+                width_ns = timer.wait(timeout)
+            else:
+                width_ns = self._poll_echo(echo_pin, timeout)
+            self._last_ping_end = time.perf_counter()
 
-            # Wait for the echo pin to go high
-            timeout = time.time() + 0.1 # 100ms timeout
-            while self.gpio.input(echo_pin) == 0 and time.time() < timeout:
-                start_time = time.time()
+            if width_ns is None:
+                self.echo_timeouts += 1
+                self.logger.log_activity("SENSOR_DEBUG", "No echo from the %s sensor within %.0f ms.", name, timeout * 1000)
+                return float('inf')
+            # The pulse covers the round trip, so halve it
+            return width_ns * SPEED_OF_SOUND_CM_S / 2e9
+        elif self.simulator is not None:
+            # Ray-cast in the simulated world
+            return self.simulator.read_range(name)
+        else:
+            # Simulate a noisy sensor reading
+            return self._simulated[name].read()
 
-            # Wait for the echo pin to go low
-            timeout = time.time() + 0.1 # 100ms timeout
-            while self.gpio.input(echo_pin) == 1 and time.time() < timeout:
-                stop_time = time.time()
+    def _poll_echo(self, echo_pin: int, timeout: float) -> Optional[int]:
+        """Busy-waits for the echo pulse. Used only where edge detection is unavailable."""
+        deadline = time.perf_counter_ns() + int(timeout * 1e9)
+        while self.gpio.input(echo_pin) == 0:
+            if time.perf_counter_ns() >= deadline:
+                return None
+        start_ns = time.perf_counter_ns()
+        while self.gpio.input(echo_pin) == 1:
+            if time.perf_counter_ns() >= deadline:
+                return None
+        return time.perf_counter_ns() - start_ns
 
-            time_elapsed = stop_time - start_time
-            # sonic speed = 34300 cm/s
-            distance = (time_elapsed * 34300) / 2
-            return distance
-        else:
-            # Simulate sensor reading
-            return random.uniform(10, 300)
+    def _read(self, name: str) -> float:
+        """Blocking read of one sensor by name ("front", "left" or "right"). Feeds its filter."""
+        with self._read_lock:
+            distance = self._get_distance(*SENSORS[name])
+            # Under the lock, so a fallback read racing the sampler cannot feed samples out of time order
+            self.filters[name].update(distance, time.monotonic())
+        return distance
 
     def read_front_sensor(self) -> float:
-        return self._get_distance("front_trigger", "front_echo")
+        return self._read("front")
 
     def read_left_sensor(self) -> float:
-        return self._get_distance("left_trigger", "left_echo")
+        return self._read("left")
 
     def read_right_sensor(self) -> float:
-        return self._get_distance("right_trigger", "right_echo")
+        return self._read("right")
+
+    def get_reading(self, name: str) -> FilteredReading:
+        """One sensor's filtered state from a fresh snapshot, or after a blocking read of just that sensor."""
+        snapshot = self.fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.filtered[name]
+        self._read(name)
+        return self.filters[name].latest
+
+    def get_all_readings(self) -> Dict[str, FilteredReading]:
+        snapshot = self.fresh_snapshot()
+        if snapshot is None:
+            snapshot = self._publish({name: self._read(name) for name in self.firing_order})
+        return dict(snapshot.filtered)
+
+    def get_distance(self, name: str) -> float:
+        """One sensor's filtered distance."""
+        return self.get_reading(name).distance
 
     def get_all_distances(self) -> dict:
-        distances = {
-            "front": self.read_front_sensor(),
-            "left": self.read_left_sensor(),
-            "right": self.read_right_sensor(),
-        }
-        self.logger.log_activity("SENSOR_READING", f"{distances}")
+        distances = {name: reading.distance for name, reading in self.get_all_readings().items()}
+        self.logger.log_activity("SENSOR_READING", "%s", distances, level=DEBUG)
         return distances
 
+    def _threshold(self, name: str) -> float:
+        return self.config.front_obstacle_cm if name == "front" else self.config.side_obstacle_cm
+
+    def is_obstacle(self, name: str, reading: FilteredReading) -> bool:
+        """
+        An obstacle is reported if the filtered distance, pulled in by how far the
+        obstacle closes within `obstacle_lookahead_s` and by `obstacle_margin_sigma`
+        standard deviations of measurement noise, is inside the threshold.
+        """
+        effective = (reading.distance
+                     - max(reading.closing_speed, 0.0) * self.config.obstacle_lookahead_s
+                     - self.config.obstacle_margin_sigma * reading.variance ** 0.5)
+        return effective < self._threshold(name)
+
     def check_obstacles(self) -> dict:
-        distances = self.get_all_distances()
-        obstacles = {
-            "front": distances["front"] < 20,
-            "left": distances["left"] < 15,
-            "right": distances["right"] < 15,
-        }
+        readings = self.get_all_readings()
+        obstacles = {name: self.is_obstacle(name, reading) for name, reading in readings.items()}
         return obstacles
 
     def is_path_clear(self, direction: str) -> bool:
-        obstacles = self.check_obstacles()
-        if direction == "forward":
-            return not obstacles["front"]
-        elif direction == "left":
-            return not obstacles["left"]
-        elif direction == "right":
-            return not obstacles["right"]
-        return True
-        
+        name = DIRECTION_SENSORS.get(direction)
+        if name is None:
+            return True
+        # Only the sensor guarding this direction is read.
+        return not self.is_obstacle(name, self.get_reading(name))
+
     def cleanup(self):
         # GPIO cleanup is handled globally in main.py to avoid conflicts
-        pass
+        if self._sampler:
+            self._stop_event.set()
+            self._sampler.join(timeout=1)
+            self._sampler = None
+            self.logger.log_activity("SENSOR", f"Background sampling stopped ({self.stale_reads} stale snapshot fallbacks).")
+        for timer in self._echo_timers.values():
+            timer.close()
+        self._echo_timers.clear()
+        if self.echo_timeouts:
+            self.logger.log_activity("SENSOR", f"{self.echo_timeouts} echo timeouts during this session.")
@@ -0,0 +1,389 @@
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from .config import MotionConfig, SafetyConfig, SensorConfig, SimulatorConfig
+from .error_handler import RobotError
+from .motion_executor import MotionExecutor, trapezoid_duty
+from .motor_controller import MotorController
+from .safety_monitor import GUARDED_MOTIONS, SafetyMonitor
+from .sensors import SensorManager, SensorSnapshot
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+
+
+class SimulatorError(RobotError):
+    """Raised for invalid simulated worlds."""
+    pass
+
+
+def box_segments(x: float, y: float, width: float, height: float) -> List[Tuple[float, float, float, float]]:
+    """The four wall segments of an axis-aligned box with its lower-left corner at (x, y)."""
+    x2, y2 = x + width, y + height
+    return [(x, y, x2, y), (x2, y, x2, y2), (x2, y2, x, y2), (x, y2, x, y)]
+
+
+class World:
+    """
+    A 2D map of obstacles as line segments, in cm. All geometry queries are
+    vectorised over every segment (and every ray) at once with NumPy.
+
+    World files are JSON: {"width": 300, "height": 300, "boxes": [[x, y, w, h], ...],
+    "segments": [[x1, y1, x2, y2], ...]}. With width and height, the room's walls
+    are added automatically.
+    """
+    def __init__(self, segments: Iterable[Sequence[float]], width: Optional[float] = None, height: Optional[float] = None):
+        self.segments = np.asarray(list(segments), dtype=np.float64).reshape(-1, 4)
+        if len(self.segments) == 0:
+            raise SimulatorError("A world needs at least one segment.")
+        self.width = width
+        self.height = height
+        self._starts = self.segments[:, :2]
+        self._vectors = self.segments[:, 2:] - self._starts
+        self._lengths_sq = np.maximum(np.einsum("ij,ij->i", self._vectors, self._vectors), 1e-12)
+
+    @classmethod
+    def room(cls, width: float = 300.0, height: float = 300.0, boxes: Iterable[Sequence[float]] = ()) -> 'World':
+        segments = box_segments(0.0, 0.0, width, height)
+        for box in boxes:
+            segments += box_segments(*box)
+        return cls(segments, width, height)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'World':
+        width, height = data.get("width"), data.get("height")
+        segments = [tuple(segment) for segment in data.get("segments", [])]
+        if width is not None and height is not None:
+            segments += box_segments(0.0, 0.0, width, height)
+        for box in data.get("boxes", []):
+            segments += box_segments(*box)
+        return cls(segments, width, height)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'World':
+        try:
+            with open(path, 'r') as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            raise SimulatorError(f"Could not load world file {path}: {e}")
+
+    @classmethod
+    def random(cls, seed: int, width: float = 300.0, height: float = 300.0, boxes: int = 6,
+               keep_clear: Tuple[float, float, float] = (150.0, 150.0, 40.0)) -> 'World':
+        """A room with `boxes` random boxes, none within keep_clear=(x, y, radius)."""
+        rng = np.random.default_rng(seed)
+        cx, cy, radius = keep_clear
+        placed = []
+        while len(placed) < boxes:
+            w, h = rng.uniform(15.0, 50.0, size=2)
+            x, y = rng.uniform(0.0, width - w), rng.uniform(0.0, height - h)
+            # Distance from the keep-clear centre to the nearest point of the box
+            dx = max(x - cx, 0.0, cx - (x + w))
+            dy = max(y - cy, 0.0, cy - (y + h))
+            if math.hypot(dx, dy) > radius:
+                placed.append((x, y, w, h))
+        return cls.room(width, height, placed)
+
+    def cast(self, origins: np.ndarray, angles: np.ndarray, max_range: float) -> np.ndarray:
+        """
+        Distance along each ray (origin (R, 2), angle (R,) in radians) to the nearest
+        segment, or inf if nothing is hit within `max_range`.
+        """
+        directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)[:, None, :]  # (R, 1, 2)
+        offsets = self._starts[None, :, :] - origins[:, None, :]  # (R, N, 2)
+        seg = self._vectors[None, :, :]  # (1, N, 2)
+        denom = directions[..., 0] * seg[..., 1] - directions[..., 1] * seg[..., 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (offsets[..., 0] * seg[..., 1] - offsets[..., 1] * seg[..., 0]) / denom
+            u = (offsets[..., 0] * directions[..., 1] - offsets[..., 1] * directions[..., 0]) / denom
+        hit = (np.abs(denom) > 1e-12) & (t >= 0.0) & (u >= 0.0) & (u <= 1.0)
+        distances = np.where(hit, t, np.inf).min(axis=1)
+        distances[distances > max_range] = np.inf
+        return distances
+
+    def clearance(self, x: float, y: float) -> float:
+        """Distance from the point (x, y) to the nearest segment."""
+        offsets = np.array([x, y]) - self._starts
+        along = np.clip(np.einsum("ij,ij->i", offsets, self._vectors) / self._lengths_sq, 0.0, 1.0)
+        nearest = offsets - along[:, None] * self._vectors
+        return float(np.sqrt(np.einsum("ij,ij->i", nearest, nearest).min()))
+
+
+class Simulator:
+    """
+    A deterministic differential-drive robot in a World, standing in for the motors
+    and ultrasonic sensors when `hardware.platform` is "simulator".
+
+    The MotorController reports each motion's per-wheel drive pattern and PWM duty
+    cycle; the left and right wheel speeds follow from those, and the pose is
+    integrated exactly along the resulting arc (a kinematic model: no inertia or
+    wheel slip). A move that would bring the robot's disc into contact with a
+    segment is refused and counted as a collision. Each ultrasonic sensor is a
+    cone of `beam_rays` rays across `beam_width_deg`, cast against every segment in
+    one NumPy call, with Gaussian noise, multipath spikes and missing echoes drawn
+    from a seeded generator.
+
+    `step` advances simulated time directly, so scenarios run as fast as the CPU
+    allows; `start` runs it against the wall clock (scaled by `time_scale`) for
+    the live robot.
+    """
+    def __init__(self, config: Optional[SimulatorConfig] = None, world: Optional[World] = None,
+                 logger: Optional['LoggingSystem'] = None):
+        self.config = config or SimulatorConfig()
+        self.world = world or World.room()
+        self.logger = logger
+        self.rng = np.random.default_rng(self.config.seed)
+        x, y, heading = self.config.start_pose
+        self.x, self.y, self.heading = float(x), float(y), math.radians(heading)
+        self.time = 0.0
+        self.left_drive = 0.0   # Mean drive of the left wheels, -1..1
+        self.right_drive = 0.0
+        self.duty = 0.0
+        self.collisions = 0
+        self.in_contact = False
+        self.odometer = 0.0
+        self.clearance = self.world.clearance(self.x, self.y) - self.config.robot_radius_cm
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # Every sensor's rays as (name, angle offset from the heading), flattened
+        half = math.radians(self.config.beam_width_deg) / 2
+        spread = np.linspace(-half, half, self.config.beam_rays) if self.config.beam_rays > 1 else np.zeros(1)
+        self.sensor_names = list(self.config.sensor_angles)
+        mounts = np.array([math.radians(self.config.sensor_angles[name]) for name in self.sensor_names])
+        self._mounts = mounts
+        self._ray_offsets = (mounts[:, None] + spread[None, :]).ravel()
+        self._ray_sensor = np.repeat(np.arange(len(self.sensor_names)), len(spread))
+
+    @classmethod
+    def from_config(cls, config: SimulatorConfig, logger: Optional['LoggingSystem'] = None) -> 'Simulator':
+        if config.world_file:
+            world = World.from_file(config.world_file)
+        else:
+            world = World.room(boxes=[(40.0, 40.0, 40.0, 30.0), (220.0, 60.0, 30.0, 50.0), (200.0, 220.0, 50.0, 40.0)])
+        return cls(config, world, logger)
+
+    @property
+    def pose(self) -> Tuple[float, float, float]:
+        """(x cm, y cm, heading in degrees)."""
+        return self.x, self.y, math.degrees(self.heading)
+
+    # --- Motor side ---
+
+    def set_motion(self, pattern: Dict[str, object]):
+        """Takes a MotorController motion pattern (wheel -> 1, -1, 0 or "brake")."""
+        def side(suffix):
+            drives = [drive if isinstance(drive, (int, float)) else 0 for wheel, drive in pattern.items() if wheel.endswith(suffix)]
+            return sum(drives) / len(drives) if drives else 0.0
+        with self._lock:
+            self.left_drive, self.right_drive = side("_left"), side("_right")
+
+    def set_duty(self, duty: float):
+        with self._lock:
+            self.duty = duty
+
+    def step(self, dt: float):
+        """Advances the simulation by `dt` seconds."""
+        with self._lock:
+            self._step(dt)
+
+    def _step(self, dt: float):
+        cfg = self.config
+        v_left = self.left_drive * self.duty * cfg.wheel_speed_cm_s
+        v_right = self.right_drive * self.duty * cfg.wheel_speed_cm_s
+        v = (v_left + v_right) / 2
+        omega = (v_right - v_left) / cfg.track_width_cm
+        self.time += dt
+        if v == 0.0 and omega == 0.0:
+            return
+
+        heading = self.heading + omega * dt
+        if abs(omega) < 1e-9:
+            x = self.x + v * dt * math.cos(self.heading)
+            y = self.y + v * dt * math.sin(self.heading)
+        else:
+            # Exact integration along the arc
+            radius = v / omega
+            x = self.x + radius * (math.sin(heading) - math.sin(self.heading))
+            y = self.y - radius * (math.cos(heading) - math.cos(self.heading))
+        self.heading = (heading + math.pi) % (2 * math.pi) - math.pi
+
+        if v == 0.0:
+            return  # Turning in place never changes the clearance
+        clearance = self.world.clearance(x, y) - cfg.robot_radius_cm
+        if clearance <= 0.0:
+            if not self.in_contact:
+                self.collisions += 1
+                self.in_contact = True
+                if self.logger:
+                    self.logger.log_activity("SIMULATOR_WARNING", "Collision at (%.1f, %.1f) after %.1f s.", self.x, self.y, self.time)
+            return
+        self.in_contact = False
+        self.odometer += math.hypot(x - self.x, y - self.y)
+        self.x, self.y, self.clearance = x, y, clearance
+
+    # --- Sensor side ---
+
+    def true_ranges(self) -> Dict[str, float]:
+        """Noise-free distance seen by every sensor: the nearest hit within its beam."""
+        with self._lock:
+            return self._true_ranges()
+
+    def _true_ranges(self) -> Dict[str, float]:
+        cfg = self.config
+        mount_angles = self.heading + self._mounts
+        # Sensors sit on the robot's rim, facing outwards
+        origins = np.stack([self.x + cfg.robot_radius_cm * np.cos(mount_angles),
+                            self.y + cfg.robot_radius_cm * np.sin(mount_angles)], axis=1)
+        distances = self.world.cast(origins[self._ray_sensor], self.heading + self._ray_offsets, cfg.max_range_cm)
+        nearest = np.full(len(self.sensor_names), np.inf)
+        np.minimum.at(nearest, self._ray_sensor, distances)
+        return dict(zip(self.sensor_names, nearest.tolist()))
+
+    def read_all(self) -> Dict[str, float]:
+        """One noisy reading from every sensor, like a sampling pass on the robot."""
+        with self._lock:
+            return {name: self._add_noise(distance) for name, distance in self._true_ranges().items()}
+
+    def read_range(self, name: str) -> float:
+        return self.read_all()[name]
+
+    def _add_noise(self, distance: float) -> float:
+        cfg = self.config
+        roll = self.rng.random()
+        if not math.isfinite(distance) or roll < cfg.dropout_probability:
+            return float('inf')
+        if roll < cfg.dropout_probability + cfg.spike_probability:
+            # Multipath: the echo took a longer path, or crosstalk arrived early
+            return max(2.0, float(self.rng.choice([self.rng.uniform(0.0, distance), distance * 2])))
+        return max(2.0, float(self.rng.normal(distance, cfg.noise_cm + cfg.noise_fraction * distance)))
+
+    # --- Live mode ---
+
+    def start(self):
+        """Advances the simulation against the wall clock on a background thread."""
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="SimulatorThread", daemon=True)
+        self._thread.start()
+        if self.logger:
+            self.logger.log_activity("SIMULATOR", "Simulator running at %.1fx real time with %d segments.",
+                                     self.config.time_scale, len(self.world.segments))
+
+    def _run(self):
+        period = self.config.step_seconds
+        last = time.monotonic()
+        while not self._stop_event.wait(period):
+            now = time.monotonic()
+            self.step((now - last) * self.config.time_scale)
+            last = now
+
+    def stop(self):
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join(timeout=1)
+            self._thread = None
+            if self.logger:
+                self.logger.log_activity("SIMULATOR", "Simulator stopped after %.1f simulated s: %.0f cm travelled, "
+                                                      "%d collisions.", self.time, self.odometer, self.collisions)
+
+
+@dataclass
+class EpisodeResult:
+    seed: int
+    collisions: int
+    halts: int
+    distance_cm: float
+    min_clearance_cm: float
+    sim_seconds: float
+    wall_seconds: float
+
+
+class ScenarioRunner:
+    """
+    Runs the robot's wander/avoid behaviour through simulated episodes, synchronously
+    and in simulated time, for navigation regression tests.
+
+    The decisions come from the same code the live robot runs: readings go through
+    SensorManager's filters, motions use the MotorController's pattern table and the
+    MotionExecutor's speed and ramp profile, and SafetyMonitor decides when to
+    slow, halt and where to wander next. Only the threads are replaced by one loop
+    that senses every sampling period and steps the physics in between.
+    """
+    def __init__(self, logger: 'LoggingSystem', simulator_config: Optional[SimulatorConfig] = None,
+                 sensor_config: Optional[SensorConfig] = None, safety_config: Optional[SafetyConfig] = None,
+                 motion_config: Optional[MotionConfig] = None):
+        self.logger = logger
+        self.simulator_config = simulator_config or SimulatorConfig()
+        self.sensor_config = replace(sensor_config or SensorConfig(), background_sampling=False)
+        self.safety_config = safety_config or SafetyConfig()
+        self.motion_config = motion_config or MotionConfig()
+
+    def run_episode(self, seed: int, seconds: float = 60.0, world: Optional[World] = None) -> EpisodeResult:
+        wall_start = time.perf_counter()
+        x, y, _ = self.simulator_config.start_pose
+        world = world or World.random(seed, keep_clear=(x, y, self.simulator_config.robot_radius_cm * 3))
+        heading = float(np.random.default_rng(seed).uniform(-180.0, 180.0))
+        sim = Simulator(replace(self.simulator_config, seed=seed, start_pose=[x, y, heading]), world)
+        motors = MotorController("simulator", {}, self.logger, simulator=sim)
+        sensors = SensorManager("simulator", {}, self.logger, config=self.sensor_config, simulator=sim)
+        executor = MotionExecutor(motors, self.logger, self.motion_config)  # Used for its speed profile only
+        monitor = SafetyMonitor(sensors, executor, self.logger, self.safety_config)
+
+        control_period = 1.0 / self.sensor_config.sample_rate_hz
+        step = self.simulator_config.step_seconds
+        motion = None  # (action, duration, speed, ramp, started_at)
+        limit = 1.0
+        halts = 0
+        min_clearance = sim.clearance
+        sequence = 0
+        while sim.time < seconds:
+            # Sense, as one sampling pass
+            distances = sim.read_all()
+            for name, distance in distances.items():
+                sensors.filters[name].update(distance, sim.time)
+            sequence += 1
+            snapshot = SensorSnapshot(distances, {name: sensors.filters[name].latest for name in distances}, sim.time, sequence)
+
+            # Decide
+            if motion is not None and motion[0] in GUARDED_MOTIONS:
+                decision, limit, _ = monitor.assess(snapshot)
+                if decision == "halt":
+                    motors.halt()
+                    motion, limit, halts = None, 1.0, halts + 1
+            if motion is None:
+                action, amount = monitor.wander_decision(snapshot.filtered)
+                speed = executor.resolve_speed(self.safety_config.wander_speed)
+                duration = amount if action == "forward" else executor.turn_duration(amount, speed)
+                motion = (action, duration, speed, executor.ramp_seconds(speed), sim.time)
+                motors.start_motion(action, speed=0.0)
+
+            # Act until the next sampling pass
+            next_sense = sim.time + control_period
+            while sim.time < next_sense and motion is not None:
+                action, duration, speed, ramp, started_at = motion
+                elapsed = sim.time - started_at
+                if elapsed >= duration:
+                    motors.halt()
+                    motion, limit = None, 1.0
+                    break
+                motors.set_speed(min(trapezoid_duty(elapsed, duration, speed, ramp), limit))
+                sim.step(step)
+                min_clearance = min(min_clearance, sim.clearance)
+            while sim.time < next_sense:
+                sim.step(step)
+
+        return EpisodeResult(seed, sim.collisions, halts, sim.odometer, min_clearance, sim.time,
+                             time.perf_counter() - wall_start)
+
+    def run(self, seeds: Iterable[int], seconds: float = 60.0) -> List[EpisodeResult]:
+        return [self.run_episode(seed, seconds) for seed in seeds]
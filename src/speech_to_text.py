@@ -3,22 +3,41 @@ import pyaudio
 import json
 import os
 import time
+from .audio_capture import AudioCapture
+from .config import AudioConfig
 from .error_handler import STTError
-from typing import TYPE_CHECKING
+from .vad import EnergyVAD
+from typing import List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .logging_system import LoggingSystem
 
 class SpeechToText:
-    def __init__(self, model_path: str, sample_rate: int, chunk_size: int, logger: 'LoggingSystem'):
+    def __init__(self, model_path: str, sample_rate: int, chunk_size: int, logger: 'LoggingSystem', config: Optional[AudioConfig] = None):
         self.model_path = model_path
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
         self.logger = logger
+        self.config = config or AudioConfig(vosk_model_path=model_path, sample_rate=sample_rate, chunk_size=chunk_size)
+        self.capture = None
+        self._capture_position = 0  # Ring buffer position up to which audio has been recognized
+        self.vad = None
+        if self.config.vad_enabled:
+            self.vad = EnergyVAD(
+                self.sample_rate,
+                frame_ms=self.config.vad_frame_ms,
+                margin_db=self.config.vad_margin_db,
+                hangover_ms=self.config.vad_hangover_ms,
+                preroll_ms=self.config.vad_preroll_ms,
+                floor_adapt=self.config.vad_floor_adapt
+            )
         self.model = None
         self.recognizer = None
+        self.grammar_recognizer = None  # Small recognizer restricted to the command vocabulary
+        self.command_phrases: List[str] = []
         self.audio_stream = None
         self.pyaudio_instance = None
+        self.last_speech_end = None  # perf_counter() timestamp of the last final result
 
         try:
             self.initialize_model()
@@ -36,12 +55,47 @@ class SpeechToText:
         except Exception as e:
             raise STTError(f"Could not initialize Vosk model or PyAudio: {e}")
 
-    def listen_for_speech(self, timeout=7) -> str:
-        if not self.recognizer or not self.pyaudio_instance:
-            self.logger.log_activity("STT_ERROR", "STT system not initialized, cannot listen.")
-            return ""
+        if self.config.persistent_stream:
+            self.capture = AudioCapture(self.pyaudio_instance, self.sample_rate, self.chunk_size,
+                                        self.config.ring_buffer_seconds, self.logger)
+            self.capture.start()
+            self.logger.log_activity("STT", f"Persistent microphone capture started "
+                                            f"({self.config.ring_buffer_seconds}s ring buffer, {self.config.preroll_seconds}s pre-roll).")
 
+    def set_command_grammar(self, phrases: List[str]):
+        """
+        Enables the constrained-grammar fast path: a second recognizer that only knows
+        `phrases` decodes alongside the open-vocabulary one, and a confident match is
+        returned as soon as it is final instead of waiting for full decoding.
+        """
+        if not self.config.grammar_fast_path or not self.model or not phrases:
+            return
+        self.command_phrases = [phrase.lower() for phrase in phrases]
         try:
+            grammar = json.dumps(self.command_phrases + ["[unk]"])
+            self.grammar_recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate, grammar)
+            self.grammar_recognizer.SetWords(True)
+            self.logger.log_activity("STT", f"Command grammar fast path enabled for {len(self.command_phrases)} phrases.")
+        except Exception as e:
+            self.grammar_recognizer = None
+            self.logger.log_activity("STT_WARNING", f"Could not create command grammar recognizer: {e}")
+
+    def _read_chunks(self):
+        """
+        Yields audio chunks for one recognition turn. With a persistent stream the
+        turn starts `preroll_seconds` in the past (but never before audio already
+        recognized), so words spoken right after the robot finished talking are kept.
+        """
+        if self.capture:
+            position = self.capture.position_with_preroll(self.config.preroll_seconds, not_before=self._capture_position)
+            try:
+                while True:
+                    # Yields b"" when no audio arrived in time, so the caller's timeout still runs
+                    data, position = self.capture.read(position, self.chunk_size, timeout=1.0)
+                    yield data
+            finally:
+                self._capture_position = position
+        else:
             self.audio_stream = self.pyaudio_instance.open(
                 format=pyaudio.paInt16,
                 channels=1,
@@ -49,36 +103,109 @@ class SpeechToText:
                 input=True,
                 frames_per_buffer=self.chunk_size
             )
+            while True:
+                yield self.audio_stream.read(self.chunk_size, exception_on_overflow=False)
+
+    def listen_for_speech(self, timeout=7) -> str:
+        if not self.recognizer or not self.pyaudio_instance:
+            self.logger.log_activity("STT_ERROR", "STT system not initialized, cannot listen.")
+            return ""
+
+        chunks = self._read_chunks()
+        try:
+            self.recognizer.Reset()
+            if self.grammar_recognizer:
+                self.grammar_recognizer.Reset()
+            if self.vad:
+                self.vad.reset()
             self.logger.log_activity("STT", "Listening for speech...")
-            
+
             start_time = time.time()
-            while True:
+            listen_start = start_time
+            last_partial_poll = 0.0
+            for data in chunks:
                 # Timeout check
                 if time.time() - start_time > timeout:
                     self.logger.log_activity("STT", "Listening timed out due to silence.")
                     break
+                # Speech extends the timeout, but only so far: steady noise must not keep us listening forever
+                if time.time() - listen_start > timeout + self.config.max_utterance_seconds:
+                    self.logger.log_activity("STT_WARNING", "Listening stopped after %.0f s without a result.",
+                                             time.time() - listen_start)
+                    break
+                if not data:
+                    continue
 
-                data = self.audio_stream.read(self.chunk_size, exception_on_overflow=False)
-                if self.recognizer.AcceptWaveform(data):
-                    result = json.loads(self.recognizer.Result())
-                    text = result.get("text", "")
+                # Only speech segments (plus their pre-roll) reach the recognizer.
+                segments = self.vad.process(data) if self.vad else [data]
+                if self.vad and self.vad.in_speech:
+                    # Reset timeout if user is speaking
+                    start_time = time.time()
+
+                for segment in segments:
+                    if self.grammar_recognizer and self.grammar_recognizer.AcceptWaveform(segment):
+                        text = self._grammar_command(self.grammar_recognizer.Result())
+                        if text:
+                            return text
+                    if self.recognizer.AcceptWaveform(segment):
+                        text = self._final_text(self.recognizer.Result())
+                        if text:
+                            return text
+                    elif not self.vad and time.time() - last_partial_poll >= self.config.partial_result_interval:
+                        # Without the gate, poll partial results (throttled) to detect voice activity
+                        last_partial_poll = time.time()
+                        partial_result = json.loads(self.recognizer.PartialResult())
+                        if partial_result.get("partial"):
+                            # Reset timeout if user is speaking
+                            start_time = time.time()
+
+                if self.vad and self.vad.segment_ended:
+                    # No trailing silence is fed to Vosk, so close the utterance explicitly.
+                    if self.grammar_recognizer:
+                        text = self._grammar_command(self.grammar_recognizer.FinalResult())
+                        if text:
+                            return text
+                    text = self._final_text(self.recognizer.FinalResult())
                     if text:
-                        self.logger.log_stt(text, result.get("confidence", 1.0))
                         return text
-                else:
-                    # Check for partial result to detect voice activity
-                    partial_result = json.loads(self.recognizer.PartialResult())
-                    if partial_result.get("partial"):
-                        # Reset timeout if user is speaking
-                        start_time = time.time()
 
         except Exception as e:
             self.logger.log_activity("STT_ERROR", f"Error during speech recognition: {e}")
             return ""
         finally:
+            chunks.close()
             self.stop_listening()
         return ""
 
+    def _final_text(self, result_json: str) -> str:
+        """Extracts and logs the text of a final recognizer result."""
+        result = json.loads(result_json)
+        text = result.get("text", "")
+        if text:
+            self.last_speech_end = time.perf_counter()
+            self.logger.log_stt(text, result.get("confidence", 1.0))
+        return text
+
+    def _grammar_command(self, result_json: str) -> str:
+        """
+        Returns the command phrase from a grammar recognizer result if the utterance is
+        exactly one known phrase (ignoring out-of-vocabulary words) recognized with at
+        least `grammar_min_confidence`, and "" otherwise.
+        """
+        result = json.loads(result_json)
+        words = [w for w in result.get("result", []) if w.get("word") != "[unk]"]
+        text = " ".join(w["word"] for w in words)
+        if not words or text not in self.command_phrases:
+            return ""
+        confidence = sum(w.get("conf", 0.0) for w in words) / len(words)
+        if confidence < self.config.grammar_min_confidence:
+            self.logger.log_activity("STT_DEBUG", "Grammar match '%s' below confidence threshold (%.2f).", text, confidence)
+            return ""
+        self.last_speech_end = time.perf_counter()
+        self.logger.log_activity("STT", f"Command recognized by grammar fast path: '{text}' ({confidence:.2f}).")
+        self.logger.log_stt(text, confidence)
+        return text
+
     def stop_listening(self):
         if self.audio_stream and self.audio_stream.is_active():
             self.audio_stream.stop_stream()
@@ -87,6 +214,9 @@ class SpeechToText:
             self.logger.log_activity("STT", "Stopped listening.")
 
     def cleanup(self):
+        if self.capture:
+            self.capture.stop()
+            self.logger.log_activity("STT", f"Microphone capture stopped ({self.capture.overruns} ring buffer overruns).")
         if self.pyaudio_instance:
             self.pyaudio_instance.terminate()
             self.logger.log_activity("STT", "PyAudio terminated.")
@@ -1,4 +1,7 @@
 document.addEventListener('DOMContentLoaded', () => {
+    // Tags this tab's messages so its own turns are not repeated from the event stream
+    const clientId = Math.random().toString(36).slice(2);
+
     // --- MOVEMENT CONTROLS ---
     const sendCommand = (command) => {
         const directionMap = {
@@ -78,14 +81,54 @@ document.addEventListener('DOMContentLoaded', () => {
 
         entry.innerHTML = `
             <div class="activity-content">
-                <div class="activity-type">${type}</div>
-                <div class="activity-text">${text}</div>
+                <div class="activity-type"></div>
+                <div class="activity-text"></div>
             </div>
             <div class="activity-timestamp">${timestamp}</div>
         `;
+        entry.querySelector('.activity-type').textContent = type;
+        entry.querySelector('.activity-text').textContent = text;
         conversationHistoryEl.prepend(entry);
     };
 
+    // Chat requests run as background jobs: the answer arrives as "job" events
+    // (or by polling /api/jobs/<id> while the event stream is down).
+    const pendingJobs = new Set();
+
+    const showJob = (job) => {
+        if (!pendingJobs.has(job.job_id)) return;
+        if (job.status === 'failed') {
+            pendingJobs.delete(job.job_id);
+            aiResponseEl.innerHTML = '<p class="error-highlight"></p>';
+            aiResponseEl.firstChild.textContent = `Error: ${job.error}`;
+            return;
+        }
+        if (!job.response) return;
+        aiResponseEl.textContent = job.response;
+        responseTimestampEl.textContent = `Last updated: ${new Date().toLocaleTimeString()}`;
+        if (job.status === 'responded' || job.status === 'completed') {
+            pendingJobs.delete(job.job_id);
+            addActivityEntry('Robot', job.response);
+        }
+    };
+
+    // `immediate` fetches even while the stream is open: the job's events may have
+    // arrived before the POST returned and it was registered, and were ignored then.
+    const pollJob = (jobId, immediate = false) => {
+        if (!pendingJobs.has(jobId)) return;
+        if (!immediate && events.readyState === EventSource.OPEN) {
+            setTimeout(() => pollJob(jobId), 2000);
+            return;
+        }
+        fetch(`/api/jobs/${jobId}`)
+            .then(response => response.json())
+            .then(job => {
+                showJob(job);
+                setTimeout(() => pollJob(jobId), 500);
+            })
+            .catch(() => setTimeout(() => pollJob(jobId), 2000));
+    };
+
     const sendText = () => {
         const text = textInput.value.trim();
         if (!text) return;
@@ -99,14 +142,13 @@ document.addEventListener('DOMContentLoaded', () => {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ text: text }),
+            body: JSON.stringify({ text: text, client: clientId }),
         })
         .then(response => response.json())
         .then(data => {
-            if (data.status === 'success') {
-                aiResponseEl.innerHTML = `<p>${data.response}</p>`;
-                responseTimestampEl.textContent = `Last updated: ${new Date().toLocaleTimeString()}`;
-                addActivityEntry('Robot', data.response);
+            if (data.status === 'accepted') {
+                pendingJobs.add(data.job_id);
+                pollJob(data.job_id, true);
             } else {
                 aiResponseEl.innerHTML = `<p class="error-highlight">Error: ${data.message}</p>`;
             }
@@ -125,4 +167,61 @@ document.addEventListener('DOMContentLoaded', () => {
             sendText();
         }
     });
+
+    // --- LIVE STATUS (Server-Sent Events from /api/events) ---
+    const faceEmojis = {
+        neutral: '😐', happy: '😊', thinking: '🤔', hearing: '👂', speaking: '🗣️',
+        confused: '😕', crashed: '😵'
+    };
+    const connectionStatus = document.getElementById('connectionStatus');
+    const connectionText = document.getElementById('connectionText');
+
+    const setConnected = (connected) => {
+        if (connectionStatus) connectionStatus.classList.toggle('disconnected', !connected);
+        if (connectionText) connectionText.textContent = connected ? 'Connected' : 'Reconnecting...';
+    };
+
+    const events = new EventSource('/api/events');
+    events.onopen = () => setConnected(true);
+    // EventSource reconnects on its own; the server replays the current state when it does
+    events.onerror = () => setConnected(false);
+
+    events.addEventListener('face', (event) => {
+        const data = JSON.parse(event.data);
+        document.getElementById('faceStatus').textContent = data.face;
+        document.getElementById('faceEmoji').textContent = faceEmojis[data.face] || '🙂';
+    });
+
+    events.addEventListener('sensors', (event) => {
+        const data = JSON.parse(event.data);
+        ['front', 'left', 'right'].forEach(name => {
+            const el = document.getElementById(`${name}Sensor`);
+            const distance = data.distances[name];
+            if (el && distance !== undefined) el.textContent = `${distance.toFixed(1)} cm`;
+        });
+        document.getElementById('sensorTimestamp').textContent =
+            `Last updated: ${new Date(data.timestamp * 1000).toLocaleTimeString()}`;
+    });
+
+    events.addEventListener('motion', (event) => {
+        const data = JSON.parse(event.data);
+        document.getElementById('lastCommand').textContent = `${data.action} (${data.status})`;
+    });
+
+    events.addEventListener('job', (event) => showJob(JSON.parse(event.data)));
+
+    events.addEventListener('conversation', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.origin === `web:${clientId}`) return;
+        if (data.role === 'user') {
+            if (data.origin === 'voice') {
+                document.getElementById('voiceDisplay').textContent = data.text;
+            }
+            addActivityEntry(data.origin === 'voice' ? 'Voice' : 'You (another tab)', data.text);
+        } else {
+            aiResponseEl.textContent = data.text;
+            responseTimestampEl.textContent = `Last updated: ${new Date(data.timestamp * 1000).toLocaleTimeString()}`;
+            addActivityEntry('Robot', data.text);
+        }
+    });
 });
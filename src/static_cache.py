@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, TYPE_CHECKING
+
+from flask import Response, request
+from werkzeug.http import http_date
+from werkzeug.wsgi import wrap_file
+
+from .config import WebConfig
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+
+# Content types worth compressing; images are already compressed
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    content_type: str
+    etag: str
+    mtime: float
+    size: int
+    max_age: int
+    data: Optional[bytes] = None  # None: too large to keep, read from disk per request
+    encoded: Dict[str, bytes] = field(default_factory=dict)  # Content-Encoding -> precompressed body
+
+
+class StaticAssetCache:
+    """
+    The dashboard's pages and static/ files, loaded once at startup. Each response
+    carries an ETag, Last-Modified and Cache-Control, and conditional requests are
+    answered with 304. Text assets are held in memory with gzip (and brotli, if the
+    brotli package is installed) variants compressed ahead of time and picked by
+    Accept-Encoding. Files over `static_memory_max_file_kb` are streamed from disk
+    but still get validators, so browsers revalidate instead of downloading again.
+
+    Pages use `html_max_age` (0: revalidate every time) so UI changes show up at
+    once; the rest of static/ uses `static_max_age`.
+    """
+    def __init__(self, web_content_dir: str, logger: 'LoggingSystem', config: Optional[WebConfig] = None):
+        self.web_content_dir = web_content_dir
+        self.logger = logger
+        self.config = config or WebConfig()
+        self.assets: Dict[str, StaticAsset] = {}
+        self.served = 0
+        self.not_modified = 0
+        self.compressed = 0
+        self._compressors = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+        try:
+            import brotli
+            self._compressors["br"] = lambda data: brotli.compress(data, quality=11)
+        except ImportError:
+            pass
+
+        for filename in sorted(os.listdir(web_content_dir)):
+            if filename.endswith(".html"):
+                self._add(filename, os.path.join(web_content_dir, filename), self.config.html_max_age)
+        static_dir = os.path.join(web_content_dir, "static")
+        for directory, _, filenames in os.walk(static_dir):
+            for filename in sorted(filenames):
+                path = os.path.join(directory, filename)
+                key = "static/" + os.path.relpath(path, static_dir).replace(os.sep, "/")
+                self._add(key, path, self.config.static_max_age)
+
+        in_memory = [asset for asset in self.assets.values() if asset.data is not None]
+        self.logger.log_activity("WEB", "Static cache: %d files, %d in memory (%.0f KiB, %.0f KiB with compressed "
+                                        "variants: %s).", len(self.assets), len(in_memory),
+                                 sum(asset.size for asset in in_memory) / 1024,
+                                 sum(asset.size + sum(map(len, asset.encoded.values())) for asset in in_memory) / 1024,
+                                 ", ".join(self._compressors))
+
+    def _add(self, key: str, path: str, max_age: int):
+        try:
+            stat = os.stat(path)
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+            asset = StaticAsset(path, content_type, "", stat.st_mtime, stat.st_size, max_age)
+            if stat.st_size > self.config.static_memory_max_file_kb * 1024:
+                asset.etag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+            else:
+                with open(path, 'rb') as f:
+                    asset.data = f.read()
+                asset.etag = hashlib.sha1(asset.data).hexdigest()[:20]
+                if content_type.startswith(_COMPRESSIBLE) and asset.size >= self.config.compress_min_bytes:
+                    for encoding, compress in self._compressors.items():
+                        body = compress(asset.data)
+                        if len(body) < asset.size:
+                            asset.encoded[encoding] = body
+            self.assets[key] = asset
+        except OSError as e:
+            self.logger.log_activity("WEB_ERROR", f"Could not cache static file '{path}': {e}")
+
+    def response(self, key: str) -> Optional[Response]:
+        """
+        A response for the current request to asset `key`, or None if it is not cached or,
+        for a file streamed from disk, has been removed or changed since preload.
+        """
+        asset = self.assets.get(key)
+        if asset is None or (asset.data is None and not self._unchanged(asset)):
+            return None
+        self.served += 1
+        headers = {
+            "ETag": f'"{asset.etag}"',
+            "Last-Modified": http_date(asset.mtime),
+            "Cache-Control": f"public, max-age={asset.max_age}" if asset.max_age else "no-cache",
+        }
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+
+        if request.if_none_match:
+            fresh = request.if_none_match.contains(asset.etag)
+        else:
+            since = request.if_modified_since
+            fresh = since is not None and int(asset.mtime) <= since.timestamp()
+        if fresh:
+            self.not_modified += 1
+            return Response(status=304, headers=headers)
+
+        if asset.data is None:
+            try:
+                f = open(asset.path, 'rb')
+            except OSError:
+                return None  # Removed since the check above; the caller's fallback answers
+            headers["Content-Length"] = str(asset.size)
+            return Response(wrap_file(request.environ, f), content_type=asset.content_type, headers=headers,
+                            direct_passthrough=True)
+
+        body = asset.data
+        for encoding in sorted(asset.encoded, key=lambda name: len(asset.encoded[name])):
+            if request.accept_encodings[encoding] > 0:
+                body = asset.encoded[encoding]
+                headers["Content-Encoding"] = encoding
+                self.compressed += 1
+                break
+        return Response(body, content_type=asset.content_type, headers=headers)
+
+    @staticmethod
+    def _unchanged(asset: StaticAsset) -> bool:
+        """Whether a file streamed from disk still matches what was stat'ed at preload."""
+        try:
+            stat = os.stat(asset.path)
+        except OSError:
+            return False
+        return stat.st_size == asset.size and stat.st_mtime == asset.mtime
+
+    def stats(self) -> Dict[str, int]:
+        return {"files": len(self.assets), "served": self.served, "not_modified": self.not_modified,
+                "compressed": self.compressed}
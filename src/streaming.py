@@ -0,0 +1,48 @@
+import re
+from typing import Iterable, Iterator, List
+
+# A sentence ends at ., ! or ? (optionally followed by closing quotes/brackets) and whitespace.
+_SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+# Tokens that end in a period without ending the sentence.
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "approx.", "no."}
+
+
+class SentenceSegmenter:
+    """
+    Incrementally splits streamed text into sentences.
+
+    Text is fed in arbitrary chunks (e.g. LLM tokens); complete sentences are
+    returned as soon as their terminating punctuation and the following
+    whitespace have arrived. Sentences shorter than `min_length` are merged with
+    the next one so TTS is not fed single words like "Okay.".
+    """
+    def __init__(self, min_length: int = 12):
+        self.min_length = min_length
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+            if last_word in _ABBREVIATIONS or len(candidate) < self.min_length:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Returns whatever text is left once the stream has ended."""
+        remainder, self._buffer = self._buffer.strip(), ""
+        return [remainder] if remainder else []
+
+
+def iter_sentences(chunks: Iterable[str], min_length: int = 12) -> Iterator[str]:
+    """Turns a stream of text chunks into a stream of sentences."""
+    segmenter = SentenceSegmenter(min_length=min_length)
+    for chunk in chunks:
+        yield from segmenter.feed(chunk)
+    yield from segmenter.flush()
@@ -1,24 +1,51 @@
-
 import os
+import queue
 import subprocess
-import tempfile
+import threading
 import time
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, TYPE_CHECKING
 
+import numpy as np
 import pygame
 
 from .config import AudioConfig
 from .error_handler import TTSError
+from .face_animation import rms_envelope
 from .logging_system import LoggingSystem
+from .piper_engine import create_engine
+from .tts_cache import TTSCache
 
 if TYPE_CHECKING:
     pass
 
+
+@dataclass
+class Utterance:
+    """Ready-to-play speech: the mixer Sound plus its loudness envelope for lip-sync."""
+    sound: 'pygame.mixer.Sound'
+    envelope: np.ndarray  # RMS per frame, 0..1
+    frame_seconds: float
+
+    @property
+    def duration(self) -> float:
+        return len(self.envelope) * self.frame_seconds
+
+
+# Called with (utterance, time.monotonic() at play start) and (None, end time) when it finishes
+PlaybackListener = Callable[[Optional[Utterance], float], None]
+
+
 class TextToSpeech:
     """
-    A robust Text-to-Speech engine that uses the Piper command-line interface (CLI)
-    to prevent Python library conflicts. It generates a unique temporary file for each
-    speech request to completely avoid file-locking issues.
+    A Text-to-Speech engine built on Piper. By default the voice is loaded once into
+    a long-lived in-process synthesizer; if the piper Python package is unusable the
+    piper CLI is used instead. Either way synthesis produces raw PCM that is played
+    straight from memory through a reserved pygame mixer channel, with no temp files.
+
+    Each utterance's RMS envelope is computed from the PCM before playback (and
+    cached with the audio) so playback listeners such as the face display can move
+    the mouth in time with the voice.
     """
     def __init__(self, config: AudioConfig, logger: 'LoggingSystem'):
         self.config = config
@@ -31,64 +58,247 @@ class TextToSpeech:
         if not os.path.exists(self.model_path):
             raise TTSError(f"Voice model file not found at: {self.model_path}")
 
+        self.engine = create_engine(self.model_path, self.config.tts_engine, self.logger)
+        self.channel = None
+        self.playback_listeners: List[PlaybackListener] = []
+        # Voice turns and web jobs can speak at the same time; utterances take turns instead of cutting each other off
+        self._playback_lock = threading.Lock()
+
         try:
-            # --- Initialize Pygame Mixer for playback ---
-            pygame.mixer.init()
-            self.logger.log_activity("TTS", "Pygame mixer initialized for audio playback.")
+            # --- Initialize Pygame Mixer for playback at the voice's native format ---
+            pygame.mixer.init(frequency=self.engine.sample_rate, size=-16, channels=1)
+            pygame.mixer.set_reserved(1)
+            self.channel = pygame.mixer.Channel(0)
+            self.logger.log_activity("TTS", f"Pygame mixer initialized for audio playback: {pygame.mixer.get_init()}.")
         except Exception as e:
             self.logger.log_activity("TTS_ERROR", f"CRITICAL: Failed to initialize pygame mixer: {e}")
 
-    def speak(self, text: str):
+        self.cache = None
+        if self.config.tts_cache_enabled:
+            self.cache = TTSCache(
+                self.config.tts_cache_directory, self.config.piper_voice, self.logger,
+                disk_budget_bytes=int(self.config.tts_cache_disk_budget_mb * 1024 * 1024),
+                memory_budget_bytes=int(self.config.tts_cache_memory_budget_mb * 1024 * 1024)
+            )
+            if self.config.tts_prewarm_phrases and pygame.mixer.get_init():
+                threading.Thread(target=self._prewarm, name="TTSPrewarmThread", daemon=True).start()
+
+    def synthesize(self, text: str) -> bytes:
+        """Synthesizes text to 16-bit mono PCM at the voice's sample rate."""
+        self.logger.log_activity("TTS_DEBUG", "Synthesizing with %s engine: %r", self.engine.name, text)
+        return self.engine.synthesize(text)
+
+    def _to_mixer_format(self, pcm: bytes) -> bytes:
+        """Converts mono voice PCM to the format the mixer actually opened with."""
+        frequency, _, channels = pygame.mixer.get_init()
+        if frequency == self.engine.sample_rate and channels == 1:
+            return pcm
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if frequency != self.engine.sample_rate and len(samples):
+            positions = np.arange(0, len(samples), self.engine.sample_rate / frequency)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+        if channels > 1:
+            samples = np.repeat(samples, channels)
+        return samples.tobytes()
+
+    def make_sound(self, pcm: bytes) -> 'pygame.mixer.Sound':
+        """Wraps synthesized PCM in a mixer Sound without touching the disk."""
+        return pygame.mixer.Sound(buffer=self._to_mixer_format(pcm))
+
+    @property
+    def envelope_frame_seconds(self) -> float:
+        return self.config.lip_sync_frame_ms / 1000.0
+
+    def make_envelope(self, pcm: bytes) -> np.ndarray:
+        return rms_envelope(pcm, self.engine.sample_rate, self.envelope_frame_seconds)
+
+    def _cache_params(self) -> dict:
+        return {"sample_rate": self.engine.sample_rate}
+
+    def get_utterance(self, text: str) -> Utterance:
+        """
+        Returns a playable Utterance for `text`, from the in-memory LRU, the disk cache,
+        or freshly synthesized (and then cached), in that order. Envelopes are stored
+        on disk next to the PCM so a disk hit does not recompute them.
+        """
+        if not self.cache or len(text) > self.config.tts_cache_max_chars:
+            pcm = self.synthesize(text)
+            return Utterance(self.make_sound(pcm), self.make_envelope(pcm), self.envelope_frame_seconds)
+
+        key = self.cache.make_key(text, self._cache_params())
+        utterance = self.cache.get_decoded(key)
+        if utterance is not None:
+            return utterance
+        envelope_suffix = f".env{self.config.lip_sync_frame_ms}"
+        envelope = None
+        pcm = self.cache.get_pcm(key)
+        if pcm is None:
+            pcm = self.synthesize(text)
+            self.cache.put_pcm(key, pcm)
+        else:
+            data = self.cache.get_sidecar(key, envelope_suffix)
+            if data is not None:
+                envelope = np.frombuffer(data, dtype=np.float16).astype(np.float32)
+        if envelope is None:
+            envelope = self.make_envelope(pcm)
+            self.cache.put_sidecar(key, envelope_suffix, envelope.astype(np.float16).tobytes())
+        utterance = Utterance(self.make_sound(pcm), envelope, self.envelope_frame_seconds)
+        self.cache.put_decoded(key, utterance, len(pcm) + envelope.nbytes)
+        return utterance
+
+    def get_sound(self, text: str) -> 'pygame.mixer.Sound':
+        """Returns a playable Sound for `text`; see `get_utterance`."""
+        return self.get_utterance(text).sound
+
+    def _prewarm(self):
+        """Synthesizes and decodes the configured stock phrases ahead of time."""
+        start = time.time()
+        for phrase in self.config.tts_prewarm_phrases:
+            try:
+                self.get_utterance(phrase)
+            except Exception as e:
+                self.logger.log_activity("TTS_CACHE_WARNING", f"Failed to pre-warm '{phrase}': {e}")
+        self.logger.log_activity("TTS_CACHE", f"Pre-warmed {len(self.config.tts_prewarm_phrases)} phrases "
+                                              f"in {time.time() - start:.2f}s: {self.cache.stats_summary()}")
+
+    def add_playback_listener(self, listener: PlaybackListener):
+        self.playback_listeners.append(listener)
+
+    def _notify_playback(self, utterance: Optional[Utterance]):
+        now = time.monotonic()
+        for listener in self.playback_listeners:
+            try:
+                listener(utterance, now)
+            except Exception as e:
+                self.logger.log_activity("TTS_ERROR", f"Playback listener failed: {e}")
+
+    def _play_sound(self, utterance: Utterance, cancel: Optional[threading.Event] = None):
+        """Plays an Utterance on the speech channel and blocks until playback has finished or `cancel` is set."""
+        with self._playback_lock:
+            try:
+                self.channel.play(utterance.sound)
+                self._notify_playback(utterance)
+                while self.channel.get_busy():
+                    if cancel is None:
+                        time.sleep(0.01)
+                    elif cancel.wait(0.01):
+                        break
+            finally:
+                self._notify_playback(None)
+                if pygame.mixer.get_init():
+                    self.channel.stop()
+
+    def _log_synthesis_error(self, text: str, error: Exception):
+        self.logger.log_tts(text, False)
+        if isinstance(error, subprocess.CalledProcessError):
+            stderr = error.stderr.decode('utf-8', 'replace') if isinstance(error.stderr, bytes) else (error.stderr or '')
+            self.logger.log_activity("TTS_ERROR", f"Piper CLI synthesis failed with exit code {error.returncode}.")
+            self.logger.log_activity("TTS_ERROR", f"Stderr from piper: {stderr.strip()}")
+        else:
+            self.logger.log_activity("TTS_ERROR", f"Failed during synthesis or playback: {error}")
+
+    def speak(self, text: str, cancel: Optional[threading.Event] = None):
+        """Says `text` and returns when it has been spoken, or as soon as `cancel` is set."""
         if not pygame.mixer.get_init():
             self.logger.log_activity("TTS_ERROR", "Pygame mixer not initialized. Cannot speak.")
             return
 
-        temp_wav_path = None
         try:
-            # 1. Create a unique temporary file for this specific speech request
-            # This completely avoids file locking/re-use issues.
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-                temp_wav_path = tmp_file.name
-            
-            # 2. Construct the command for the Piper CLI
-            command = f'piper --model "{self.model_path}" --output_file "{temp_wav_path}" "{text}"'
-            self.logger.log_activity("TTS_DEBUG", f"Running CLI command: {command}")
-
-            # 3. Run the synthesis in a separate, isolated process
-            subprocess.run(command, capture_output=True, text=True, check=True, shell=True)
-            self.logger.log_activity("TTS_DEBUG", "Piper CLI synthesis completed successfully.")
-
-            # 4. Play the generated WAV file
+            # 1. Fetch from the cache or synthesize straight into memory
+            utterance = self.get_utterance(text)
+
+            # 2. Play it and wait for playback to finish
             self.logger.log_activity("TTS", f"Speaking: '{text[:50]}...'")
-            pygame.mixer.music.load(temp_wav_path)
-            pygame.mixer.music.play()
+            self._play_sound(utterance, cancel)
 
-            # 5. Wait for playback to finish
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
-            
             self.logger.log_tts(text, True)
-
-        except subprocess.CalledProcessError as e:
-            self.logger.log_tts(text, False)
-            self.logger.log_activity("TTS_ERROR", f"Piper CLI synthesis failed with exit code {e.returncode}.")
-            self.logger.log_activity("TTS_ERROR", f"Stderr from piper: {e.stderr.strip()}")
         except Exception as e:
-            self.logger.log_tts(text, False)
-            self.logger.log_activity("TTS_ERROR", f"Failed during CLI synthesis or playback: {e}")
-        finally:
-            # 6. Clean up the unique temporary file robustly
-            if pygame.mixer.get_init():
-                pygame.mixer.music.stop()
-                pygame.mixer.music.unload()
-            
-            if temp_wav_path and os.path.exists(temp_wav_path):
+            self._log_synthesis_error(text, e)
+
+    def speak_stream(self, sentences: Iterable[str], on_first_audio: Optional[Callable[[], None]] = None,
+                     cancel: Optional[threading.Event] = None) -> str:
+        """
+        Speaks a stream of sentences as they arrive. A producer thread pulls the next
+        sentence (and with it, the upstream LLM stream) and synthesizes it while the
+        calling thread plays the previous one. `on_first_audio` is called right
+        before the first sentence starts playing. Setting `cancel` cuts the current
+        sentence short and skips the rest: the producer stops pulling sentences and
+        closes `sentences` (so the upstream generation stops too) without being
+        waited for. Returns the text actually spoken.
+        """
+        if not pygame.mixer.get_init():
+            self.logger.log_activity("TTS_ERROR", "Pygame mixer not initialized. Cannot speak.")
+            # Still drain the stream so the caller's turn completes.
+            return " ".join(list(sentences))
+
+        ready: queue.Queue = queue.Queue(maxsize=max(1, self.config.tts_prefetch_sentences))
+        cancelled = threading.Event()
+
+        def offer(item) -> bool:
+            # Never blocks for good: gives up once the speaker has stopped taking sentences
+            while not cancelled.is_set():
                 try:
-                    os.remove(temp_wav_path)
-                except OSError as e:
-                    self.logger.log_activity("TTS_WARN", f"Could not remove temp file: {e}")
+                    ready.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            iterator = iter(sentences)
+            try:
+                for sentence in iterator:
+                    if cancelled.is_set():
+                        break
+                    try:
+                        utterance = self.get_utterance(sentence)
+                    except Exception as e:
+                        self._log_synthesis_error(sentence, e)
+                        continue
+                    if not offer((sentence, utterance)):
+                        break
+            except Exception as e:
+                self.logger.log_activity("TTS_ERROR", f"Sentence stream failed: {e}")
+            finally:
+                # Generators must be closed by the thread that runs them; this stops the upstream stream early
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+                offer(None)
+
+        producer = threading.Thread(target=produce, name="TTSSynthesisThread", daemon=True)
+        producer.start()
+
+        spoken = []
+        first = True
+        try:
+            while cancel is None or not cancel.is_set():
+                try:
+                    item = ready.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    break
+                sentence, utterance = item
+                try:
+                    if first:
+                        first = False
+                        if on_first_audio:
+                            on_first_audio()
+                    self.logger.log_activity("TTS", f"Speaking: '{sentence[:50]}...'")
+                    self._play_sound(utterance, cancel)
+                    self.logger.log_tts(sentence, True)
+                    spoken.append(sentence)
+                except Exception as e:
+                    self._log_synthesis_error(sentence, e)
+        finally:
+            # The producer is not waited for: it closes the stream on its own once it sees this
+            cancelled.set()
+        return " ".join(spoken)
 
     def cleanup(self):
+        if self.cache:
+            self.logger.log_activity("TTS_CACHE", self.cache.stats_summary())
         if pygame.mixer.get_init():
             pygame.mixer.quit()
             self.logger.log_activity("TTS", "Pygame mixer shut down.")
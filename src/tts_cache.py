@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .logging_system import LoggingSystem
+
+
+class TTSCache:
+    """
+    A content-addressed cache of synthesized speech.
+
+    Audio is keyed by a hash of (voice, text, synthesis params) and stored on disk
+    as raw PCM (`<key>.pcm`) under a byte budget, evicting the least recently used
+    files first. Small sidecar files derived from the audio (lip-sync envelopes,
+    `<key>.env<ms>`) live next to it and are evicted with it. On top of that, an
+    in-memory LRU keeps decoded, ready-to-play objects under its own byte budget.
+    """
+    def __init__(self, cache_directory: str, voice: str, logger: 'LoggingSystem',
+                 disk_budget_bytes: int = 50 * 1024 * 1024, memory_budget_bytes: int = 16 * 1024 * 1024,
+                 stats_interval: int = 25):
+        self.cache_directory = os.path.join(cache_directory, voice)
+        self.voice = voice
+        self.logger = logger
+        self.disk_budget_bytes = disk_budget_bytes
+        self.memory_budget_bytes = memory_budget_bytes
+        self.stats_interval = stats_interval
+
+        self._lock = threading.Lock()
+        self._memory: 'OrderedDict[str, tuple[Any, int]]' = OrderedDict()
+        self._memory_bytes = 0
+        # Disk index: key -> size in bytes; insertion order is LRU order.
+        self._disk: 'OrderedDict[str, int]' = OrderedDict()
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_directory, exist_ok=True)
+        self._build_disk_index()
+
+    def _build_disk_index(self):
+        entries = []
+        for filename in os.listdir(self.cache_directory):
+            if filename.endswith(".pcm"):
+                stat = os.stat(os.path.join(self.cache_directory, filename))
+                entries.append((stat.st_mtime, filename[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def make_key(self, text: str, params: Dict[str, Any]) -> str:
+        material = json.dumps({"voice": self.voice, "text": text.strip(), "params": params}, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, suffix: str = ".pcm") -> str:
+        return os.path.join(self.cache_directory, key + suffix)
+
+    def get_decoded(self, key: str) -> Optional[Any]:
+        """Returns the decoded object for `key` from the in-memory LRU, if present."""
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+        self._maybe_log_stats()
+        return item[0]
+
+    def put_decoded(self, key: str, obj: Any, size: int):
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[1]
+            if size > self.memory_budget_bytes:
+                return
+            self._memory[key] = (obj, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_budget_bytes:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted_size
+
+    def get_pcm(self, key: str) -> Optional[bytes]:
+        """Returns cached PCM for `key` from disk, or None on a miss."""
+        with self._lock:
+            known = key in self._disk
+        if known:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    pcm = f.read()
+                os.utime(self._path(key))
+                with self._lock:
+                    self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                self._maybe_log_stats()
+                return pcm
+            except OSError:
+                self._forget(key)
+        with self._lock:
+            self.misses += 1
+        self._maybe_log_stats()
+        return None
+
+    def put_pcm(self, key: str, pcm: bytes):
+        """Stores PCM on disk and evicts least recently used entries over the budget."""
+        if len(pcm) > self.disk_budget_bytes:
+            return
+        tmp_path = self._path(key, ".tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(pcm)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            self.logger.log_activity("TTS_CACHE_WARNING", f"Could not write cache entry: {e}")
+            return
+
+        evicted = []
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)
+            self._disk[key] = len(pcm)
+            self._disk_bytes += len(pcm)
+            while self._disk_bytes > self.disk_budget_bytes and len(self._disk) > 1:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._remove_files(old_key)
+
+    def get_sidecar(self, key: str, suffix: str) -> Optional[bytes]:
+        """Returns a sidecar file stored next to the PCM for `key`, or None."""
+        with self._lock:
+            if key not in self._disk:
+                return None
+        try:
+            with open(self._path(key, suffix), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_sidecar(self, key: str, suffix: str, data: bytes):
+        """Stores a sidecar next to cached PCM; it is not counted against the budget."""
+        with self._lock:
+            if key not in self._disk:
+                return
+        tmp_path = self._path(key, suffix + ".tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key, suffix))
+        except OSError as e:
+            self.logger.log_activity("TTS_CACHE_WARNING", f"Could not write cache sidecar: {e}")
+
+    def _remove_files(self, key: str):
+        for filename in os.listdir(self.cache_directory):
+            if filename.startswith(key):
+                try:
+                    os.remove(os.path.join(self.cache_directory, filename))
+                except OSError:
+                    pass
+
+    def _forget(self, key: str):
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats_summary(self) -> str:
+        return (f"hit rate {self.hit_rate:.0%} (memory {self.memory_hits}, disk {self.disk_hits}, misses {self.misses}); "
+                f"memory {self._memory_bytes / 1024:.0f} KiB in {len(self._memory)} sounds, "
+                f"disk {self._disk_bytes / 1024:.0f} KiB in {len(self._disk)} files")
+
+    def _maybe_log_stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        if self.stats_interval and lookups % self.stats_interval == 0:
+            self.logger.log_activity("TTS_CACHE", self.stats_summary)
@@ -0,0 +1,113 @@
+from collections import deque
+from typing import Deque, List
+
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    A vectorised energy gate that decides which audio chunks are worth sending to
+    the recognizer.
+
+    Each chunk is split into `frame_ms` frames and their energy (dBFS) is computed
+    in one NumPy pass. A frame is speech when it is `margin_db` above an adaptive
+    noise floor. The floor follows a low percentile (`floor_percentile`) of all
+    frames from the last `floor_window_ms`, so it finds the room's noise level in
+    the pauses between words even when that noise is loud enough to be taken for
+    speech. It is set directly from the first `calibration_ms` of audio and then
+    falls quickly and rises by `floor_adapt` per chunk. Once open, the gate
+    stays open for `hangover_ms` after the last speech frame so word endings and
+    short pauses are kept, and the `preroll_ms` of audio before the onset is
+    replayed so the first syllable is not lost.
+    """
+    def __init__(self, sample_rate: int, frame_ms: int = 30, margin_db: float = 10.0,
+                 hangover_ms: int = 500, preroll_ms: int = 300, floor_adapt: float = 0.05,
+                 initial_floor_db: float = -60.0, min_speech_frames: int = 2, floor_window_ms: int = 3000,
+                 floor_percentile: float = 10.0, calibration_ms: int = 500):
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, int(sample_rate * frame_ms / 1000))
+        self.margin_db = margin_db
+        self.hangover_samples = int(sample_rate * hangover_ms / 1000)
+        self.preroll_samples = int(sample_rate * preroll_ms / 1000)
+        self.floor_adapt = floor_adapt
+        self.noise_floor_db = initial_floor_db
+        self.min_speech_frames = min_speech_frames
+        self.floor_percentile = floor_percentile
+        self._recent_energies: Deque[float] = deque(maxlen=max(1, floor_window_ms // frame_ms))
+        self._calibration_frames = max(1, calibration_ms // frame_ms)
+        self._frames_seen = 0
+
+        self.in_speech = False
+        self.segment_ended = False
+        self._silence_run = 0  # Samples since the last speech frame
+        self._preroll: Deque[bytes] = deque()
+        self._preroll_len = 0
+
+    def frame_energies_db(self, samples: np.ndarray) -> np.ndarray:
+        """Returns the energy of each whole frame in dB relative to full scale."""
+        n_frames = len(samples) // self.frame_samples
+        if n_frames == 0:
+            frames = samples.astype(np.float32).reshape(1, -1)
+        else:
+            frames = samples[:n_frames * self.frame_samples].astype(np.float32).reshape(n_frames, self.frame_samples)
+        power = np.mean(np.square(frames / 32768.0), axis=1)
+        return 10.0 * np.log10(power + 1e-12)
+
+    def process(self, chunk: bytes) -> List[bytes]:
+        """
+        Feeds one chunk of int16 PCM. Returns the chunks that should be passed to the
+        recognizer (pre-roll plus current chunk at speech onset, the current chunk
+        while the gate is open, nothing otherwise). `segment_ended` is set on the
+        chunk that closes the gate.
+        """
+        self.segment_ended = False
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        if len(samples) == 0:
+            return []
+
+        energies = self.frame_energies_db(samples)
+        self._update_noise_floor(energies)
+        speech = energies > self.noise_floor_db + self.margin_db
+
+        if np.count_nonzero(speech) >= self.min_speech_frames:
+            last_speech = int(np.flatnonzero(speech)[-1])
+            self._silence_run = (len(energies) - 1 - last_speech) * self.frame_samples
+            if not self.in_speech:
+                self.in_speech = True
+                out = list(self._preroll) + [chunk]
+                self._preroll.clear()
+                self._preroll_len = 0
+                return out
+            return [chunk]
+
+        if self.in_speech:
+            self._silence_run += len(samples)
+            if self._silence_run >= self.hangover_samples:
+                self.in_speech = False
+                self.segment_ended = True
+            return [chunk]
+
+        self._preroll.append(chunk)
+        self._preroll_len += len(samples)
+        while self._preroll and self._preroll_len - len(self._preroll[0]) // 2 >= self.preroll_samples:
+            self._preroll_len -= len(self._preroll.popleft()) // 2
+        return []
+
+    def _update_noise_floor(self, energies: np.ndarray):
+        """Moves the floor towards a low percentile of recent frames; drops quickly, rises slowly."""
+        self._recent_energies.extend(energies.tolist())
+        self._frames_seen += len(energies)
+        level = float(np.percentile(self._recent_energies, self.floor_percentile))
+        if self._frames_seen <= self._calibration_frames:
+            self.noise_floor_db = level
+            return
+        rate = 0.5 if level < self.noise_floor_db else self.floor_adapt
+        self.noise_floor_db += rate * (level - self.noise_floor_db)
+
+    def reset(self):
+        """Forgets the current segment and pre-roll, keeping the learned noise floor."""
+        self.in_speech = False
+        self.segment_ended = False
+        self._silence_run = 0
+        self._preroll.clear()
+        self._preroll_len = 0
@@ -1,51 +1,192 @@
 
-from flask import Flask, jsonify, request, send_from_directory
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request, send_from_directory
+from typing import Optional
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
 import os
+import select
+import socket
+import threading
+import time
+from .config import WebConfig
+from .error_handler import MotorError
+from .job_manager import JobQueueFullError
+from .static_cache import StaticAssetCache
+
+
+class _PooledRequestHandler(WSGIRequestHandler):
+    """
+    HTTP/1.1 with keep-alive. An idle connection is closed after `timeout`, or at
+    once when other connections are waiting for a pool thread, so a browser's idle
+    connections never delay a control request such as /move/stop. Requests for a
+    streaming path (the /api/events stream) are handed to a thread of their own.
+    """
+    protocol_version = "HTTP/1.1"
+    timeout = 5.0
+    handed_off = False
+    requests_handled = 0
+
+    def log_request(self, code="-", size="-"):
+        # Per-request access logging costs more than serving a cached file
+        pass
+
+    def handle_one_request(self):
+        if self.requests_handled and not self._wait_for_request():
+            self.close_connection = True
+            return
+        self.requests_handled += 1
+        super().handle_one_request()
+
+    def _wait_for_request(self) -> bool:
+        """Waits on an idle keep-alive connection; False once it times out or others need the thread."""
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.server.waiting_connections:
+                return False
+            readable, _, _ = select.select([self.connection], [], [], 0.05)
+            if readable:
+                return True
+        return False
+
+    def run_wsgi(self):
+        if self.path.split("?", 1)[0] not in self.server.stream_paths:
+            super().run_wsgi()
+            return
+        # The stream thread owns the connection from here; this pool thread returns
+        self.handed_off = True
+        self.close_connection = True
+        threading.Thread(target=self._run_stream, name="WebEventStream", daemon=True).start()
+
+    def _run_stream(self):
+        try:
+            super().run_wsgi()
+        except (ConnectionError, socket.timeout) as e:
+            self.connection_dropped(e)
+        except Exception:
+            self.server.handle_error(self.request, self.client_address)
+        finally:
+            super().finish()
+            self.server.shutdown_request(self.request)
+
+    def finish(self):
+        if not self.handed_off:
+            super().finish()
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    An in-process WSGI server that handles connections on a fixed pool of threads
+    rather than starting a thread per connection, so load is bounded by `threads`.
+    Connections beyond that wait in the pool's queue (`waiting_connections`), and
+    idle keep-alive connections give their thread up to them. Long-lived streams on
+    `stream_paths` run on their own threads and never occupy the pool; the web
+    server caps how many may be open.
+    """
+    multithread = True
+    stream_paths = ("/api/events",)
+
+    def __init__(self, host: str, port: int, app, threads: int, backlog: int):
+        self.request_queue_size = backlog
+        super().__init__(host, port, app, handler=_PooledRequestHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="WebWorker")
+        self._waiting_lock = threading.Lock()
+        self.waiting_connections = 0
+
+    def process_request(self, request, client_address):
+        with self._waiting_lock:
+            self.waiting_connections += 1
+        self.pool.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        with self._waiting_lock:
+            self.waiting_connections -= 1
+        handler = None
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if handler is None or not handler.handed_off:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
 
 class WebServer:
-    def __init__(self, robot_controller):
+    def __init__(self, robot_controller, config: Optional[WebConfig] = None):
+        self.config = config or WebConfig()
         # The root for our web content is the 'src' directory, where this script lives.
         self.web_content_dir = os.path.dirname(os.path.abspath(__file__))
 
         # The static folder is a sub-directory of our web content dir.
-        static_folder = os.path.join(self.web_content_dir, 'static')
+        self.static_folder = os.path.join(self.web_content_dir, 'static')
 
-        # We no longer use a template folder, files are served directly.
-        self.app = Flask(__name__, static_folder=static_folder)
+        # We no longer use a template folder, files are served directly. Static files
+        # have their own route so they can come from the asset cache.
+        self.app = Flask(__name__, static_folder=None)
         self.robot_controller = robot_controller
+        self.logger = robot_controller.logger
+        self.assets = StaticAssetCache(self.web_content_dir, self.logger, self.config) if self.config.static_cache else None
+        self.server: Optional[PooledWSGIServer] = None
         self.configure_routes()
 
+    def _serve_file(self, directory: str, filename: str, key: str):
+        if self.assets:
+            response = self.assets.response(key)
+            if response is not None:
+                return response
+        return send_from_directory(directory, filename)
+
     def configure_routes(self):
         # Serve the main index.html
         @self.app.route('/')
         def index():
-            return send_from_directory(self.web_content_dir, 'index.html')
+            return self._serve_file(self.web_content_dir, 'index.html', 'index.html')
 
         # Serve any other .html file by name (e.g., /control.html)
         @self.app.route('/<path:filename>.html')
         def serve_html(filename):
-            return send_from_directory(self.web_content_dir, f"{filename}.html")
+            return self._serve_file(self.web_content_dir, f"{filename}.html", f"{filename}.html")
+
+        @self.app.route('/static/<path:filename>')
+        def serve_static(filename):
+            return self._serve_file(self.static_folder, filename, f"static/{filename}")
 
         @self.app.route('/move/<direction>', methods=['POST'])
         def move(direction):
-            if not self.robot_controller.motor_controller:
-                return jsonify({"status": "error", "message": "Motor controller not initialized"}), 500
-
-            duration = 0.5  # seconds
-            if direction == 'forward':
-                self.robot_controller.motor_controller.move_forward(duration)
-            elif direction == 'backward':
-                self.robot_controller.motor_controller.move_backward(duration)
-            elif direction == 'left':
-                self.robot_controller.motor_controller.turn_left()
-            elif direction == 'right':
-                self.robot_controller.motor_controller.turn_right()
-            elif direction == 'stop':
-                self.robot_controller.motor_controller.stop()
-            else:
-                return jsonify({"status": "error", "message": "Invalid direction"}), 400
-            
-            return jsonify({"status": "success", "message": f"Moved {direction}"})
+            arbiter = self.robot_controller.arbiter
+            if not arbiter:
+                return jsonify({"status": "error", "message": "Motion executor not initialized"}), 500
+
+            # Optional ?speed=slow|normal|fast|<0..1>
+            speed = request.args.get('speed')
+            try:
+                if direction == 'stop':
+                    command = arbiter.stop("web")
+                elif direction in ('forward', 'backward'):
+                    command = arbiter.move(direction, arbiter.motion.config.web_move_duration, "web", speed=speed)
+                elif direction in ('left', 'right'):
+                    command = arbiter.turn(direction, "web", speed=speed)
+                else:
+                    return jsonify({"status": "error", "message": "Invalid direction"}), 400
+            except MotorError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+
+            # The motion runs on the motion thread; poll /move/status/<command_id> for completion.
+            return jsonify({"status": "accepted", "message": f"Queued {direction}",
+                            "command_id": command.command_id}), 202
+
+        @self.app.route('/move/status/<int:command_id>', methods=['GET'])
+        def move_status(command_id):
+            executor = self.robot_controller.motion_executor
+            if not executor:
+                return jsonify({"status": "error", "message": "Motion executor not initialized"}), 500
+            command_status = executor.get_status(command_id)
+            if command_status is None:
+                return jsonify({"status": "error", "message": "Unknown command"}), 404
+            return jsonify(command_status)
 
         @self.app.route('/api/send_text', methods=['POST'])
         def send_text():
@@ -54,13 +195,100 @@ class WebServer:
                 return jsonify({"status": "error", "message": "No text provided"}), 400
 
             text_input = data['text']
+            # Tabs tag their messages so they can skip their own turns on the event stream
+            origin = f"web:{data['client']}" if data.get('client') else "web"
             
-            if not self.robot_controller.command_processor:
+            processor = self.robot_controller.command_processor
+            jobs = self.robot_controller.job_manager
+            if not processor or not jobs:
                 return jsonify({"status": "error", "message": "Command processor not initialized"}), 500
 
-            response_text = self.robot_controller.command_processor.process_text_input(text_input)
-            
-            return jsonify({"status": "success", "response": response_text})
+            def respond(text, on_response):
+                return processor.process_text_input(text, origin=origin, on_response=on_response)
+
+            try:
+                job = jobs.submit("send_text", text_input, respond, origin=origin)
+            except JobQueueFullError as e:
+                return jsonify({"status": "error", "message": str(e)}), 503, {"Retry-After": "2"}
+
+            # The answer arrives as "job" events on /api/events, or poll /api/jobs/<job_id>.
+            return jsonify({"status": "accepted", "job_id": job.job_id,
+                            "status_url": f"/api/jobs/{job.job_id}"}), 202
+
+        @self.app.route('/api/jobs/<job_id>', methods=['GET'])
+        def job_status(job_id):
+            jobs = self.robot_controller.job_manager
+            if not jobs:
+                return jsonify({"status": "error", "message": "Job manager not initialized"}), 500
+            job = jobs.get(job_id)
+            if job is None:
+                return jsonify({"status": "error", "message": "Unknown job"}), 404
+            return jsonify(job)
+
+        @self.app.route('/api/status', methods=['GET'])
+        def status():
+            # Served from the latest published state; never fires the sensors.
+            controller = self.robot_controller
+            bus = controller.event_bus
+            snapshot = controller.sensor_manager.snapshot if controller.sensor_manager else None
+            executor = controller.motion_executor
+            current = executor.current if executor else None
+            return jsonify({
+                "face": controller.face_display.get_current_face() if controller.face_display else None,
+                "sensors": snapshot.to_dict() if snapshot else None,
+                "sensor_age_s": round(snapshot.age, 3) if snapshot else None,
+                "motion": current.to_dict() if current else (bus.latest("motion") if bus else None),
+                "speed_limit": executor.speed_limit if executor else None,
+                "conversation": bus.latest("conversation") if bus else None,
+                "events": bus.stats() if bus else None,
+                "jobs": controller.job_manager.stats() if controller.job_manager else None,
+                "static": self.assets.stats() if self.assets else None,
+                "arbiter": controller.arbiter.stats() if controller.arbiter else None,
+            })
+
+        @self.app.route('/api/events', methods=['GET'])
+        def events():
+            """
+            Server-Sent Events stream of "face", "sensors", "motion", "conversation" and
+            "job" events, starting with the current state. `?topics=face,sensors` narrows it.
+            """
+            bus = self.robot_controller.event_bus
+            if not bus:
+                return jsonify({"status": "error", "message": "Event bus not initialized"}), 500
+            if bus.stats()["subscribers"] >= self.config.max_event_streams:
+                return jsonify({"status": "error", "message": "Too many open event streams"}), 503, {"Retry-After": "5"}
+            topics = request.args.get('topics')
+            subscription = bus.subscribe(topics.split(',') if topics else None)
+            keepalive = bus.config.keepalive_seconds
+
+            def stream():
+                try:
+                    yield "retry: 3000\n\n"
+                    while not subscription.closed:
+                        event = subscription.get(timeout=keepalive)
+                        # The comment line also lets a write fail once the client has gone
+                        yield event.to_sse() if event else ": keepalive\n\n"
+                finally:
+                    bus.unsubscribe(subscription)
+
+            return Response(stream(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    def run(self, host: Optional[str] = None, port: Optional[int] = None):
+        """Serves until `shutdown()`, with the server chosen by `config.server`."""
+        host = host or self.config.host
+        port = port or self.config.port
+        if self.config.server == "development":
+            self.app.run(host=host, port=port, debug=False, threaded=True)
+            return
+        if self.config.server != "production":
+            self.logger.log_activity("WEB_WARNING", f"Unknown web server mode '{self.config.server}'; using production.")
+        _PooledRequestHandler.timeout = self.config.keepalive_timeout
+        self.server = PooledWSGIServer(host, port, self.app, self.config.threads, self.config.listen_backlog)
+        self.logger.log_activity("WEB", "Serving on http://%s:%d with %d worker threads.", host, port, self.config.threads)
+        self.server.serve_forever()
 
-    def run(self, host='0.0.0.0', port=5000):
-        self.app.run(host=host, port=port, debug=False)
+    def shutdown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()